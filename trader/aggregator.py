@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+from candle_store import COLUMNS, CandleBuffer
+
+KST_OFFSET_NS = 9 * 60 * 60 * 10**9
+TIMEFRAMES = (3, 5, 15, 30, 60, 240)
+
+def bar_start(time_ns, minutes):
+    # 캔들 시각(KST ns)이 속한 minutes분봉 시작 시각. 업비트와 같이 UTC 0시 기준으로 나눔 (240분봉은 KST 01/05/09/13/17/21시)
+    interval_ns = minutes * 60 * 10**9
+    return time_ns - (time_ns - KST_OFFSET_NS) % interval_ns
+
+def merge_row(row, other):
+    # 같은 캔들 구간의 두 행을 합침 (row가 앞선 구간)
+    row[1] = max(row[1], other[1])
+    row[2] = min(row[2], other[2])
+    row[3] = other[3]
+    row[4] += other[4]
+    row[5] += other[5]
+
+class TimeframeBars:
+    """한 티커의 minutes분봉: 확정 캔들 링버퍼 + 아직 끝나지 않은 캔들"""
+    def __init__(self, minutes, maxlen):
+        self.minutes = minutes
+        self.interval_ns = minutes * 60 * 10**9
+        self.buffer = CandleBuffer(maxlen)
+        self.partial = None   # (start_ns, row)
+        self.through = None   # seed()로 받은 진행중 캔들에 이미 포함된 기본 캔들 시각(ns)
+        self.started = False  # 분봉 경계에서 시작하는 기본 캔들을 받았는지
+
+    def fold(self, time_ns, row, base_ns):
+        # 확정된 기본 캔들 1개 반영
+        if self.through is not None and time_ns <= self.through:
+            return
+        start = bar_start(time_ns, self.minutes)
+        if not self.started:
+            # 버퍼 앞부분이 분봉 중간에서 시작하면 그 분봉은 일부만 있으므로 버림
+            if time_ns != start:
+                return
+            self.started = True
+        last = self.buffer.last_time()
+        if last is not None and start <= last:
+            return
+        if self.partial is not None and start > self.partial[0]:
+            self.flush()
+        if self.partial is None:
+            self.partial = (start, np.array(row, dtype=float))
+        else:
+            merge_row(self.partial[1], row)
+        # 구간의 마지막 기본 캔들이면 바로 확정
+        if time_ns + base_ns >= start + self.interval_ns:
+            self.flush()
+
+    def flush(self):
+        if self.partial is not None:
+            self.buffer.append(*self.partial)
+            self.partial = None
+
+    def current(self, live):
+        # 진행중 캔들 (time_ns, row): 끝나지 않은 캔들에 기본 진행중 캔들을 합친 값
+        if live is None:
+            return self.partial
+        start = bar_start(live[0], self.minutes)
+        if self.through is not None and live[0] <= self.through:
+            return self.partial
+        if self.partial is not None and self.partial[0] == start:
+            row = self.partial[1].copy()
+            merge_row(row, live[1])
+            return (start, row)
+        return (start, np.array(live[1], dtype=float))
+
+class TimeframeView:
+    """
+    CandleAggregator의 minutes분봉을 CandleStore와 같은 방식(last_closed, _buffer, live.get)으로 조회한다.
+    IndicatorPipeline.sync에 기본 캔들 대신 넘기면 상위 분봉 기준으로 지표를 계산한다.
+    """
+    def __init__(self, aggregator, minutes):
+        self.aggregator = aggregator
+        self.minutes = minutes
+        # live.get(ticker)로 진행중 캔들 조회 (CandleStore.live와 같은 사용법)
+        self.live = self
+
+    def last_closed(self, ticker):
+        return self.aggregator.last_closed(ticker, self.minutes)
+
+    def _buffer(self, ticker):
+        return self.aggregator._timeframe(ticker, self.minutes).buffer
+
+    def get(self, ticker, default=None):
+        # 진행중 캔들 (time_ns, row)
+        timeframe = self.aggregator._timeframe(ticker, self.minutes)
+        current = timeframe.current(self.aggregator.candle_store.live.get(ticker))
+        return default if current is None else current
+
+class CandleAggregator:
+    """
+    CandleStore의 기본 캔들(예: 1분봉)로 상위 분봉(3/5/15/30/60/240분)을 직접 만든다.
+    새로 확정된 기본 캔들만 증분 반영하므로 분봉을 추가해도 API 호출이 늘지 않고,
+    분봉마다 확정 캔들 maxlen개만 보관한다. 조회 시 자동으로 sync()한다.
+    """
+    def __init__(self, candle_store, timeframes=TIMEFRAMES, maxlen=200):
+        self.candle_store = candle_store
+        self.base_minutes = candle_store.minutes
+        self.base_ns = self.base_minutes * 60 * 10**9
+        for minutes in timeframes:
+            if minutes % self.base_minutes:
+                raise ValueError(f"{minutes}분봉은 기본 캔들({self.base_minutes}분)로 만들 수 없습니다")
+        self.timeframes = tuple(timeframes)
+        self.maxlen = maxlen
+        self.bars = {}        # ticker -> {minutes: TimeframeBars}
+        self.last_time = {}   # ticker -> 마지막으로 반영한 기본 확정 캔들 시각(ns)
+        self.views = {}       # minutes -> TimeframeView
+
+    def _bars(self, ticker):
+        if ticker not in self.bars:
+            self.bars[ticker] = {minutes: TimeframeBars(minutes, self.maxlen) for minutes in self.timeframes}
+        return self.bars[ticker]
+
+    def _timeframe(self, ticker, minutes):
+        bars = self._bars(ticker)
+        if minutes not in bars:
+            raise ValueError(f"{minutes}분봉은 집계 대상이 아닙니다: {self.timeframes}")
+        return bars[minutes]
+
+    def seed(self, ticker, minutes, df):
+        """
+        시작 시 한 번 REST로 받은 minutes분봉(마지막 행은 진행중 캔들)으로 과거 캔들을 채운다.
+        기본 캔들 버퍼보다 긴 구간(예: 240분봉)의 과거 캔들이 바로 필요할 때 사용.
+        """
+        bars = self._timeframe(ticker, minutes)
+        times = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        data = df[COLUMNS].to_numpy(dtype=float)
+        bars.buffer.load(times[:-1], data[:-1])
+        bars.partial = (int(times[-1]), data[-1].copy())
+        bars.started = True
+        # 진행중 기본 캔들까지는 REST 캔들에 이미 포함됨
+        live = self.candle_store.live.get(ticker)
+        bars.through = live[0] if live is not None else self.candle_store.last_closed(ticker)
+
+    def sync(self, ticker):
+        # CandleStore에 새로 확정된 기본 캔들만 반영
+        bars = self._bars(ticker)
+        last = self.candle_store.last_closed(ticker)
+        known = self.last_time.get(ticker)
+        if last is not None and last != known:
+            times, data = self.candle_store._buffer(ticker).arrays()
+            start = 0 if known is None else int(np.searchsorted(times, known, side='right'))
+            for time_ns, row in zip(times[start:], data[start:]):
+                for timeframe in bars.values():
+                    timeframe.fold(int(time_ns), row, self.base_ns)
+            self.last_time[ticker] = last
+        live = self.candle_store.live.get(ticker)
+        if live is not None:
+            # 기본 캔들이 없던 구간(거래 없음)을 지나 다음 분봉이 시작됐으면 이전 캔들 확정
+            for timeframe in bars.values():
+                if timeframe.partial is not None and bar_start(live[0], timeframe.minutes) > timeframe.partial[0]:
+                    timeframe.flush()
+
+    def get_ohlcv(self, ticker, minutes, count=100):
+        # CandleStore.get_ohlcv와 같은 형식 (마지막 행은 진행중 캔들)
+        self.sync(ticker)
+        timeframe = self._timeframe(ticker, minutes)
+        times, data = timeframe.buffer.arrays(count - 1)
+        current = timeframe.current(self.candle_store.live.get(ticker))
+        if current is not None:
+            times = np.append(times, current[0])
+            data = np.vstack([data, current[1]])
+        return pd.DataFrame(data, index=pd.to_datetime(times), columns=COLUMNS)
+
+    def closes(self, ticker, minutes, count=100):
+        self.sync(ticker)
+        timeframe = self._timeframe(ticker, minutes)
+        times, data = timeframe.buffer.arrays(count - 1)
+        closes = data[:, 3]
+        current = timeframe.current(self.candle_store.live.get(ticker))
+        if current is not None:
+            closes = np.append(closes, current[1][3])
+        return closes
+
+    def last_closed(self, ticker, minutes):
+        self.sync(ticker)
+        return self._timeframe(ticker, minutes).buffer.last_time()
+
+    def view(self, minutes):
+        # minutes분봉을 CandleStore처럼 조회하는 TimeframeView
+        if minutes not in self.timeframes:
+            raise ValueError(f"{minutes}분봉은 집계 대상이 아닙니다: {self.timeframes}")
+        if minutes not in self.views:
+            self.views[minutes] = TimeframeView(self, minutes)
+        return self.views[minutes]
+
+def create_aggregator(candle_store, timeframes, maxlen=200, signal_minutes=None):
+    """
+    CANDLE_TIMEFRAMES로 CandleAggregator를 만든다. 기본 캔들이 매매 신호 분봉(signal_minutes)보다 짧으면
+    (예: minute1) 신호 분봉도 함께 집계한다. 집계할 분봉이 없으면 None.
+    """
+    timeframes = list(timeframes)
+    if signal_minutes is not None and candle_store.minutes < signal_minutes and signal_minutes not in timeframes:
+        timeframes.append(signal_minutes)
+    if not timeframes:
+        return None
+    return CandleAggregator(candle_store, sorted(timeframes), maxlen=maxlen)
@@ -0,0 +1,58 @@
+import numpy as np
+
+def water_fill(budget, values, weights):
+    """
+    원화 budget을 티커별 목표 비중(weights)에 맞춰 나눈 매수 한도 배열.
+    보유 가치/비중이 낮은 티커부터 같은 수위(level)까지 채우므로 한도는 음수가 없고 합계는 budget과 같다.
+    (비중 기준 보유 가치 정렬 + 누적합, O(N log N))
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    limits = np.zeros(len(values))
+    active = weights > 0
+    if budget <= 0 or not active.any():
+        return limits
+    w = weights[active]
+    v = values[active]
+    ratio = v / w
+    order = np.argsort(ratio, kind='stable')
+    levels = (budget + np.cumsum(v[order])) / np.cumsum(w[order])
+    # 앞에서 k개를 채울 때의 수위가 k번째 티커 비율 이상인 마지막 k (조건을 만족하는 구간은 앞쪽에 연속)
+    k = np.flatnonzero(levels >= ratio[order])[-1]
+    limits[active] = np.maximum(w * levels[k] - v, 0.0)
+    return limits
+
+class PortfolioAllocator:
+    """
+    티커별 매수 한도 계산 (API 호출 없음, 보유 수량/현재가 배열 입력).
+    weights가 없으면 균등 비중, 있으면 {ticker: 비중} (없는 티커는 0, 매수 안 함).
+    원화 잔고와 보유 수량이 마지막 계산 때와 같으면 다시 계산하지 않고 이전 결과를 반환한다.
+    """
+    def __init__(self, tickers, weights=None):
+        self.tickers = list(tickers)
+        if weights:
+            self.weights = np.array([float(weights.get(ticker, 0.0)) for ticker in self.tickers])
+        else:
+            self.weights = np.ones(len(self.tickers))
+        self.key = None
+        self.limits = None
+        self.computed = 0
+        self.reused = 0
+
+    def _key(self, krw_balance, volumes):
+        return (float(krw_balance), np.asarray(volumes, dtype=float).tobytes())
+
+    def cached(self, krw_balance, volumes):
+        # 보유 현황이 그대로면 이전 한도 {ticker: 금액}, 바뀌었으면 None
+        if self.limits is None or self._key(krw_balance, volumes) != self.key:
+            return None
+        self.reused += 1
+        return dict(zip(self.tickers, self.limits.tolist()))
+
+    def allocate(self, krw_balance, volumes, prices):
+        # 보유 가치(수량 x 현재가)와 원화 잔고로 한도 계산 -> {ticker: 금액}
+        values = np.asarray(volumes, dtype=float) * np.asarray(prices, dtype=float)
+        self.limits = water_fill(krw_balance, values, self.weights)
+        self.key = self._key(krw_balance, volumes)
+        self.computed += 1
+        return dict(zip(self.tickers, self.limits.tolist()))
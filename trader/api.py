@@ -1,36 +1,192 @@
 from config import Config
+import threading
+import time
 import pyupbit
 from slack_sdk import WebClient
+from slack_queue import SlackQueue
+from exchange import create_exchange
+from allocator import PortfolioAllocator
+from orderbook import OrderBookStore
+from metrics import metrics
+from log import get_logger
+
+logger = get_logger(__name__)
+
+class PriceCache:
+    """
+    여러 티커 현재가를 한 번의 요청으로 조회해 ttl(초) 동안 공유하는 캐시.
+    만료되었거나 없는 티커가 있으면 기본 티커 목록 전체를 함께 다시 조회한다.
+    """
+    def __init__(self, tickers, ttl=2.0, quotation=pyupbit):
+        self.tickers = list(tickers)
+        self.ttl = ttl
+        self.quotation = quotation
+        self.prices = {}
+        self.fetched_at = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_many(self, tickers=None):
+        tickers = list(tickers) if tickers is not None else self.tickers
+        with self.lock:
+            now = time.monotonic()
+            stale = [ticker for ticker in tickers
+                     if ticker not in self.prices or now - self.fetched_at[ticker] > self.ttl]
+            if not stale:
+                self.hits += len(tickers)
+                return {ticker: self.prices[ticker] for ticker in tickers}
+            self.hits += len(tickers) - len(stale)
+            self.misses += len(stale)
+            self._fetch(list(dict.fromkeys(self.tickers + stale)), now)
+            return {ticker: self.prices.get(ticker) for ticker in tickers}
+
+    def get(self, ticker):
+        return self.get_many([ticker])[ticker]
+
+    def put(self, prices):
+        # 외부(비동기 조회 등)에서 받아온 현재가를 캐시에 반영
+        with self.lock:
+            now = time.monotonic()
+            for ticker, price in prices.items():
+                if price is not None:
+                    self.prices[ticker] = price
+                    self.fetched_at[ticker] = now
+
+    def invalidate(self):
+        with self.lock:
+            self.prices.clear()
+            self.fetched_at.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0}
+
+    def _fetch(self, tickers, now):
+        metrics.inc('api_calls', endpoint='get_current_price')
+        with metrics.timer('price_fetch'):
+            prices = self.quotation.get_current_price(tickers)
+        if prices is None:
+            return
+        # 티커가 1개면 pyupbit는 dict 대신 가격만 반환
+        if not isinstance(prices, dict):
+            prices = {tickers[0]: prices}
+        for ticker, price in prices.items():
+            if price is not None:
+                self.prices[ticker] = price
+                self.fetched_at[ticker] = now
+
+class BalanceSnapshot:
+    """
+    get_balances() 결과를 화폐별로 색인해 보관하는 잔고 스냅샷.
+    주문 체결 시 apply_fill()로 갱신하거나 invalidate()로 무효화하며, 그 외에는 ttl(초)이 지나야 다시 조회한다.
+    """
+    def __init__(self, upbit, ttl=60.0):
+        self.upbit = upbit
+        self.ttl = ttl
+        self.balances = {}   # currency -> {'balance', 'locked', 'avg_buy_price'}
+        self.fetched_at = None
+        self.fetch_count = 0
+        self.lock = threading.RLock()
+
+    def is_stale(self):
+        return self.fetched_at is None or time.monotonic() - self.fetched_at > self.ttl
+
+    def refresh(self):
+        metrics.inc('api_calls', endpoint='get_balances')
+        with metrics.timer('balance_fetch'):
+            balances = self.upbit.get_balances()
+        if not isinstance(balances, list):
+            metrics.inc('errors', stage='balance_fetch')
+            raise ValueError(f"잔고 조회 실패: {balances}")
+        with self.lock:
+            self.balances = {
+                balance['currency']: {
+                    'balance': float(balance['balance']),
+                    'locked': float(balance.get('locked', 0)),
+                    'avg_buy_price': float(balance.get('avg_buy_price', 0)),
+                }
+                for balance in balances
+            }
+            self.fetched_at = time.monotonic()
+            self.fetch_count += 1
+        return self.balances
+
+    def get(self):
+        with self.lock:
+            if self.is_stale():
+                self.refresh()
+            return self.balances
+
+    def invalidate(self):
+        with self.lock:
+            self.fetched_at = None
+
+    def balance(self, currency):
+        return self.get().get(currency, {}).get('balance', 0.0)
+
+    def avg_buy_price(self, currency):
+        return self.get().get(currency, {}).get('avg_buy_price', 0.0)
+
+    def apply_fill(self, ticker, side, volume, price, fee=0.0):
+        # 체결 내역으로 잔고를 직접 갱신 (side: 'bid' 매수, 'ask' 매도)
+        currency = ticker.split('-')[1]
+        with self.lock:
+            if self.fetched_at is None:
+                return
+            krw = self.balances.setdefault('KRW', {'balance': 0.0, 'locked': 0.0, 'avg_buy_price': 0.0})
+            coin = self.balances.setdefault(currency, {'balance': 0.0, 'locked': 0.0, 'avg_buy_price': 0.0})
+            if side == 'bid':
+                total = coin['balance'] + volume
+                coin['avg_buy_price'] = (coin['balance'] * coin['avg_buy_price'] + volume * price) / total if total > 0 else 0.0
+                coin['balance'] = total
+                krw['balance'] -= volume * price + fee
+            else:
+                coin['balance'] = max(coin['balance'] - volume, 0.0)
+                if coin['balance'] == 0:
+                    coin['avg_buy_price'] = 0.0
+                krw['balance'] += volume * price - fee
 
 class API:
-    def __init__(self):
-        self.config = Config()
-        self.upbit = pyupbit.Upbit(self.config.upbit_access_key, self.config.upbit_secret_key)
-        self.slack = WebClient(token=self.config.slack_api_token)
+    def __init__(self, config=None, upbit=None, quotation=None, slack=None):
+        # 인자를 주면 해당 객체를 사용 (벤치마크 등에서 거래소/슬랙 대체)
+        self.config = config if config is not None else Config()
+        # 주문/잔고 클라이언트와 시세 조회 모듈 (EXCHANGE_BACKEND에 따라 실거래 또는 모의 거래소)
+        if upbit is None:
+            upbit, quotation = create_exchange(self.config)
+        self.upbit = upbit
+        self.quotation = quotation if quotation is not None else upbit
+        self.slack = slack if slack is not None else WebClient(token=self.config.slack_api_token)
+        self.slack_queue = SlackQueue(self.slack, maxsize=self.config.slack_queue_size,
+                                      batch_window=self.config.slack_batch_window)
+        self.price_cache = PriceCache(self.config.coin_ticker, ttl=self.config.price_cache_ttl, quotation=self.quotation)
+        self.balances = BalanceSnapshot(self.upbit, ttl=self.config.balance_cache_ttl)
+        self.allocator = PortfolioAllocator(self.config.coin_ticker, self.config.allocation_weights)
+        # 주문 전 예상 체결가 확인용 호가창 (REST 조회 또는 웹소켓으로 갱신)
+        self.orderbooks = OrderBookStore(max_age=self.config.orderbook_max_age)
 
-    def send_slack_message(self, channel_id, message):
-        try:
-            self.slack.chat_postMessage(channel=channel_id, text=message)
-        except Exception as e:
-            print(f"Error sending message: {e}")
+    def send_slack_message(self, channel_id, message, key=None):
+        # 큐에 넣기만 하고 바로 반환 (전송은 SlackQueue 워커 스레드)
+        if not self.slack_queue.put(channel_id, message, key=key):
+            logger.warning("슬랙 메시지 큐가 가득 차 메시지를 버렸습니다: %s", message[:50])
 
     def get_asset_info(self):
         try:
-            balances = self.upbit.get_balances()
-            krw_balance = float(next((balance['balance'] for balance in balances 
-                                    if balance['currency'] == 'KRW'), 0))
+            balances = self.balances.get()
+            krw_balance = balances.get('KRW', {}).get('balance', 0.0)
             coin_info = {}
             total_asset = krw_balance
+            current_prices = self.get_current_prices()
 
             for ticker in self.config.coin_ticker:
                 currency = ticker.split('-')[1]
-                current_price = pyupbit.get_current_price(ticker)
+                current_price = current_prices[ticker]
+
+                balance_info = balances.get(currency, {})
+                coin_balance = balance_info.get('balance', 0.0)
+                avg_buy_price = balance_info.get('avg_buy_price', 0.0)
 
-                coin_balance = float(next((balance['balance'] for balance in balances 
-                                          if balance['currency'] == currency), 0))
-                avg_buy_price = float(next((balance['avg_buy_price'] for balance in balances 
-                                          if balance['currency'] == currency), 0))
-                
                 coin_value = coin_balance * current_price
                 total_asset += coin_value
 
@@ -51,73 +207,64 @@ class API:
             }
 
         except Exception as e:
-            print(f"자산 정보 조회 중 에러 발생: {str(e)}")
+            logger.warning("자산 정보 조회 중 에러 발생: %s", e)
             return None
         
+    def request_budget(self):
+        # 요청 그룹별 남은 요청 수 {group: {'sec', 'min', 'age'}} (Remaining-Req 헤더 기준)
+        transport = getattr(self.upbit, 'transport', None)
+        return transport.budget.snapshot() if transport is not None else {}
+
     def get_current_price(self, ticker):
-        current_price = pyupbit.get_current_price(ticker)
-        if current_price is None:
-            print(f"현재가격 조회 중 에러 발생: {ticker}")
-            return 0
-        return current_price
+        # 조회 실패 시 예외 (get_current_prices와 같음)
+        return self.get_current_prices([ticker])[ticker]
+
+    def get_current_prices(self, tickers=None):
+        """
+        여러 티커 현재가를 한 번에 조회 (캐시 공유).
+        조회에 실패하면 예외를 그대로 올리고(TransportError, RequestShed 등), 가격을 받지 못한 티커가 있으면 ValueError.
+        0으로 대신하면 손절 조건(현재가 < 평균매수가 x STOP_LOSS)에 걸리므로 0을 반환하지 않는다.
+        """
+        current_prices = self.price_cache.get_many(tickers)
+        missing = [ticker for ticker, current_price in current_prices.items() if current_price is None]
+        if missing:
+            raise ValueError(f"현재가격 조회 실패: {', '.join(missing)}")
+        return current_prices
+
+    def refresh_orderbooks(self, tickers):
+        # 여러 티커 호가창을 한 번에 조회해 반영 (시세 모듈이 호가 조회를 지원하지 않으면 건너뜀)
+        get_orderbook = getattr(self.quotation, 'get_orderbook', None)
+        if get_orderbook is None or not tickers:
+            return False
+        metrics.inc('api_calls', endpoint='get_orderbook')
+        try:
+            with metrics.timer('orderbook_fetch'):
+                self.orderbooks.apply_many(get_orderbook(list(tickers)))
+            return True
+        except Exception as e:
+            logger.warning("호가창 조회 중 에러 발생: %s", e)
+            return False
 
     def get_limit_amount(self):
         try:
-            # 원화 잔액 조회
-            balances = self.upbit.get_balances()
-            krw_balance = float(next((balance['balance'] for balance in balances 
-                                    if balance['currency'] == 'KRW'), 0))
-            
-            # 코인별 현재가 조회
-            current_prices = {ticker: self.get_current_price(ticker) for ticker in self.config.coin_ticker}
-            
-            # 코인별 보유 자산 계산
-            balance_dict = {b['currency']: b for b in balances}
-            coin_values = {}
-            total_asset = krw_balance
-            
-            for ticker in self.config.coin_ticker:
-                currency = ticker.split('-')[1]
-                current_price = current_prices[ticker]
-                balance_info = balance_dict.get(currency, {})
-                coin_balance = float(balance_info.get('balance', 0))
-                coin_value = coin_balance * current_price
-                coin_values[ticker] = coin_value
-                total_asset += coin_value
-            
-            # 코인 개수로 분배할 금액 계산
-            coin_count = len(self.config.coin_ticker)
-            if coin_count == 0:
+            # 잔고 스냅샷 기준 원화 잔액/보유 수량
+            balances = self.balances.get()
+            krw_balance = balances.get('KRW', {}).get('balance', 0.0)
+            tickers = self.config.coin_ticker
+            if len(tickers) == 0:
                 raise ValueError("코인 개수가 0입니다")
-                
-            target_amount_per_coin = total_asset / coin_count
-            
-            # 각 코인별 매수 가능 금액 계산
-            limit_amounts = {}
-            negative_sum = 0
-            negative_count = 0
-            
-            # 구매 제한이 음수인지 확인
-            for ticker in self.config.coin_ticker:
-                limit_amount = target_amount_per_coin - coin_values[ticker]
-                if limit_amount < 0:
-                    negative_sum += abs(limit_amount)
-                    negative_count += 1
-                    limit_amounts[ticker] = 0
-                else:
-                    limit_amounts[ticker] = limit_amount
-            
-            # 코인 보유량 > 매수가능금액 인 경우 해당 금액만큼 다른 코인들에게 분배
-            if negative_count > 0 and len(self.config.coin_ticker) > negative_count:
-                additional_reduction = negative_sum / (len(self.config.coin_ticker) - negative_count)
-                for ticker in self.config.coin_ticker:
-                    if limit_amounts[ticker] > 0:
-                        limit_amounts[ticker] -= additional_reduction
-                    
-            return limit_amounts
-            
+            volumes = [balances.get(ticker.split('-')[1], {}).get('balance', 0.0) for ticker in tickers]
+
+            # 보유 현황이 그대로면 이전 한도 사용 (현재가 조회 없음)
+            limit_amounts = self.allocator.cached(krw_balance, volumes)
+            if limit_amounts is not None:
+                return limit_amounts
+
+            # 목표 비중까지 보유 가치가 낮은 코인부터 원화 잔액을 나눔 (음수 한도 없음)
+            current_prices = self.get_current_prices()
+            return self.allocator.allocate(krw_balance, volumes, [current_prices[ticker] for ticker in tickers])
+
         except Exception as e:
-            error_msg = f"주문 가능 금액 조회 중 오류 발생: {str(e)}"
-            self.send_slack_message(self.config.slack_error_channel, error_msg)
-            print(error_msg)
+            # 에러 로그는 슬랙 에러 채널로도 전송됨 (log.setup_logging)
+            logger.error("주문 가능 금액 조회 중 오류 발생: %s", e)
             return {}
@@ -0,0 +1,263 @@
+from config import Config
+from api import API
+from trade import Trader
+from indicator import bucket_rsi
+from candle_store import CandleStore, interval_minutes
+from aggregator import create_aggregator
+from notifier import Notifier
+from session import TradingSession
+from metrics import metrics
+from scheduler import QUOTATION, RequestShed
+from change_tracker import ChangeTracker
+from snapshot import SnapshotStore, handle_sigterm
+from log import get_logger, setup_logging
+from datetime import datetime
+import asyncio
+import atexit
+import time
+import aiohttp
+import pandas as pd
+
+logger = get_logger(__name__)
+
+QUOTATION_URL = "https://api.upbit.com/v1"
+
+class AsyncQuotation:
+    """aiohttp 세션 하나를 공유하는 업비트 시세 조회 (전역 동시 요청 수 제한)"""
+    def __init__(self, session, semaphore, base_url=QUOTATION_URL, budget=None, scheduler=None):
+        self.session = session
+        self.semaphore = semaphore
+        self.base_url = base_url
+        # 동기 경로(Transport)와 요청 예산 공유 (Remaining-Req 헤더)
+        self.budget = budget
+        # 주문 경로와 같은 우선순위 스케줄러 사용 (시세는 가장 낮은 순위)
+        self.scheduler = scheduler
+        self.request_count = 0
+
+    async def _get(self, path, params):
+        async with self.semaphore:
+            self.request_count += 1
+            metrics.inc('api_calls', endpoint=path.split("/")[1])
+            if self.scheduler is not None:
+                await asyncio.to_thread(self.scheduler.acquire, QUOTATION)
+            if self.budget is not None:
+                wait = self.budget.wait_time(path)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.budget.consume(path)
+            async with self.session.get(f"{self.base_url}{path}", params=params) as response:
+                if self.budget is not None:
+                    self.budget.update(path, response.headers.get("Remaining-Req"))
+                    if response.status == 429:
+                        self.budget.record_throttle(path)
+                response.raise_for_status()
+                return await response.json()
+
+    async def get_current_prices(self, tickers):
+        data = await self._get("/ticker", {"markets": ",".join(tickers)})
+        return {item['market']: float(item['trade_price']) for item in data}
+
+    async def get_ohlcv(self, ticker, interval="minute5", count=100):
+        # pyupbit.get_ohlcv와 같은 형식의 DataFrame (오래된 순서, 마지막 행은 진행중 캔들), 200개 초과는 나눠서 조회
+        path = f"/candles/minutes/{interval_minutes(interval)}"
+        data = []
+        to = None
+        while len(data) < count:
+            params = {"market": ticker, "count": min(count - len(data), 200)}
+            if to is not None:
+                params["to"] = to
+            rows = await self._get(path, params)
+            if not rows:
+                break
+            data.extend(rows)
+            to = rows[-1]['candle_date_time_utc'].replace("T", " ")
+            if len(rows) < params["count"]:
+                break
+        data = list(reversed(data))
+        index = pd.to_datetime([item['candle_date_time_kst'] for item in data])
+        return pd.DataFrame({
+            'open': [item['opening_price'] for item in data],
+            'high': [item['high_price'] for item in data],
+            'low': [item['low_price'] for item in data],
+            'close': [item['trade_price'] for item in data],
+            'volume': [item['candle_acc_trade_volume'] for item in data],
+            'value': [item['candle_acc_trade_price'] for item in data],
+        }, index=index)
+
+class ThreadQuotation:
+    """동기 시세 조회 모듈(모의 거래소 등)을 AsyncQuotation과 같은 형식으로 감싼다"""
+    def __init__(self, quotation, semaphore):
+        self.quotation = quotation
+        self.semaphore = semaphore
+        self.request_count = 0
+
+    async def get_current_prices(self, tickers):
+        async with self.semaphore:
+            self.request_count += 1
+            prices = await asyncio.to_thread(self.quotation.get_current_price, list(tickers))
+        if not isinstance(prices, dict):
+            prices = {tickers[0]: prices}
+        return prices
+
+    async def get_ohlcv(self, ticker, interval="minute5", count=100):
+        async with self.semaphore:
+            self.request_count += 1
+            return await asyncio.to_thread(self.quotation.get_ohlcv, ticker, interval=interval, count=count)
+
+class AsyncTradingLoop:
+    """
+    티커별 파이프라인(캔들 조회 -> 지표 -> 신호 -> 주문)을 각각 독립된 태스크로 실행한다.
+    시세/자산 갱신 태스크가 주기마다 새 패스를 알리고, 주문 처리중인 티커는 다른 티커를 막지 않는다.
+    """
+    def __init__(self, config, api, session, trader, candle_store, quotation, interval=10, snapshot_store=None):
+        self.config = config
+        self.api = api
+        self.session = session
+        self.trader = trader
+        self.candle_store = candle_store
+        self.quotation = quotation
+        self.interval = interval
+        self.tickers = config.coin_ticker
+        self.current_prices = {}
+        self.pass_id = 0
+        self.new_pass = asyncio.Condition()
+        self.order_semaphore = asyncio.Semaphore(config.async_concurrency)
+        self.last_pass_time = 0.0
+        self.change_tracker = ChangeTracker() if config.evaluation_mode == "change" else None
+        self.snapshot_store = snapshot_store
+
+    async def run(self):
+        tasks = [asyncio.create_task(self.market_task())]
+        tasks += [asyncio.create_task(self.ticker_task(ticker)) for ticker in self.tickers]
+        await asyncio.gather(*tasks)
+
+    async def market_task(self):
+        # 주기마다 전체 현재가 1회 조회, 자산 현황 갱신 후 티커 태스크에 새 패스 알림
+        status_sent = False
+        while True:
+            started = time.monotonic()
+            try:
+                with metrics.timer('price_fetch'):
+                    self.current_prices = await self.quotation.get_current_prices(self.tickers)
+                self.api.price_cache.put(self.current_prices)
+                asset_info = await asyncio.to_thread(self.session.refresh_asset_info)
+                if asset_info is None:
+                    logger.warning("자산현황 정보를 가져오는 데 실패했습니다.")
+                else:
+                    if datetime.now().minute in [0, 30]:
+                        if not status_sent:
+                            await asyncio.to_thread(self.session.send_asset_info)
+                            status_sent = True
+                    else:
+                        status_sent = False
+                    async with self.new_pass:
+                        self.pass_id += 1
+                        self.new_pass.notify_all()
+            except RequestShed as e:
+                # 요청 한도가 부족해 시세 조회를 건너뜀 (주문이 우선), 다음 주기에 다시 조회
+                logger.info("시세 조회 보류: %s", e)
+            except Exception as e:
+                metrics.inc('errors', stage='main_loop')
+                logger.exception("시세 갱신 오류: %s", e)
+            if self.snapshot_store is not None and self.snapshot_store.due():
+                self.snapshot_store.save()
+            self.last_pass_time = time.monotonic() - started
+            await asyncio.sleep(max(self.interval - self.last_pass_time, 0))
+
+    async def ticker_task(self, ticker):
+        seen = 0
+        while True:
+            async with self.new_pass:
+                await self.new_pass.wait_for(lambda: self.pass_id > seen)
+                seen = self.pass_id
+            try:
+                await self.evaluate(ticker)
+            except RequestShed as e:
+                logger.info("%s 캔들 조회 보류: %s", ticker, e, extra={'sample': ('shed', ticker)})
+            except Exception as e:
+                metrics.inc('errors', stage='ticker_task')
+                logger.exception("%s 처리 중 오류: %s", ticker, e)
+
+    async def evaluate(self, ticker):
+        current_price = self.current_prices.get(ticker)
+        count = self.candle_store.plan_fetch(ticker, current_price)
+        if count is not None:
+            with metrics.timer('candle_fetch', ticker):
+                df = await self.quotation.get_ohlcv(ticker, interval=self.candle_store.interval, count=count)
+            self.candle_store.merge(ticker, df)
+        if self.trader.aggregator is not None:
+            self.trader.aggregator.sync(ticker)
+
+        if self.change_tracker is not None:
+            key = self.change_tracker.key(ticker, current_price, self.candle_store, self.session)
+            if not self.change_tracker.changed([ticker], {ticker: key}):
+                return
+
+        with metrics.timer('rsi', ticker):
+            # 새로 확정된 캔들만 반영 (캔들당 O(1))
+            rsi, previous_rsi = self.trader.signal_inputs(self.session.pipeline, ticker, self.candle_store)
+            rsi, previous_rsi, new_rsi = float(rsi), float(previous_rsi), int(bucket_rsi(rsi))
+        with metrics.timer('signal', ticker):
+            profit_rate = self.session.asset_info['coin_info'][ticker.split('-')[1]]['profit_rate']
+            buy_signal = self.trader.buy_signal(rsi, previous_rsi)
+            sell_signal = self.trader.sell_signal(rsi, previous_rsi, profit_rate)
+
+        # 주문 경로(pyupbit 동기 호출, 체결 대기)는 스레드에서 실행
+        async with self.order_semaphore:
+            if self.config.orderbook_max_slippage_bps > 0 and self.session.has_action(
+                    ticker, rsi, previous_rsi, new_rsi, buy_signal, sell_signal, current_price):
+                await asyncio.to_thread(self.api.refresh_orderbooks, [ticker])
+            with metrics.timer('execute', ticker):
+                await asyncio.to_thread(self.session.execute, ticker, rsi, previous_rsi, new_rsi,
+                                        buy_signal, sell_signal, current_price)
+        if self.change_tracker is not None:
+            self.change_tracker.store(ticker, key)
+
+async def async_main():
+    config = Config()
+    api = API()
+    setup_logging(config, api)
+    notifier = Notifier(api)
+    TICKERS = config.coin_ticker
+    trader = Trader(api.upbit, api.slack, TICKERS)
+    session = TradingSession(config, api, notifier, trader)
+    # 모의 거래소는 재생 시각 기준으로 캔들을 관리하고 디스크 캐시를 쓰지 않음
+    simulated = config.exchange_backend == "sim"
+    candle_store = CandleStore(interval=config.candle_interval, maxlen=config.candle_buffer_size,
+                               cache_dir=None if simulated else config.candle_cache_dir,
+                               quotation=api.quotation, clock=api.quotation.now if simulated else None)
+    trader.aggregator = create_aggregator(candle_store, config.candle_timeframes, config.candle_buffer_size, trader.signal_minutes)
+
+    logger.info("자동투자 프로그램을 비동기 모드로 시작합니다. %s를 모니터링합니다.", TICKERS)
+    if config.metrics_port:
+        metrics.serve(config.metrics_port, config.metrics_host)
+    snapshot_store = None
+    snapshot = None
+    if config.snapshot_path and not simulated:
+        snapshot_store = SnapshotStore(config.snapshot_path, session, candle_store, session.pipeline,
+                                       interval=config.snapshot_interval)
+        snapshot = snapshot_store.load()
+        if snapshot is not None:
+            snapshot_store.restore(snapshot)
+    if not await asyncio.to_thread(session.start, snapshot['session'] if snapshot is not None else None):
+        logger.error("초기 자산 정보 조회 실패. 프로그램을 종료합니다.")
+        return
+    if snapshot_store is not None:
+        # 종료(Ctrl+C, SIGTERM) 시에도 저장
+        atexit.register(snapshot_store.close)
+    handle_sigterm(snapshot_store, asyncio.get_running_loop())
+
+    semaphore = asyncio.Semaphore(config.async_concurrency)
+    timeout = aiohttp.ClientTimeout(total=10)
+    connector = aiohttp.TCPConnector(limit=config.async_concurrency, keepalive_timeout=60)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as http:
+        transport = getattr(api.upbit, 'transport', None)
+        if simulated or transport is None:
+            quotation = ThreadQuotation(api.quotation, semaphore)
+        else:
+            quotation = AsyncQuotation(http, semaphore, budget=transport.budget, scheduler=transport.scheduler)
+        loop = AsyncTradingLoop(config, api, session, trader, candle_store, quotation, snapshot_store=snapshot_store)
+        await loop.run()
+
+if __name__ == "__main__":
+    asyncio.run(async_main())
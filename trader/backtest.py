@@ -0,0 +1,169 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from indicator import wilder_rsi_series, bucket_rsi_array
+from trade import Trader
+
+def load_candles(path):
+    # CSV/Parquet 캔들 로드 (pyupbit.get_ohlcv 형식, 시각 index와 close 컬럼 필요)
+    if str(path).endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, index_col=0, parse_dates=True)
+    if 'close' not in df.columns:
+        raise ValueError(f"close 컬럼이 없습니다: {path}")
+    return df.sort_index()
+
+class Backtester:
+    """
+    main 루프의 RSI 래더 전략 재현 백테스트 (확정 캔들 종가 기준 판단).
+    - 매수: buy_signal이고 해당 rsi 구간을 아직 사지 않았으면 position_size(구간) * 매매한도 만큼 시장가 매수
+    - 매도: sell_signal(rsi >= 70, 하락 전환, 수익률 1% 이상, 기준값은 Trader 설정)이면 전량 매도 후 래더 초기화
+    - 손절: 현재가 < 평균매수가 * stop_loss 이면 전량 매도 후 래더 초기화
+    매매한도는 main과 같이 시작 시점에 한 번 계산하며 (단일 티커: 초기 자산 전체), 최소 주문금액과 수수료를 반영한다.
+    지표/신호는 벡터로 미리 계산하고, 포지션 상태가 필요한 후보 캔들만 순서대로 처리한다.
+    """
+    def __init__(self, initial_krw=1_000_000, stop_loss=0.95, fee=0.0005, min_order=5000, period=14, trader=None):
+        self.initial_krw = initial_krw
+        self.stop_loss = stop_loss
+        self.fee = fee
+        self.min_order = min_order
+        self.period = period
+        self.trader = trader if trader is not None else Trader(None, None, [])
+
+    def run(self, df, rsi=None):
+        return self.simulate(df['close'].to_numpy(dtype=float), rsi, df.index)
+
+    def simulate(self, close, rsi=None, index=None):
+        # 종가 배열로 직접 실행 (index가 없으면 캔들 순번 사용)
+        started = time.perf_counter()
+        length = len(close)
+        if index is None:
+            index = pd.RangeIndex(length)
+        if rsi is None:
+            rsi = wilder_rsi_series(close, self.period)
+        previous_rsi = np.concatenate([[np.nan], rsi[:-1]])
+        level = bucket_rsi_array(rsi, self.trader.levels)
+
+        buy_mask = self.trader.buy_signals(rsi, previous_rsi)
+        # 수익률 조건을 제외한 매도 후보 (수익률은 포지션 상태에 따라 순서대로 판단)
+        sell_mask = self.trader.sell_signals(rsi, previous_rsi, np.full(length, np.inf))
+        events = np.flatnonzero(buy_mask | sell_mask)
+
+        limit_amount = self.initial_krw
+        krw = float(self.initial_krw)
+        volume = 0.0
+        avg_price = 0.0
+        cost = 0.0
+        ladder = []
+        trades = []
+
+        def buy(i, size):
+            nonlocal krw, volume, avg_price, cost
+            fee = size * self.fee
+            bought = size / close[i]
+            krw -= size + fee
+            cost += size + fee
+            avg_price = (avg_price * volume + size) / (volume + bought)
+            volume += bought
+            ladder.append(int(level[i]))
+            trades.append((i, 'bid', 'buy', close[i], bought, size, fee, int(level[i]), 0.0, krw, volume))
+
+        def sell(i, reason):
+            nonlocal krw, volume, avg_price, cost
+            sold = volume
+            value = sold * close[i]
+            fee = value * self.fee
+            krw += value - fee
+            pnl = value - fee - cost
+            volume = avg_price = cost = 0.0
+            trades.append((i, 'ask', reason, close[i], sold, value, fee, int(level[i]), pnl, krw, volume))
+            ladder.clear()
+
+        def scan_stop_loss(start, end):
+            # 보유 중 [start, end) 구간에서 처음 손절가를 깨는 캔들
+            if volume <= 0 or start >= end:
+                return None
+            hit = close[start:end] < avg_price * self.stop_loss
+            if not hit.any():
+                return None
+            return start + int(np.argmax(hit))
+
+        position = self.period
+        for event in list(events) + [length]:
+            stop_index = scan_stop_loss(position, event)
+            if stop_index is not None:
+                sell(stop_index, 'stop_loss')
+            if event == length:
+                break
+
+            i = event
+            if buy_mask[i] and int(level[i]) not in ladder:
+                size = self.trader.position_size(int(level[i])) * limit_amount
+                if size >= self.min_order and krw >= size * (1 + self.fee):
+                    buy(i, size)
+            elif volume > 0 and sell_mask[i] and (close[i] - avg_price) / avg_price * 100 >= self.trader.min_profit:
+                sell(i, 'sell')
+            elif volume > 0 and close[i] < avg_price * self.stop_loss:
+                sell(i, 'stop_loss')
+            position = i + 1
+
+        trades = pd.DataFrame(trades, columns=['index', 'side', 'reason', 'price', 'volume', 'value', 'fee', 'rsi', 'pnl', 'krw_after', 'volume_after'])
+        trades.insert(0, 'time', index[trades['index'].to_numpy(dtype=int)] if len(trades) else [])
+        equity = self._equity_curve(index, close, trades)
+        elapsed = time.perf_counter() - started
+        return {'trades': trades, 'equity': equity, 'stats': self._stats(trades, equity, length, elapsed)}
+
+    def _equity_curve(self, index, close, trades):
+        # 거래 직후 현금/코인 잔고를 계단 함수로 펼쳐 평가금액 계산
+        if len(trades) == 0:
+            return pd.Series(np.full(len(close), float(self.initial_krw)), index=index, name='equity')
+        step = np.searchsorted(trades['index'].to_numpy(), np.arange(len(close)), side='right') - 1
+        krw = np.where(step >= 0, trades['krw_after'].to_numpy()[step.clip(min=0)], self.initial_krw)
+        volume = np.where(step >= 0, trades['volume_after'].to_numpy()[step.clip(min=0)], 0.0)
+        return pd.Series(krw + volume * close, index=index, name='equity')
+
+    def _stats(self, trades, equity, length, elapsed):
+        values = equity.to_numpy()
+        peak = np.maximum.accumulate(values)
+        drawdown = (values - peak) / peak
+        exits = trades[trades['side'] == 'ask']
+        return {
+            'candles': length,
+            'final_equity': float(values[-1]) if length else float(self.initial_krw),
+            'total_return': (float(values[-1]) / self.initial_krw - 1) * 100 if length else 0.0,
+            'max_drawdown': float(drawdown.min()) * 100 if length else 0.0,
+            'trades': len(trades),
+            'round_trips': len(exits),
+            'stop_losses': int((exits['reason'] == 'stop_loss').sum()),
+            'win_rate': float((exits['pnl'] > 0).mean()) * 100 if len(exits) else 0.0,
+            'realized_pnl': float(exits['pnl'].sum()),
+            'fees': float(trades['fee'].sum()),
+            'elapsed': elapsed,
+            'candles_per_sec': length / elapsed if elapsed > 0 else float('inf'),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="RSI 래더 전략 백테스트")
+    parser.add_argument("path", help="캔들 CSV/Parquet 파일")
+    parser.add_argument("--initial", type=float, default=1_000_000, help="초기 자산(원)")
+    parser.add_argument("--stop-loss", type=float, default=0.95, help="손절 기준 (평균매수가 대비 비율)")
+    parser.add_argument("--fee", type=float, default=0.0005, help="거래 수수료율")
+    parser.add_argument("--min-order", type=float, default=5000, help="최소 주문금액(원)")
+    parser.add_argument("--trades-out", help="거래 내역 CSV 저장 경로")
+    parser.add_argument("--equity-out", help="평가금액 곡선 CSV 저장 경로")
+    args = parser.parse_args()
+
+    df = load_candles(args.path)
+    backtester = Backtester(initial_krw=args.initial, stop_loss=args.stop_loss, fee=args.fee, min_order=args.min_order)
+    result = backtester.run(df)
+    for key, value in result['stats'].items():
+        print(f"{key}: {value:,.4f}" if isinstance(value, float) else f"{key}: {value}")
+    if args.trades_out:
+        result['trades'].to_csv(args.trades_out, index=False)
+    if args.equity_out:
+        result['equity'].to_csv(args.equity_out)
+
+if __name__ == "__main__":
+    main()
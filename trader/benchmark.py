@@ -0,0 +1,270 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+# 실계좌/슬랙 없이 실행되도록 벤치마크용 환경변수 고정 (.env보다 우선)
+BENCHMARK_ENV = {
+    'UPBIT_ACCESS_KEY': 'benchmark', 'UPBIT_SECRET_KEY': 'benchmark',
+    'SLACK_API_TOKEN': 'benchmark', 'SLACK_TRADE_CHANNEL': 'trade',
+    'SLACK_ERROR_CHANNEL': 'error', 'SLACK_ASSET_CHANNEL': 'asset',
+    'COIN_TICKER': 'KRW-BTC', 'INITIAL_ASSET': '1000000', 'STOP_LOSS': '0.95',
+    'EXCHANGE_BACKEND': 'upbit', 'MARKET_DATA_MODE': 'rest', 'SLACK_BATCH_WINDOW': '0.1',
+    'JOURNAL_DIR': '',
+}
+os.environ.update(BENCHMARK_ENV)
+
+from config import Config
+from api import API
+from candle_store import CandleStore
+from exchange import SimulatedExchange
+from indicator import Indicator, BatchIndicator
+from log import get_logger, setup_logging
+from main import run_pass
+from notifier import Notifier
+from session import TradingSession
+from trade import Trader
+
+TICKER_COUNTS = (1, 10, 100, 500)
+WINDOWS = (100, 1000, 10000)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+class StubSlack:
+    """chat_postMessage 호출만 세는 슬랙 클라이언트"""
+    def __init__(self):
+        self.calls = Counter()
+
+    def chat_postMessage(self, channel, text):
+        self.calls['chat_postMessage'] += 1
+        return {'ok': True}
+
+class CountingQueue:
+    """SlackQueue.put 호출 수를 세는 래퍼 (전송은 워커 스레드라 호출 시점에 셈)"""
+    def __init__(self, queue):
+        self.queue = queue
+        self.calls = Counter()
+
+    def put(self, channel, message, key=None):
+        self.calls['slack_put'] += 1
+        return self.queue.put(channel, message, key=key)
+
+    def __getattr__(self, name):
+        return getattr(self.queue, name)
+
+def make_candles(tickers, length, seed=0):
+    # 티커별 5분봉 랜덤워크 (재현 가능하도록 시드 고정)
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=length, freq="5min")
+    candles = {}
+    for ticker in tickers:
+        close = 10000 * np.exp(np.cumsum(rng.normal(0, 0.004, length)))
+        candles[ticker] = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close,
+                                        'volume': 1.0, 'value': close}, index=index)
+    return candles
+
+class Environment:
+    """티커 수별 모의 거래소 + 스텁 슬랙으로 main과 같은 객체 구성"""
+    def __init__(self, count, history=400):
+        self.tickers = [f"KRW-C{number:03d}" for number in range(count)]
+        config = Config()
+        config.coin_ticker = self.tickers
+        self.exchange = SimulatedExchange(make_candles(self.tickers, history + 2000), seed=0)
+        # 캔들 버퍼를 채울 만큼 재생 시각을 진행한 뒤 시작
+        self.exchange.advance(history * 5 * 60)
+        self.slack = StubSlack()
+        self.api = API(config=config, upbit=self.exchange, quotation=self.exchange, slack=self.slack)
+        self.api.slack_queue = CountingQueue(self.api.slack_queue)
+        self.notifier = Notifier(self.api)
+        self.trader = Trader(self.exchange, self.slack, self.tickers)
+        self.session = TradingSession(config, self.api, self.notifier, self.trader)
+        self.candle_store = CandleStore(interval="minute5", maxlen=config.candle_buffer_size,
+                                        quotation=self.exchange, clock=self.exchange.now)
+        with quiet():
+            self.session.start()
+            self.main_pass()
+        self.asset_info = self.api.get_asset_info()
+        self.limit_amount = self.api.get_limit_amount()
+
+    def calls(self):
+        return self.exchange.calls + self.api.slack_queue.calls
+
+    def main_pass(self):
+        # main 루프 1회 (10초 간격이므로 현재가 캐시는 만료된 상태로 시작)
+        self.exchange.advance(10)
+        self.api.price_cache.invalidate()
+        asset_info = self.session.refresh_asset_info()
+        run_pass(self.api, self.session, self.trader, self.candle_store, self.tickers, asset_info)
+
+    def asset_info_pass(self):
+        self.api.price_cache.invalidate()
+        self.api.get_asset_info()
+
+    def limit_amount_pass(self):
+        # 매번 잔고 조회와 배분 계산까지 측정 (allocator 캐시를 비우지 않으면 dict 조회만 측정됨)
+        self.api.price_cache.invalidate()
+        self.api.balances.invalidate()
+        self.api.allocator.key = None
+        self.api.get_limit_amount()
+
+    def notifier_pass(self):
+        self.notifier.send_asset_info(self.asset_info, self.limit_amount,
+                                      self.session.rsi_check, self.session.position_tracker)
+
+    def close(self):
+        self.session.order_tracker.stop()
+        self.api.slack_queue.close()
+
+@contextlib.contextmanager
+def quiet():
+    # 로그 외 print 출력이 측정을 방해하지 않도록 stdout 버림
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def measure(function, calls=None, min_time=0.2, min_repeat=3, max_repeat=50):
+    """
+    function 실행 시간(중앙값/최소), 1회 실행 시 최대 추가 메모리, API 호출 수 측정.
+    호출 수와 메모리는 tracemalloc을 켠 별도 1회 실행에서 측정한다.
+    """
+    with quiet():
+        function()  # 워밍업
+        before = Counter(calls()) if calls else Counter()
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        counted = Counter(calls()) - before if calls else Counter()
+
+        times = []
+        started = time.perf_counter()
+        while len(times) < min_repeat or (time.perf_counter() - started < min_time and len(times) < max_repeat):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+    return {
+        'median': statistics.median(times),
+        'min': min(times),
+        'repeat': len(times),
+        'peak_kb': (peak - base) / 1024,
+        # 체결 조회(get_order)는 추적 스레드 타이밍에 따라 달라지므로 비교 대상에서 제외
+        'api_calls': sum(count for name, count in counted.items() if name != 'get_order'),
+        'calls': dict(counted),
+    }
+
+def log_pass(logger, sample=None):
+    # 로그 1,000회 호출 (출력은 로그 스레드에서 처리되므로 호출 스레드 비용만 측정)
+    extra = {'sample': sample} if sample else None
+    for number in range(1000):
+        logger.info("%s 벤치마크 로그 %s", "KRW-BTC", number, extra=extra)
+
+def run_suite(ticker_counts=TICKER_COUNTS, windows=WINDOWS):
+    results = {}
+    # 로그는 main과 같은 큐 방식으로 구성하고 출력만 버림 (슬랙 에러 전송 없음)
+    setup_logging(Config(), stream=open(os.devnull, "w"))
+    logger = get_logger("benchmark")
+    results["log.enqueue/x1000"] = measure(lambda: log_pass(logger))
+    results["log.sampled/x1000"] = measure(lambda: log_pass(logger, sample='benchmark'))
+    candles = make_candles(["KRW-BTC"], max(windows))["KRW-BTC"]
+    for window in windows:
+        df = candles.iloc[-window:]
+        results[f"indicator.calculate_rsi/w{window}"] = measure(lambda: Indicator(df).calculate_rsi())
+
+    for count in ticker_counts:
+        environment = Environment(count)
+        try:
+            closes = environment.candle_store.close_matrix(environment.tickers, count=100)
+            results[f"batch_indicator/t{count}"] = measure(lambda: BatchIndicator(closes, environment.tickers).calculate_rsi())
+            results[f"api.get_asset_info/t{count}"] = measure(environment.asset_info_pass, environment.calls)
+            results[f"api.get_limit_amount/t{count}"] = measure(environment.limit_amount_pass, environment.calls)
+            results[f"notifier.send_asset_info/t{count}"] = measure(environment.notifier_pass, environment.calls)
+            results[f"main.pass/t{count}"] = measure(environment.main_pass, environment.calls)
+        finally:
+            environment.close()
+        print(f"티커 {count}개 완료", file=sys.stderr)
+    return results
+
+def compare(results, baseline, threshold, memory_threshold, min_delta):
+    # 기준 대비 느려짐/메모리 증가/API 호출 증가 항목 목록
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current['median'] > base['median'] * (1 + threshold) and current['median'] - base['median'] > min_delta:
+            regressions.append(f"{name}: 시간 {base['median'] * 1000:.3f}ms -> {current['median'] * 1000:.3f}ms")
+        if current['peak_kb'] > base['peak_kb'] * (1 + memory_threshold) and current['peak_kb'] - base['peak_kb'] > 64:
+            regressions.append(f"{name}: 메모리 {base['peak_kb']:,.0f}KB -> {current['peak_kb']:,.0f}KB")
+        if current['api_calls'] > base['api_calls']:
+            regressions.append(f"{name}: API 호출 {base['api_calls']} -> {current['api_calls']}")
+    return regressions
+
+def print_results(results, baseline):
+    print(f"{'항목':<36} {'중앙값(ms)':>12} {'기준(ms)':>10} {'변화':>8} {'메모리(KB)':>11} {'API':>5}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        change = f"{(current['median'] / base['median'] - 1) * 100:+.1f}%" if base else "-"
+        base_time = f"{base['median'] * 1000:.3f}" if base else "-"
+        print(f"{name:<36} {current['median'] * 1000:>12.3f} {base_time:>10} {change:>8} "
+              f"{current['peak_kb']:>11,.1f} {current['api_calls']:>5}")
+
+def main():
+    parser = argparse.ArgumentParser(description="매매 주요 경로 벤치마크 (모의 거래소/스텁 슬랙)")
+    parser.add_argument("--tickers", default=",".join(str(count) for count in TICKER_COUNTS))
+    parser.add_argument("--windows", default=",".join(str(window) for window in WINDOWS))
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="기준 결과 JSON 경로")
+    parser.add_argument("--save", action="store_true", help="이번 결과를 기준으로 저장")
+    parser.add_argument("--threshold", type=float, default=0.25, help="허용 시간 증가율")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="허용 메모리 증가율")
+    parser.add_argument("--min-delta", type=float, default=0.0002, help="이보다 작은 시간 증가(초)는 무시")
+    args = parser.parse_args()
+
+    results = run_suite([int(count) for count in args.tickers.split(",")],
+                        [int(window) for window in args.windows.split(",")])
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'machine': platform.machine(),
+                'results': results,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"기준 결과 저장: {args.baseline}")
+        return 0
+
+    if not baseline:
+        # 비교 대상이 없으면 성능 저하를 잡을 수 없으므로 실패 처리 (기준 파일은 머신별로 만들어 git에 올리지 않음)
+        print(f"\n기준 결과가 없습니다: {args.baseline}\n같은 머신에서 python benchmark.py --save 로 먼저 기준을 저장하세요.",
+              file=sys.stderr)
+        return 2
+    missing = [name for name in results if name not in baseline]
+    if missing:
+        print(f"\n경고: 기준에 없는 항목은 비교하지 않았습니다 ({len(missing)}개): {', '.join(missing)}", file=sys.stderr)
+
+    regressions = compare(results, baseline, args.threshold, args.memory_threshold, args.min_delta)
+    if regressions:
+        print("\n성능 저하:")
+        for line in regressions:
+            print(f"- {line}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
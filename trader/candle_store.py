@@ -0,0 +1,241 @@
+import os
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+import pyupbit
+from metrics import metrics
+from log import get_logger
+
+logger = get_logger(__name__)
+
+COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'value']
+
+def interval_minutes(interval):
+    # "minute5" -> 5
+    if interval.startswith("minute"):
+        return int(interval[len("minute"):] or 1)
+    if interval == "day":
+        return 1440
+    raise ValueError(f"지원하지 않는 캔들 단위입니다: {interval}")
+
+def now_kst():
+    # 업비트 캔들 시각은 KST 기준 naive datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=9)
+
+class CandleBuffer:
+    """고정 크기 링버퍼에 확정 캔들을 보관 (시각은 int64 ns)"""
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self.times = np.zeros(maxlen, dtype=np.int64)
+        self.data = np.zeros((maxlen, len(COLUMNS)), dtype=float)
+        self.head = 0   # 다음에 쓸 위치
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+
+    def last_time(self):
+        if self.size == 0:
+            return None
+        return int(self.times[(self.head - 1) % self.maxlen])
+
+    def append(self, time_ns, row):
+        self.times[self.head] = time_ns
+        self.data[self.head] = row
+        self.head = (self.head + 1) % self.maxlen
+        self.size = min(self.size + 1, self.maxlen)
+
+    def arrays(self, count=None):
+        # 오래된 순서로 정렬된 (times, data) 반환
+        count = self.size if count is None else min(count, self.size)
+        index = (np.arange(self.head - count, self.head)) % self.maxlen
+        return self.times[index], self.data[index]
+
+    def load(self, times, data):
+        times, data = times[-self.maxlen:], data[-self.maxlen:]
+        count = len(times)
+        self.times[:count] = times
+        self.data[:count] = data
+        self.head = count % self.maxlen
+        self.size = count
+
+class CandleStore:
+    """
+    티커별 캔들 저장소.
+    확정 캔들은 링버퍼와 디스크에 보관하고, 새 캔들이 확정될 때만 그 이후 구간을 조회한다.
+    캔들 경계를 넘지 않은 동안에는 현재가로 진행중 캔들만 갱신하므로 추가 조회가 없다.
+    """
+    def __init__(self, interval="minute5", maxlen=200, cache_dir=None, quotation=pyupbit, clock=None):
+        self.interval = interval
+        self.minutes = interval_minutes(interval)
+        self.maxlen = maxlen
+        self.cache_dir = cache_dir
+        self.quotation = quotation
+        # 현재 시각(KST) 함수, 모의 거래소는 재생 시각 사용
+        self.clock = clock if clock is not None else now_kst
+        self.buffers = {}   # ticker -> CandleBuffer
+        self.live = {}      # ticker -> (time_ns, row) 진행중 캔들
+        self.fetch_count = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _buffer(self, ticker):
+        if ticker not in self.buffers:
+            self.buffers[ticker] = CandleBuffer(self.maxlen)
+            self._load(ticker)
+        return self.buffers[ticker]
+
+    def _interval_ns(self):
+        return self.minutes * 60 * 10**9
+
+    def _missing_count(self, buffer):
+        # 마지막 확정 캔들 이후 지난 캔들 수 (새로 확정된 캔들 + 진행중 캔들)
+        last = buffer.last_time()
+        if last is None:
+            return None
+        elapsed = pd.Timestamp(self.clock()).value - last
+        return int(elapsed // self._interval_ns())
+
+    def needs_fetch(self, ticker):
+        buffer = self._buffer(ticker)
+        live = self.live.get(ticker)
+        if len(buffer) == 0 or live is None:
+            return True
+        return pd.Timestamp(self.clock()).value >= live[0] + self._interval_ns()
+
+    def update(self, ticker, price=None):
+        count = self.plan_fetch(ticker, price)
+        if count is None:
+            return False
+        metrics.inc('api_calls', endpoint='get_ohlcv')
+        with metrics.timer('candle_fetch', ticker):
+            df = self.quotation.get_ohlcv(ticker, interval=self.interval, count=count)
+        self.merge(ticker, df)
+        return True
+
+    def plan_fetch(self, ticker, price=None):
+        """
+        조회가 필요하면 요청할 캔들 수를 반환하고, 필요 없으면 현재가로 진행중 캔들만 갱신 후 None 반환.
+        (비동기 조회 등 외부에서 캔들을 받아올 때 merge()와 함께 사용)
+        """
+        buffer = self._buffer(ticker)
+        if price and not self.needs_fetch(ticker):
+            # 캔들 경계 이전: 현재가로 진행중 캔들만 갱신
+            time_ns, row = self.live[ticker]
+            row[1] = max(row[1], price)
+            row[2] = min(row[2], price)
+            row[3] = price
+            return None
+
+        missing = self._missing_count(buffer)
+        if missing is None or missing + 1 > self.maxlen:
+            buffer.clear()
+            return self.maxlen + 1
+        # 시계 오차에 대비해 마지막 저장 캔들까지 한 개 겹쳐서 조회
+        return max(missing, 1) + 1
+
+    def merge(self, ticker, df):
+        # 조회한 캔들(마지막 행은 진행중 캔들) 중 새로 확정된 캔들만 추가
+        buffer = self._buffer(ticker)
+        self.fetch_count += 1
+        if df is None or len(df) == 0:
+            raise ValueError(f"{ticker} 캔들 조회 실패")
+
+        times = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        data = df[COLUMNS].to_numpy(dtype=float)
+        last = buffer.last_time()
+        appended = 0
+        for time_ns, row in zip(times[:-1], data[:-1]):
+            if last is None or time_ns > last:
+                buffer.append(time_ns, row)
+                appended += 1
+        self.live[ticker] = (int(times[-1]), data[-1].copy())
+        if appended:
+            self._save(ticker)
+        return appended
+
+    def append(self, ticker, time_ns, row):
+        # 외부(웹소켓 등)에서 만든 확정 캔들 추가
+        buffer = self._buffer(ticker)
+        last = buffer.last_time()
+        if last is not None and time_ns <= last:
+            return False
+        buffer.append(time_ns, row)
+        self._save(ticker)
+        return True
+
+    def set_live(self, ticker, time_ns, row):
+        self.live[ticker] = (int(time_ns), row)
+
+    def snapshot(self):
+        # 스냅샷용 {ticker: (times, data, live)} (확정 캔들은 오래된 순서)
+        result = {}
+        for ticker, buffer in self.buffers.items():
+            times, data = buffer.arrays()
+            result[ticker] = (times.copy(), data.copy(), self.live.get(ticker))
+        return result
+
+    def restore(self, candles):
+        # snapshot() 결과로 버퍼 복원 (디스크 캐시/조회 없이 바로 사용)
+        for ticker, (times, data, live) in candles.items():
+            buffer = CandleBuffer(self.maxlen)
+            buffer.load(times, data)
+            self.buffers[ticker] = buffer
+            if live is not None:
+                self.live[ticker] = live
+
+    def last_closed(self, ticker):
+        # 마지막 확정 캔들 시각(ns), 없으면 None
+        return self._buffer(ticker).last_time()
+
+    def get_ohlcv(self, ticker, count=100):
+        # pyupbit.get_ohlcv와 같은 형식 (마지막 행은 진행중 캔들)
+        times, data = self._buffer(ticker).arrays(count - 1)
+        live = self.live.get(ticker)
+        if live is not None:
+            times = np.append(times, live[0])
+            data = np.vstack([data, live[1]])
+        return pd.DataFrame(data, index=pd.to_datetime(times), columns=COLUMNS)
+
+    def closes(self, ticker, count=100):
+        times, data = self._buffer(ticker).arrays(count - 1)
+        closes = data[:, 3]
+        live = self.live.get(ticker)
+        if live is not None:
+            closes = np.append(closes, live[1][3])
+        return closes
+
+    def close_matrix(self, tickers, count=100):
+        # BatchIndicator 입력용 (티커 x 캔들) 종가 행렬
+        closes = [self.closes(ticker, count) for ticker in tickers]
+        length = min(len(close) for close in closes)
+        return np.vstack([close[len(close) - length:] for close in closes])
+
+    def _path(self, ticker):
+        return os.path.join(self.cache_dir, f"{ticker}_{self.interval}.npz")
+
+    def _save(self, ticker):
+        if not self.cache_dir:
+            return
+        times, data = self.buffers[ticker].arrays()
+        path = self._path(ticker)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, times=times, data=data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("캔들 캐시 저장 실패: %s %s", ticker, e)
+
+    def _load(self, ticker):
+        if not self.cache_dir or not os.path.exists(self._path(ticker)):
+            return
+        try:
+            with np.load(self._path(ticker)) as cache:
+                self.buffers[ticker].load(cache["times"], cache["data"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("캔들 캐시 로드 실패: %s %s", ticker, e)
@@ -0,0 +1,46 @@
+from metrics import metrics
+
+class ChangeTracker:
+    """
+    변경 기반 평가 (EVALUATION_MODE=change).
+    티커별로 마지막 평가 때의 상태 키(현재가, 마지막 확정 캔들 시각, 평균매수가, 체결 버전, 원화 잔고, 매매한도)를 기억하고,
+    키가 바뀐 티커만 다시 평가한다. 바뀌지 않은 티커는 주문 판단 결과도 같으므로 건너뛰고 횟수만 센다.
+    (원화 잔고가 키에 있으므로 입금이나 다른 티커 매도로 잔고가 늘면 잔고 부족으로 막혔던 매수도 다시 평가)
+    """
+    def __init__(self):
+        self.keys = {}      # ticker -> 마지막 평가 상태 키
+        self.evaluated = 0
+        self.skipped = 0
+
+    def key(self, ticker, price, candle_store, session):
+        currency = ticker.split('-')[1]
+        asset_info = session.asset_info
+        avg_price = asset_info['coin_info'][currency]['avg_price'] if asset_info else None
+        krw_balance = asset_info['krw_balance'] if asset_info else None
+        return (price, candle_store.last_closed(ticker), avg_price, session.fill_version.get(ticker, 0),
+                krw_balance, session.limit_amount.get(ticker))
+
+    def changed(self, tickers, keys):
+        # 다시 평가할 티커 목록 (나머지는 건너뜀으로 집계)
+        changed = [ticker for ticker in tickers if self.keys.get(ticker) != keys[ticker]]
+        skipped = len(tickers) - len(changed)
+        self.evaluated += len(changed)
+        self.skipped += skipped
+        metrics.inc('evaluations', len(changed))
+        metrics.inc('evaluations_skipped', skipped)
+        return changed
+
+    def store(self, ticker, key):
+        self.keys[ticker] = key
+
+    def invalidate(self, ticker=None):
+        # 다음 패스에서 강제로 다시 평가
+        if ticker is None:
+            self.keys.clear()
+        else:
+            self.keys.pop(ticker, None)
+
+    def stats(self):
+        total = self.evaluated + self.skipped
+        return {'evaluated': self.evaluated, 'skipped': self.skipped,
+                'skip_rate': self.skipped / total if total else 0.0}
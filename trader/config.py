@@ -1,6 +1,19 @@
 import os
 from dotenv import load_dotenv
 
+def parse_weights(text):
+    # "KRW-BTC:2 KRW-ETH:1" -> {'KRW-BTC': 2.0, 'KRW-ETH': 1.0}, 형식이 틀리면 ValueError
+    weights = {}
+    for item in text.replace(",", " ").split():
+        ticker, sep, weight = item.partition(":")
+        if not sep or not ticker:
+            raise ValueError(f"ALLOCATION_WEIGHTS는 '티커:비중' 형식이어야 합니다: {item}")
+        try:
+            weights[ticker] = float(weight)
+        except ValueError:
+            raise ValueError(f"ALLOCATION_WEIGHTS 비중은 숫자여야 합니다: {item}") from None
+    return weights
+
 class Config:
     def __init__(self):
         load_dotenv()
@@ -21,11 +34,74 @@ class Config:
         self.initial_asset = int(os.getenv("INITIAL_ASSET"))
         # 손절 손실률
         self.stop_loss = float(os.getenv("STOP_LOSS"))
+        # 캔들 캐시 (디스크 저장 위치, 티커별 보관 캔들 수)
+        self.candle_cache_dir = os.getenv("CANDLE_CACHE_DIR", "candle_cache")
+        self.candle_buffer_size = int(os.getenv("CANDLE_BUFFER_SIZE", "200"))
+        # 현재가 캐시 유지 시간(초)
+        self.price_cache_ttl = float(os.getenv("PRICE_CACHE_TTL", "2.0"))
+        # 잔고 스냅샷 최대 유지 시간(초), 체결 시에는 즉시 갱신
+        self.balance_cache_ttl = float(os.getenv("BALANCE_CACHE_TTL", "60.0"))
+        # 비동기 모드 동시 요청/주문 처리 수
+        self.async_concurrency = int(os.getenv("ASYNC_CONCURRENCY", "8"))
+        # 슬랙 전송 큐 크기, 메시지 묶음 대기 시간(초)
+        self.slack_queue_size = int(os.getenv("SLACK_QUEUE_SIZE", "1000"))
+        self.slack_batch_window = float(os.getenv("SLACK_BATCH_WINDOW", "1.0"))
+        # 시세 수신 방식 (rest: 10초 폴링, stream: 웹소켓)
+        self.market_data_mode = os.getenv("MARKET_DATA_MODE", "rest")
+        self.websocket_url = os.getenv("UPBIT_WS_URL", "wss://api.upbit.com/websocket/v1")
+        # 거래소 (upbit: 실거래, sim: 캔들 재생 모의 거래소)
+        self.exchange_backend = os.getenv("EXCHANGE_BACKEND", "upbit")
+        # 모의 거래소 설정 (캔들 파일 위치, 초기 원화, 재생 배속, 호출 지연, 분할 체결 수/간격, 오류 확률)
+        self.sim_data_dir = os.getenv("SIM_DATA_DIR", "sim_data")
+        self.sim_initial_krw = float(os.getenv("SIM_INITIAL_KRW", "1000000"))
+        self.sim_speed = float(os.getenv("SIM_SPEED", "1.0"))
+        self.sim_latency = float(os.getenv("SIM_LATENCY", "0.0"))
+        self.sim_partial_fills = int(os.getenv("SIM_PARTIAL_FILLS", "1"))
+        self.sim_fill_delay = float(os.getenv("SIM_FILL_DELAY", "0.0"))
+        self.sim_error_rate = float(os.getenv("SIM_ERROR_RATE", "0.0"))
+        # Prometheus 메트릭 엔드포인트 (포트 0이면 사용 안 함)
+        self.metrics_port = int(os.getenv("METRICS_PORT", "0"))
+        self.metrics_host = os.getenv("METRICS_HOST", "127.0.0.1")
+        # 업비트 HTTP 연결 (커넥션 풀 크기, 요청 제한 시간(초), 그룹별로 남겨둘 초당 요청 수)
+        self.http_pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
+        self.http_timeout = float(os.getenv("HTTP_TIMEOUT", "5.0"))
+        self.rate_limit_reserve = int(os.getenv("RATE_LIMIT_RESERVE", "1"))
+        # 요청 스케줄러 초당 요청 수 (주문 > 주문/잔고 조회 > 시세 순서), 시세 요청 최대 대기(초, 넘으면 버림)
+        self.order_rate = float(os.getenv("ORDER_RATE", "8"))
+        self.account_rate = float(os.getenv("ACCOUNT_RATE", "30"))
+        self.quotation_rate = float(os.getenv("QUOTATION_RATE", "10"))
+        self.quotation_max_wait = float(os.getenv("QUOTATION_MAX_WAIT", "5.0"))
+        # 평가 방식 (always: 매 패스 전체 티커 평가, change: 현재가/확정 캔들/포지션이 바뀐 티커만 평가)
+        self.evaluation_mode = os.getenv("EVALUATION_MODE", "always")
+        # 재시작용 스냅샷 파일 (빈 값이면 사용 안 함), 저장 주기(초)
+        self.snapshot_path = os.getenv("SNAPSHOT_PATH", "trader_snapshot.pkl")
+        self.snapshot_interval = float(os.getenv("SNAPSHOT_INTERVAL", "60"))
+        # 기본 캔들 단위, 기본 캔들로 직접 만들 상위 분봉 (예: "15,60", 빈 값이면 사용 안 함)
+        self.candle_interval = os.getenv("CANDLE_INTERVAL", "minute5")
+        self.candle_timeframes = [int(minutes) for minutes in os.getenv("CANDLE_TIMEFRAMES", "").split(",") if minutes.strip()]
+        # 샤드 실행 모드(sharded.py) 워커 프로세스 수 (COIN_TICKER=KRW-ALL이면 원화 마켓 전체)
+        self.shard_workers = int(os.getenv("SHARD_WORKERS", str(os.cpu_count() or 1)))
+        # 코인별 목표 비중 (예: "KRW-BTC:2 KRW-ETH:1", 빈 값이면 균등 비중, 적지 않은 코인은 매수 안 함)
+        self.allocation_weights = parse_weights(os.getenv("ALLOCATION_WEIGHTS", ""))
+        # 호가창 기준 최대 예상 슬리피지(bps, 최우선 호가 대비, 0이면 사용 안 함), 호가창 최대 유지 시간(초)
+        self.orderbook_max_slippage_bps = float(os.getenv("ORDERBOOK_MAX_SLIPPAGE_BPS", "0"))
+        self.orderbook_max_age = float(os.getenv("ORDERBOOK_MAX_AGE", "10.0"))
+        # 매매 저널 위치 (빈 값이면 사용 안 함), 파일 기록 주기(초), 자산 스냅샷 기록 간격(초)
+        self.journal_dir = os.getenv("JOURNAL_DIR", "journal")
+        self.journal_flush_interval = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "30"))
+        self.journal_asset_interval = float(os.getenv("JOURNAL_ASSET_INTERVAL", "60"))
+        # 로그 레벨, 출력 형식(text 또는 json), "신호 없음" 등 반복 로그 출력 간격(초), 같은 에러 슬랙 재전송 간격(초)
+        self.log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.log_format = os.getenv("LOG_FORMAT", "text")
+        self.log_sample_interval = float(os.getenv("LOG_SAMPLE_INTERVAL", "300"))
+        self.log_error_dedup_window = float(os.getenv("LOG_ERROR_DEDUP_WINDOW", "300"))
         # 테스트 여부
         self.verify()
 
     def verify(self):
-        if not self.upbit_access_key or not self.upbit_secret_key:
+        if self.exchange_backend not in ("upbit", "sim"):
+            raise ValueError("EXCHANGE_BACKEND는 upbit 또는 sim이어야 합니다")
+        if self.exchange_backend == "upbit" and (not self.upbit_access_key or not self.upbit_secret_key):
             raise ValueError("UPBIT_ACCESS_KEY 또는 UPBIT_SECRET_KEY가 설정되지 않았습니다")
         if not self.slack_api_token:
             raise ValueError("SLACK_API_TOKEN이 설정되지 않았습니다")
@@ -41,6 +117,30 @@ class Config:
             raise ValueError("INITIAL_ASSET가 설정되지 않았습니다")
         if not self.stop_loss:
             raise ValueError("STOP_LOSS가 설정되지 않았습니다")
+        if self.market_data_mode not in ("rest", "stream"):
+            raise ValueError("MARKET_DATA_MODE는 rest 또는 stream이어야 합니다")
+        if self.evaluation_mode not in ("always", "change"):
+            raise ValueError("EVALUATION_MODE는 always 또는 change여야 합니다")
+        if not all(0 < weight < float('inf') for weight in self.allocation_weights.values()):
+            raise ValueError("ALLOCATION_WEIGHTS 비중은 0보다 커야 합니다")
+        # KRW-ALL(샤드 모드 원화 마켓 전체)은 실행 시 티커 목록이 정해지므로 확인하지 않음
+        unknown = [ticker for ticker in self.allocation_weights if ticker not in self.coin_ticker]
+        if unknown and self.coin_ticker != ["KRW-ALL"]:
+            raise ValueError(f"ALLOCATION_WEIGHTS에 COIN_TICKER에 없는 티커가 있습니다: {', '.join(unknown)}")
+        if not self.candle_interval.startswith("minute"):
+            raise ValueError("CANDLE_INTERVAL은 minute1, minute3, minute5 등 분봉이어야 합니다")
+        base_minutes = int(self.candle_interval[len("minute"):] or 1)
+        if any(minutes % base_minutes for minutes in self.candle_timeframes):
+            raise ValueError(f"CANDLE_TIMEFRAMES는 기본 캔들({base_minutes}분)의 배수여야 합니다")
+        if base_minutes < 5 and 5 % base_minutes:
+            # 매매 신호는 5분봉 기준 (더 짧은 기본 캔들은 5분봉으로 집계해 계산)
+            raise ValueError("5분보다 짧은 CANDLE_INTERVAL은 5분봉으로 집계할 수 있는 minute1만 사용할 수 있습니다")
+        if self.exchange_backend == "sim" and self.market_data_mode == "stream":
+            raise ValueError("모의 거래소(sim)는 MARKET_DATA_MODE=rest만 지원합니다")
+        if self.log_format not in ("text", "json"):
+            raise ValueError("LOG_FORMAT은 text 또는 json이어야 합니다")
+        if self.log_level not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+            raise ValueError("LOG_LEVEL은 DEBUG, INFO, WARNING, ERROR, CRITICAL 중 하나여야 합니다")
 
 if __name__ == "__main__":
     print("config 테스트")
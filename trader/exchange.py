@@ -0,0 +1,251 @@
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+import numpy as np
+import pandas as pd
+from backtest import load_candles
+from candle_store import COLUMNS, interval_minutes
+
+class SimulatedExchangeError(Exception):
+    pass
+
+class SimulatedExchange:
+    """
+    pyupbit.Upbit(주문/잔고)와 pyupbit 시세 함수(get_current_price, get_ohlcv)를 흉내내는 메모리 거래소.
+    티커별 과거 캔들을 재생하며, 현재가는 재생 시각이 속한 캔들의 종가다.
+    - speed: 실제 1초당 재생 시간(초). 0이면 advance()로만 시각이 바뀜
+    - latency: 호출당 지연(초, 0.5~1.5배 무작위)
+    - partial_fills / fill_delay: 주문을 여러 번에 나눠 fill_delay(초) 간격으로 체결
+    - error_rate: 호출이 SimulatedExchangeError로 실패할 확률
+    """
+    def __init__(self, candles, initial_krw=1_000_000, fee=0.0005, interval="minute5", speed=0.0,
+                 start=None, latency=0.0, partial_fills=1, fill_delay=0.0, error_rate=0.0, seed=None):
+        self.interval = interval
+        self.minutes = interval_minutes(interval)
+        self.fee = fee
+        self.latency = latency
+        self.partial_fills = max(int(partial_fills), 1)
+        self.fill_delay = fill_delay
+        self.error_rate = error_rate
+        self.speed = speed
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.calls = Counter()
+
+        self.times = {}
+        self.data = {}
+        for ticker, df in candles.items():
+            df = df.sort_index()
+            frame = pd.DataFrame({column: df[column] if column in df else df['close'] for column in COLUMNS})
+            self.times[ticker] = df.index.values.astype('datetime64[ns]').astype(np.int64)
+            self.data[ticker] = frame.to_numpy(dtype=float)
+
+        first = max(times[0] for times in self.times.values())
+        self.start_ns = int(pd.Timestamp(start).value) if start is not None else int(first)
+        self.end_ns = int(min(times[-1] for times in self.times.values()))
+        self.offset_ns = 0
+        self.wall_start = time.monotonic()
+
+        self.balances = {'KRW': {'balance': float(initial_krw), 'locked': 0.0, 'avg_buy_price': 0.0}}
+        self.orders = {}
+        self.scheduled = []  # (체결 시각, uuid, 체결 수량/금액)
+
+    @classmethod
+    def from_directory(cls, path, tickers, **kwargs):
+        # {path}/{ticker}.csv 또는 .parquet 파일로 생성
+        candles = {}
+        for ticker in tickers:
+            for extension in (".parquet", ".csv"):
+                file_path = os.path.join(path, f"{ticker}{extension}")
+                if os.path.exists(file_path):
+                    candles[ticker] = load_candles(file_path)
+                    break
+            else:
+                raise FileNotFoundError(f"{ticker} 캔들 파일이 없습니다: {path}")
+        return cls(candles, **kwargs)
+
+# 재생 시각
+    def now_ns(self):
+        elapsed = (time.monotonic() - self.wall_start) * self.speed * 10**9
+        return min(self.start_ns + self.offset_ns + int(elapsed), self.end_ns)
+
+    def now(self):
+        # CandleStore 등에서 사용하는 KST naive datetime
+        return pd.Timestamp(self.now_ns()).to_pydatetime()
+
+    def advance(self, seconds=None):
+        # 재생 시각을 seconds(기본 캔들 1개)만큼 진행
+        seconds = self.minutes * 60 if seconds is None else seconds
+        with self.lock:
+            self.offset_ns += int(seconds * 10**9)
+
+    def finished(self):
+        return self.now_ns() >= self.end_ns
+
+    def _cursor(self, ticker):
+        if ticker not in self.times:
+            raise SimulatedExchangeError(f"알 수 없는 티커입니다: {ticker}")
+        return int(np.searchsorted(self.times[ticker], self.now_ns(), side='right')) - 1
+
+    def _price(self, ticker):
+        cursor = self._cursor(ticker)
+        if cursor < 0:
+            raise SimulatedExchangeError(f"{ticker} 재생 시각 이전 데이터가 없습니다")
+        return float(self.data[ticker][cursor, 3])
+
+    def _call(self, method):
+        self.calls[method] += 1
+        if self.latency > 0:
+            time.sleep(self.latency * self.random.uniform(0.5, 1.5))
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            raise SimulatedExchangeError(f"simulated error: {method}")
+        self._settle()
+
+# 시세 (pyupbit 모듈 함수와 같은 형식)
+    def get_current_price(self, ticker="KRW-BTC", limit_info=False, verbose=False):
+        self._call('get_current_price')
+        if isinstance(ticker, list) and len(ticker) > 1:
+            return {item: self._price(item) for item in ticker}
+        if isinstance(ticker, list):
+            ticker = ticker[0]
+        return self._price(ticker)
+
+    def get_ohlcv(self, ticker="KRW-BTC", interval="day", count=200, to=None, period=0.1):
+        self._call('get_ohlcv')
+        if interval_minutes(interval) != self.minutes:
+            raise SimulatedExchangeError(f"재생 데이터는 {self.interval} 캔들만 제공합니다: {interval}")
+        cursor = self._cursor(ticker)
+        start = max(cursor + 1 - count, 0)
+        times = self.times[ticker][start:cursor + 1]
+        return pd.DataFrame(self.data[ticker][start:cursor + 1], index=pd.to_datetime(times), columns=COLUMNS)
+
+# 잔고/주문 (pyupbit.Upbit와 같은 형식)
+    def get_balances(self):
+        self._call('get_balances')
+        with self.lock:
+            return [{
+                'currency': currency,
+                'balance': f"{info['balance']:.8f}",
+                'locked': f"{info['locked']:.8f}",
+                'avg_buy_price': f"{info['avg_buy_price']:.8f}",
+                'avg_buy_price_modified': False,
+                'unit_currency': 'KRW',
+            } for currency, info in self.balances.items() if currency == 'KRW' or info['balance'] + info['locked'] > 0]
+
+    def buy_market_order(self, ticker, price):
+        self._call('buy_market_order')
+        with self.lock:
+            krw = self.balances['KRW']
+            fee = price * self.fee
+            if krw['balance'] < price + fee:
+                return {'error': {'name': 'insufficient_funds_bid', 'message': '주문가능한 금액(KRW)이 부족합니다.'}}
+            krw['balance'] -= price + fee
+            krw['locked'] += price + fee
+            return self._submit(ticker, 'bid', 'price', price)
+
+    def sell_market_order(self, ticker, volume):
+        self._call('sell_market_order')
+        currency = ticker.split('-')[1]
+        volume = round(volume, 8)
+        with self.lock:
+            coin = self.balances.get(currency)
+            if coin is None or coin['balance'] < volume or volume <= 0:
+                return {'error': {'name': 'insufficient_funds_ask', 'message': '주문가능한 금액(' + currency + ')이 부족합니다.'}}
+            coin['balance'] = round(coin['balance'] - volume, 8)
+            coin['locked'] = round(coin['locked'] + volume, 8)
+            return self._submit(ticker, 'ask', 'market', volume)
+
+    def get_order(self, ticker_or_uuid, state='wait', page=1, limit=100, contain_req=False):
+        self._call('get_order')
+        with self.lock:
+            order = self.orders.get(ticker_or_uuid)
+            if order is None:
+                return {'error': {'name': 'order_not_found', 'message': '주문을 찾지 못했습니다.'}}
+            return self._order_view(order)
+
+    def _submit(self, ticker, side, ord_type, amount):
+        order_id = str(uuid.uuid4())
+        now = time.monotonic()
+        piece = amount / self.partial_fills
+        order = {
+            'uuid': order_id, 'side': side, 'ord_type': ord_type, 'market': ticker, 'state': 'wait',
+            'amount': amount, 'created_at': self.now().isoformat(), 'trades': [], 'paid_fee': 0.0,
+        }
+        self.orders[order_id] = order
+        for k in range(self.partial_fills):
+            self.scheduled.append((now + k * self.fill_delay, order_id, piece))
+        self._settle()
+        return self._order_view(order)
+
+    def _settle(self):
+        # 체결 시각이 된 주문 조각 처리
+        with self.lock:
+            now = time.monotonic()
+            due = [item for item in self.scheduled if item[0] <= now]
+            if not due:
+                return
+            self.scheduled = [item for item in self.scheduled if item[0] > now]
+            for _, order_id, piece in due:
+                self._fill(self.orders[order_id], piece)
+
+    def _fill(self, order, piece):
+        ticker = order['market']
+        currency = ticker.split('-')[1]
+        price = self._price(ticker)
+        krw = self.balances['KRW']
+        coin = self.balances.setdefault(currency, {'balance': 0.0, 'locked': 0.0, 'avg_buy_price': 0.0})
+        if order['side'] == 'bid':
+            volume = round(piece / price, 8)
+            fee = piece * self.fee
+            krw['locked'] -= piece + fee
+            total = coin['balance'] + coin['locked'] + volume
+            coin['avg_buy_price'] = ((coin['balance'] + coin['locked']) * coin['avg_buy_price'] + piece) / total
+            coin['balance'] = round(coin['balance'] + volume, 8)
+        else:
+            volume = piece
+            fee = piece * price * self.fee
+            coin['locked'] = round(coin['locked'] - volume, 8)
+            krw['balance'] += volume * price - fee
+            if coin['balance'] + coin['locked'] <= 0:
+                coin['avg_buy_price'] = 0.0
+        order['paid_fee'] += fee
+        order['trades'].append({'market': ticker, 'uuid': str(uuid.uuid4()), 'price': str(price),
+                                'volume': f"{volume:.8f}", 'funds': str(volume * price),
+                                'side': order['side'], 'created_at': self.now().isoformat()})
+        if len(order['trades']) == self.partial_fills:
+            order['state'] = 'done' if order['side'] == 'ask' else 'cancel'
+
+    def _order_view(self, order):
+        executed = sum(float(trade['volume']) for trade in order['trades'])
+        return {
+            'uuid': order['uuid'], 'side': order['side'], 'ord_type': order['ord_type'],
+            'market': order['market'], 'state': order['state'], 'created_at': order['created_at'],
+            'price': str(order['amount']) if order['side'] == 'bid' else None,
+            'volume': str(order['amount']) if order['side'] == 'ask' else None,
+            'executed_volume': f"{executed:.8f}", 'paid_fee': str(order['paid_fee']),
+            'trades_count': len(order['trades']), 'trades': list(order['trades']),
+        }
+
+def create_exchange(config):
+    """
+    설정에 맞는 (주문/잔고 클라이언트, 시세 조회 모듈) 반환.
+    upbit: (UpbitExchange, UpbitQuotation) 커넥션 풀을 공유, sim: (SimulatedExchange, 같은 객체)
+    """
+    if config.exchange_backend == "sim":
+        exchange = SimulatedExchange.from_directory(
+            config.sim_data_dir, config.coin_ticker, interval=config.candle_interval,
+            initial_krw=config.sim_initial_krw, speed=config.sim_speed, latency=config.sim_latency,
+            partial_fills=config.sim_partial_fills, fill_delay=config.sim_fill_delay,
+            error_rate=config.sim_error_rate)
+        return exchange, exchange
+    from transport import Transport, UpbitExchange, UpbitQuotation
+    from scheduler import RequestScheduler, ORDER, ACCOUNT, QUOTATION
+    scheduler = RequestScheduler(
+        rates={ORDER: config.order_rate, ACCOUNT: config.account_rate, QUOTATION: config.quotation_rate},
+        max_wait={QUOTATION: config.quotation_max_wait})
+    transport = Transport(pool_size=config.http_pool_size, timeout=config.http_timeout,
+                          reserve=config.rate_limit_reserve, scheduler=scheduler)
+    return UpbitExchange(config.upbit_access_key, config.upbit_secret_key, transport), UpbitQuotation(transport)
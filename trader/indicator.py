@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 class Indicator:
@@ -36,18 +37,123 @@ class Indicator:
 
         return rsi.iloc[-1], rsi.iloc[-2]
 
-    def get_new_rsi(self):
-        rsi, previous_rsi = self.calculate_rsi()
-        # 50 이상 rsi 반전
-        if rsi >= 50:
-            rsi = 100 - rsi
-        if rsi <= 20:
-            return 20
-        elif rsi <= 25:
-            return 25
-        elif rsi <= 30:
-            return 30
-        elif rsi <= 35:
-            return 35
-        else:
-            return 50
\ No newline at end of file
+    def get_new_rsi(self, rsi=None):
+        # 이미 계산된 rsi가 있으면 재계산하지 않음
+        if rsi is None:
+            rsi, previous_rsi = self.calculate_rsi()
+        return bucket_rsi(rsi)
+
+# rsi 정규화 구간 (오름차순)
+RSI_LEVELS = (20, 25, 30, 35)
+
+def bucket_rsi(rsi, levels=RSI_LEVELS):
+    # 50 이상 rsi 반전
+    if rsi >= 50:
+        rsi = 100 - rsi
+    for level in levels:
+        if rsi <= level:
+            return level
+    return 50
+
+def rsi_from_averages(avg_gain, avg_loss):
+    # calculate_rsi의 pandas 나눗셈과 동일하게 처리 (x/0 = inf -> 100, 0/0 = nan)
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else float('nan')
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+class BatchIndicator:
+    """
+    (티커 x 캔들) 종가 행렬로 모든 티커의 rsi를 한 번에 계산한다.
+    각 행의 마지막 열은 진행중 캔들이며, 반환값은 행별 Indicator.calculate_rsi 결과와 같다.
+    """
+    def __init__(self, closes, tickers=None, period=14):
+        self.closes = np.asarray(closes, dtype=float)
+        if self.closes.ndim == 1:
+            self.closes = self.closes[np.newaxis, :]
+        self.tickers = list(tickers) if tickers is not None else None
+        self.period = period
+
+    def calculate_rsi(self):
+        n = self.period
+        if self.closes.shape[1] <= n:
+            raise ValueError(f"rsi 계산에 필요한 캔들 수가 부족합니다: {self.closes.shape[1]} <= {n}")
+
+        delta = np.diff(self.closes, axis=1)
+        gains = np.clip(delta, 0, None)
+        losses = np.clip(-delta, 0, None)
+
+        # 첫 번째 평균값 (SMA, diff가 없는 첫 캔들을 제외한 n-1개)
+        seed_gain = gains[:, :n - 1].mean(axis=1)
+        seed_loss = losses[:, :n - 1].mean(axis=1)
+
+        # 와일더 평활을 가중합으로 전개: avg_K = a^K * seed + sum(a^(K-1-j) * x_j) / n
+        gains = gains[:, n - 1:]
+        losses = losses[:, n - 1:]
+        k = gains.shape[1]
+        a = (n - 1) / n
+        weights = a ** np.arange(k - 1, -1, -1) / n
+
+        avg_gain = a ** k * seed_gain + gains @ weights
+        avg_loss = a ** k * seed_loss + losses @ weights
+        prev_avg_gain = a ** (k - 1) * seed_gain + gains[:, :-1] @ weights[1:]
+        prev_avg_loss = a ** (k - 1) * seed_loss + losses[:, :-1] @ weights[1:]
+
+        return rsi_from_average_arrays(avg_gain, avg_loss), rsi_from_average_arrays(prev_avg_gain, prev_avg_loss)
+
+    def get_new_rsi(self, rsi=None):
+        if rsi is None:
+            rsi, previous_rsi = self.calculate_rsi()
+        return bucket_rsi_array(rsi)
+
+def rsi_from_average_arrays(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+def bucket_rsi_array(rsi, levels=RSI_LEVELS):
+    # bucket_rsi의 벡터화 버전 (nan은 50)
+    rsi = np.asarray(rsi, dtype=float)
+    rsi = np.where(rsi >= 50, 100 - rsi, rsi)
+    return np.select([rsi <= level for level in levels], list(levels), default=50)
+
+def wilder_rsi_series(closes, period=14, block=256):
+    """
+    전체 구간 rsi 시계열 (calculate_rsi와 같은 방식, 앞의 period-1개는 nan).
+    와일더 평활을 block 단위 행렬곱으로 계산하므로 긴 시계열(1분봉 1년 등)도 빠르게 처리한다.
+    closes가 2차원이면 행(티커)별로 계산.
+    """
+    closes = np.asarray(closes, dtype=float)
+    squeeze = closes.ndim == 1
+    if squeeze:
+        closes = closes[np.newaxis, :]
+    n = period
+    rows, length = closes.shape
+    rsi = np.full((rows, length), np.nan)
+    if length < n:
+        return rsi[0] if squeeze else rsi
+
+    delta = np.diff(closes, axis=1)
+    gains = np.clip(delta, 0, None)
+    losses = -np.clip(delta, None, 0)
+    avg_gain = np.empty((rows, length - n + 1))
+    avg_loss = np.empty((rows, length - n + 1))
+    avg_gain[:, 0] = gains[:, :n - 1].mean(axis=1)
+    avg_loss[:, 0] = losses[:, :n - 1].mean(axis=1)
+
+    # block 내부: out[k] = a^(k+1) * carry + sum(a^(k-j) * x_j) / n
+    a = (n - 1) / n
+    steps = np.arange(block)
+    weights = np.tril(a ** (steps[:, None] - steps[None, :]).clip(min=0)) / n
+    carry_weights = a ** (steps + 1)
+    gains = gains[:, n - 1:]
+    losses = losses[:, n - 1:]
+    for start in range(0, gains.shape[1], block):
+        size = min(block, gains.shape[1] - start)
+        w = weights[:size, :size]
+        c = carry_weights[:size]
+        avg_gain[:, start + 1:start + 1 + size] = avg_gain[:, start, None] * c + gains[:, start:start + size] @ w.T
+        avg_loss[:, start + 1:start + 1 + size] = avg_loss[:, start, None] * c + losses[:, start:start + size] @ w.T
+
+    rsi[:, n - 1:] = rsi_from_average_arrays(avg_gain, avg_loss)
+    return rsi[0] if squeeze else rsi
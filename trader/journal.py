@@ -0,0 +1,273 @@
+import atexit
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from log import get_logger
+
+logger = get_logger(__name__)
+
+# 테이블별 컬럼 (이름, dtype, 기본값), 모든 테이블 첫 컬럼은 time(UTC epoch ns)
+SCHEMAS = {
+    'fill': [('ticker', 'U', ''), ('side', 'U', ''), ('kind', 'U', ''), ('state', 'U', ''),
+             ('volume', 'f8', 0.0), ('funds', 'f8', 0.0), ('avg_price', 'f8', 0.0), ('fee', 'f8', 0.0),
+             ('rsi', 'f8', np.nan), ('uuid', 'U', '')],
+    'order': [('ticker', 'U', ''), ('side', 'U', ''), ('kind', 'U', ''), ('event', 'U', ''),
+              ('amount', 'f8', 0.0), ('price', 'f8', 0.0), ('uuid', 'U', '')],
+    'signal': [('ticker', 'U', ''), ('rsi', 'f8', np.nan), ('previous_rsi', 'f8', np.nan), ('new_rsi', 'i8', 0),
+               ('buy', '?', False), ('sell', '?', False), ('price', 'f8', 0.0)],
+    'equity': [('krw_balance', 'f8', 0.0), ('total_asset', 'f8', 0.0)],
+    'position': [('ticker', 'U', ''), ('balance', 'f8', 0.0), ('avg_price', 'f8', 0.0), ('price', 'f8', 0.0),
+                 ('value', 'f8', 0.0), ('profit_rate', 'f8', 0.0)],
+}
+DAY_NS = 24 * 60 * 60 * 10**9
+KST_OFFSET_NS = 9 * 60 * 60 * 10**9
+
+def to_ns(value):
+    # datetime/문자열/ns -> UTC epoch ns (시간대 없는 값은 KST로 해석)
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('Asia/Seoul')
+    return timestamp.value
+
+def kst_day(time_ns):
+    return (time_ns + KST_OFFSET_NS) // DAY_NS
+
+def parse_segment(name):
+    # "{first_ns}_{last_ns}.npz" 또는 일 단위로 합친 "{first_ns}_{last_ns}_day.npz" -> (first, last, 합친 파일 여부)
+    parts = name[:-len(".npz")].split("_")
+    return int(parts[0]), int(parts[1]), len(parts) == 3
+
+class Journal:
+    """
+    매매 기록 저널 (체결, 주문 상태, 매매 신호, 자산/포지션 스냅샷).
+    record()는 메모리 버퍼에 추가만 하고 바로 반환하며, 백그라운드 스레드가 flush_interval(초)마다
+    테이블별 컬럼 배열로 묶어 세그먼트 파일(directory/table/{처음}_{마지막}.npz)을 새로 쓴다 (기존 파일은 수정 안 함).
+    지난 날짜의 세그먼트는 하루 단위 파일로 합친다. 조회는 JournalReader.
+    """
+    def __init__(self, directory, flush_interval=30.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buffers = {table: [] for table in SCHEMAS}
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.records = 0
+        self.segments = 0
+        self.closed = False
+        self.stop_event = threading.Event()
+        for table in SCHEMAS:
+            os.makedirs(os.path.join(directory, table), exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def record(self, table, time_ns=None, **fields):
+        row = (time_ns if time_ns is not None else time.time_ns(),
+               tuple(fields.get(name, default) for name, _, default in SCHEMAS[table]))
+        with self.lock:
+            self.buffers[table].append(row)
+            self.records += 1
+
+    def record_fill(self, ticker, kind, rsi, event):
+        self.record('fill', ticker=ticker, side=event['side'], kind=kind, state=event['state'],
+                    volume=event['volume'], funds=event['funds'], avg_price=event['avg_price'],
+                    fee=event['paid_fee'], rsi=rsi if rsi is not None else np.nan, uuid=event['uuid'])
+
+    def record_assets(self, asset_info):
+        # get_asset_info 결과 1건 -> equity 1행 + 코인별 position 행
+        now = time.time_ns()
+        self.record('equity', now, krw_balance=asset_info['krw_balance'], total_asset=asset_info['total_asset'])
+        for currency, info in asset_info['coin_info'].items():
+            self.record('position', now, ticker=f"KRW-{currency}", balance=info['balance'],
+                        avg_price=info['avg_price'], price=info['current_price'], value=info['value'],
+                        profit_rate=info['profit_rate'])
+
+    def flush(self):
+        # 버퍼를 비우고 테이블별 세그먼트 파일 1개씩 기록
+        with self.lock:
+            buffers, self.buffers = self.buffers, {table: [] for table in SCHEMAS}
+        with self.write_lock:
+            for table, rows in buffers.items():
+                if rows:
+                    self._write(table, rows)
+
+    def _write(self, table, rows):
+        rows.sort(key=lambda row: row[0])
+        columns = {'time': np.array([row[0] for row in rows], dtype=np.int64)}
+        for index, (name, dtype, _) in enumerate(SCHEMAS[table]):
+            values = [row[1][index] for row in rows]
+            columns[name] = np.array(values) if dtype == 'U' else np.array(values, dtype=dtype)
+        path = os.path.join(self.directory, table, f"{columns['time'][0]}_{columns['time'][-1]}.npz")
+        self._save(path, columns)
+        self.segments += 1
+
+    def _save(self, path, columns):
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, **columns)
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            logger.warning("저널 기록 실패: %s %s", path, e)
+            return False
+
+    def compact(self, before_day=None):
+        """
+        before_day(KST 일 번호) 이전 날짜의 세그먼트를 하루 1개 파일로 합친다.
+        합친 파일을 먼저 쓰고 원본을 지우며, 지우기 전에 중단되면 조회 시 합친 파일만 사용한다.
+        """
+        before_day = kst_day(time.time_ns()) if before_day is None else before_day
+        with self.write_lock:
+            for table in SCHEMAS:
+                folder = os.path.join(self.directory, table)
+                days = {}
+                for name in os.listdir(folder):
+                    if not name.endswith(".npz"):
+                        continue
+                    first, last, merged = parse_segment(name)
+                    day = kst_day(first)
+                    if day < before_day and kst_day(last) == day:
+                        days.setdefault(day, []).append((first, last, merged, name))
+                for day, segments in days.items():
+                    merged_ranges = [(first, last) for first, last, merged, _ in segments if merged]
+                    if merged_ranges:
+                        # 합친 뒤 지우지 못한 원본만 삭제
+                        removable = [name for first, last, merged, name in segments if not merged and
+                                     any(low <= first and last <= high for low, high in merged_ranges)]
+                    else:
+                        removable = [name for _, _, _, name in sorted(segments)]
+                        columns = load_segments(folder, removable)
+                        order = np.argsort(columns['time'], kind='stable')
+                        columns = {name: values[order] for name, values in columns.items()}
+                        path = os.path.join(folder, f"{columns['time'][0]}_{columns['time'][-1]}_day.npz")
+                        if not self._save(path, columns):
+                            continue
+                    for name in removable:
+                        os.remove(os.path.join(folder, name))
+
+    def _run(self):
+        compacted_day = None
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+                today = kst_day(time.time_ns())
+                if compacted_day != today:
+                    self.compact(today)
+                    compacted_day = today
+            except Exception as e:
+                logger.warning("저널 기록 중 오류: %s", e)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.stop_event.set()
+        self.flush()
+
+    def reader(self):
+        # 아직 기록하지 않은 버퍼까지 반영한 조회 객체
+        self.flush()
+        return JournalReader(self.directory)
+
+def load_segments(folder, names):
+    parts = []
+    for name in names:
+        with np.load(os.path.join(folder, name)) as segment:
+            parts.append({key: segment[key] for key in segment.files})
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+class JournalReader:
+    """
+    저널 조회. 파일 이름의 시각 범위로 필요한 세그먼트만 읽고 티커/시각으로 거른 컬럼 배열을 반환한다.
+    start/end는 datetime, 문자열(시간대 없으면 KST) 또는 UTC epoch ns.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def load(self, table, start=None, end=None, tickers=None):
+        start, end = to_ns(start), to_ns(end)
+        folder = os.path.join(self.directory, table)
+        segments = []
+        for name in os.listdir(folder) if os.path.isdir(folder) else []:
+            if not name.endswith(".npz"):
+                continue
+            first, last, merged = parse_segment(name)
+            if (start is None or last >= start) and (end is None or first < end):
+                segments.append((first, last, merged, name))
+        # 합치고 아직 지우지 못한 원본은 제외
+        merged_ranges = [(first, last) for first, last, merged, _ in segments if merged]
+        names = [name for first, last, merged, name in segments
+                 if merged or not any(low <= first and last <= high for low, high in merged_ranges)]
+        if not names:
+            return {'time': np.zeros(0, dtype=np.int64)} | {
+                name: np.zeros(0, dtype='U1' if dtype == 'U' else dtype) for name, dtype, _ in SCHEMAS[table]}
+        columns = load_segments(folder, sorted(names))
+        mask = np.ones(len(columns['time']), dtype=bool)
+        if start is not None:
+            mask &= columns['time'] >= start
+        if end is not None:
+            mask &= columns['time'] < end
+        if tickers is not None and 'ticker' in columns:
+            mask &= np.isin(columns['ticker'], [tickers] if isinstance(tickers, str) else list(tickers))
+        order = np.argsort(columns['time'][mask], kind='stable')
+        return {name: values[mask][order] for name, values in columns.items()}
+
+    def frame(self, table, start=None, end=None, tickers=None):
+        columns = self.load(table, start, end, tickers)
+        index = pd.to_datetime(columns.pop('time'), utc=True).tz_convert('Asia/Seoul')
+        return pd.DataFrame(columns, index=index)
+
+    def fees(self, start=None, end=None, tickers=None):
+        return float(self.load('fill', start, end, tickers)['fee'].sum())
+
+    def realized_pnl(self, start=None, end=None, tickers=None):
+        """
+        기간 내 매도로 실현된 손익 {ticker: 원} (평균 매입가 기준, 수수료 포함).
+        평균 매입가는 기간 이전 체결부터 이어서 계산한다.
+        """
+        fills = self.load('fill', None, end, tickers)
+        start = to_ns(start)
+        result = {}
+        for ticker in np.unique(fills['ticker']):
+            index = np.flatnonzero(fills['ticker'] == ticker)
+            volume, cost, pnl = 0.0, 0.0, 0.0
+            for i in index:
+                if fills['volume'][i] <= 0:
+                    continue
+                if fills['side'][i] == 'bid':
+                    volume += fills['volume'][i]
+                    cost += fills['funds'][i] + fills['fee'][i]
+                    continue
+                sold = min(fills['volume'][i], volume)
+                sold_cost = cost * sold / volume if volume > 0 else 0.0
+                if start is None or fills['time'][i] >= start:
+                    pnl += fills['funds'][i] - fills['fee'][i] - sold_cost
+                volume -= sold
+                cost -= sold_cost
+            result[str(ticker)] = float(pnl)
+        return result
+
+    def drawdown(self, start=None, end=None):
+        # 총자산(equity.total_asset) 기준 최대 낙폭 {'max_drawdown'(비율), 'peak', 'trough', 'peak_time', 'trough_time', 'current'}
+        equity = self.load('equity', start, end)
+        total = equity['total_asset']
+        if len(total) == 0:
+            return None
+        peaks = np.maximum.accumulate(total)
+        drawdowns = np.where(peaks > 0, (peaks - total) / np.where(peaks > 0, peaks, 1), 0.0)
+        trough = int(np.argmax(drawdowns))
+        peak = int(np.argmax(total[:trough + 1]))
+        return {'max_drawdown': float(drawdowns[trough]), 'peak': float(total[peak]), 'trough': float(total[trough]),
+                'peak_time': pd.Timestamp(int(equity['time'][peak]), tz='UTC').tz_convert('Asia/Seoul'),
+                'trough_time': pd.Timestamp(int(equity['time'][trough]), tz='UTC').tz_convert('Asia/Seoul'),
+                'current': float(drawdowns[-1])}
+
+    def summary(self, start=None, end=None, tickers=None):
+        pnl = self.realized_pnl(start, end, tickers)
+        fills = self.load('fill', start, end, tickers)
+        return {'realized_pnl': sum(pnl.values()), 'by_ticker': pnl, 'fees': float(fills['fee'].sum()),
+                'fills': int(len(fills['time'])), 'drawdown': self.drawdown(start, end)}
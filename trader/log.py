@@ -0,0 +1,143 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from metrics import metrics
+
+LOGGER_NAME = "trader"
+# LogRecord 기본 속성 (나머지 extra 값은 구조화 필드로 출력)
+RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {'message', 'asctime', 'sample', 'suppressed', 'slack'}
+
+_listener = None
+
+def get_logger(name):
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+class SampleFilter(logging.Filter):
+    """
+    extra={'sample': key}인 반복 로그는 key별로 interval초에 1건만 통과시킨다.
+    생략한 건수는 다음에 통과하는 같은 key 레코드에 suppressed로 붙여 출력한다. (호출 스레드에서 실행)
+    """
+    def __init__(self, interval):
+        super().__init__()
+        self.interval = interval
+        self.last = {}
+        self.suppressed = {}
+
+    def filter(self, record):
+        key = getattr(record, 'sample', None)
+        if key is None:
+            return True
+        now = time.monotonic()
+        last = self.last.get(key)
+        if last is not None and now - last < self.interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            metrics.inc('log_sampled')
+            return False
+        self.last[key] = now
+        record.suppressed = self.suppressed.pop(key, 0)
+        return True
+
+class DeferredQueueHandler(QueueHandler):
+    """레코드를 큐에 넣기만 하는 핸들러 (메시지 포맷과 출력은 리스너 스레드에서)"""
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        self.queue.put_nowait(record)
+        metrics.inc('log_records', level=record.levelname)
+
+class StructuredFormatter(logging.Formatter):
+    """'시각 레벨 모듈: 메시지 | key=value ...' 또는 JSON 한 줄"""
+    def __init__(self, json_format=False):
+        super().__init__()
+        self.json_format = json_format
+
+    def format(self, record):
+        message = record.getMessage()
+        name = record.name[len(LOGGER_NAME) + 1:] if record.name.startswith(f"{LOGGER_NAME}.") else record.name
+        fields = {key: value for key, value in vars(record).items() if key not in RESERVED}
+        suppressed = getattr(record, 'suppressed', 0)
+        if self.json_format:
+            data = {'time': self.formatTime(record), 'level': record.levelname, 'logger': name, 'message': message}
+            data.update(fields)
+            if suppressed:
+                data['suppressed'] = suppressed
+            if record.exc_info:
+                data['exception'] = self.formatException(record.exc_info)
+            return json.dumps(data, ensure_ascii=False, default=str)
+        text = f"{self.formatTime(record)} {record.levelname} {name}: {message}"
+        if fields:
+            text += " | " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if suppressed:
+            text += f" (같은 로그 {suppressed}건 생략)"
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+class SlackErrorHandler(logging.Handler):
+    """
+    ERROR 이상 로그를 슬랙 에러 채널로 보낸다 (API.send_slack_message, 큐에 넣기만 함).
+    같은 메시지는 window초 안에 한 번만 보내고, 그동안 반복된 횟수는 다음 전송에 붙인다.
+    extra={'slack': False}인 레코드는 보내지 않는다.
+    """
+    def __init__(self, api, channel, window=300.0):
+        super().__init__(logging.ERROR)
+        self.api = api
+        self.channel = channel
+        self.window = window
+        self.sent = {}      # 메시지 -> 마지막 전송 시각
+        self.repeats = {}   # 메시지 -> 전송하지 않은 반복 횟수
+
+    def emit(self, record):
+        if getattr(record, 'slack', True) is False:
+            return
+        message = record.getMessage()
+        now = time.monotonic()
+        last = self.sent.get(message)
+        if last is not None and now - last < self.window:
+            self.repeats[message] = self.repeats.get(message, 0) + 1
+            metrics.inc('log_errors_deduped')
+            return
+        if len(self.sent) > 1000:
+            self.sent = {key: value for key, value in self.sent.items() if now - value < self.window}
+        self.sent[message] = now
+        repeats = self.repeats.pop(message, 0)
+        if repeats:
+            message += f"\n(직전 {self.window:g}초 동안 {repeats}회 더 발생)"
+        self.api.send_slack_message(self.channel, message)
+
+def setup_logging(config, api=None, stream=None):
+    """
+    trader 로거 구성: 호출 스레드는 큐에 넣기만 하고, 리스너 스레드가 포맷/출력(stdout)과 슬랙 에러 전송을 처리한다.
+    api를 주면 ERROR 로그를 SLACK_ERROR_CHANNEL로 보낸다. (API 생성 후 호출해야 종료 시 남은 에러까지 전송됨)
+    """
+    global _listener
+    stop_logging()
+    records = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(SampleFilter(config.log_sample_interval))
+    console = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    console.setFormatter(StructuredFormatter(config.log_format == "json"))
+    handlers = [console]
+    if api is not None:
+        handlers.append(SlackErrorHandler(api, config.slack_error_channel, config.log_error_dedup_window))
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [handler]
+    logger.setLevel(config.log_level)
+    logger.propagate = False
+    return _listener
+
+def stop_logging():
+    # 큐에 남은 로그까지 처리한 뒤 로그 스레드 종료 (여러 번 호출해도 됨)
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
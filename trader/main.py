@@ -1,197 +1,158 @@
 from config import Config
 from api import API
 from trade import Trader
-from indicator import Indicator
+import numpy as np
+from candle_store import CandleStore
+from aggregator import create_aggregator
 from notifier import Notifier
+from session import TradingSession
+from metrics import metrics
+from scheduler import RequestShed
+from change_tracker import ChangeTracker
+from snapshot import SnapshotStore, handle_sigterm
+from indicator import bucket_rsi_array
+from log import get_logger, setup_logging
 from datetime import datetime
-import pyupbit
+import asyncio
+import atexit
 import time
 
+logger = get_logger(__name__)
+
+def run_pass(api, session, trader, candle_store, tickers, asset_info, change_tracker=None, aggregator=None):
+    # 메인 루프 1회: 현재가로 진행중 캔들 갱신 (새 캔들이 확정된 티커만 캔들 조회)
+    current_prices = api.get_current_prices(tickers)
+    for ticker in tickers:
+        candle_store.update(ticker, current_prices[ticker])
+        if aggregator is not None:
+            # 상위 분봉은 기본 캔들로 직접 갱신 (추가 조회 없음)
+            aggregator.sync(ticker)
+
+    # 변경 기반 평가: 현재가/확정 캔들/포지션이 바뀐 티커만 다시 계산
+    if change_tracker is not None:
+        keys = {ticker: change_tracker.key(ticker, current_prices[ticker], candle_store, session) for ticker in tickers}
+        tickers = change_tracker.changed(tickers, keys)
+        if not tickers:
+            return
+
+    # 지표는 티커별 상태에 새로 확정된 캔들만 반영 (캔들당 O(1), 진행중 캔들은 잠정값)
+    # 매 패스 100개 캔들을 다시 계산하는 BatchIndicator 대신 증분 계산을 쓰고, 구간/신호 판단은 배열로 한 번에 처리
+    with metrics.timer('rsi'):
+        values = np.array([trader.signal_inputs(session.pipeline, ticker, candle_store) for ticker in tickers]).reshape(-1, 2)
+        rsi, previous_rsi = values[:, 0], values[:, 1]
+        new_rsi = bucket_rsi_array(rsi)
+    with metrics.timer('signal'):
+        profit_rates = [asset_info['coin_info'][ticker.split('-')[1]]['profit_rate'] for ticker in tickers]
+        buy_signals = trader.buy_signals(rsi, previous_rsi)
+        sell_signals = trader.sell_signals(rsi, previous_rsi, profit_rates)
+
+    # 주문으로 이어지는 티커가 있으면 호가창을 한 번에 조회 (예상 슬리피지로 주문 크기 조정)
+    if session.config.orderbook_max_slippage_bps > 0:
+        acting = [ticker for i, ticker in enumerate(tickers)
+                  if session.has_action(ticker, float(rsi[i]), float(previous_rsi[i]), int(new_rsi[i]),
+                                        bool(buy_signals[i]), bool(sell_signals[i]), current_prices[ticker])]
+        api.refresh_orderbooks(acting)
+
+    for i, ticker in enumerate(tickers):
+        with metrics.timer('execute', ticker):
+            session.execute(ticker, float(rsi[i]), float(previous_rsi[i]), int(new_rsi[i]),
+                            bool(buy_signals[i]), bool(sell_signals[i]), current_prices[ticker])
+        if change_tracker is not None:
+            # 평가 후 키 저장 (주문 체결로 fill_version이 바뀌면 다음 패스에서 다시 평가)
+            change_tracker.store(ticker, keys[ticker])
+
 def main():
-    config = Config() 
-    slack_trade_channel = config.slack_trade_channel
-    slack_error_channel = config.slack_error_channel
+    config = Config()
     """
-    UPBIT_ACCESS_KEY, UPBIT_SECRET_KEY, 
-    SLACK_API_TOKEN, SLACK_TRADE_CHANNEL, SLACK_ERROR_CHANNEL, SLACK_ASSET_CHANNEL, 
+    UPBIT_ACCESS_KEY, UPBIT_SECRET_KEY,
+    SLACK_API_TOKEN, SLACK_TRADE_CHANNEL, SLACK_ERROR_CHANNEL, SLACK_ASSET_CHANNEL,
     COIN_TICKER
     """
     api = API()
     """
     upbit, slack, get_asset_info
     """
+    # 이후 로그는 큐에 넣기만 함 (출력/슬랙 에러 전송은 로그 스레드)
+    setup_logging(config, api)
 
     upbit = api.upbit
     slack = api.slack
-    notifier = Notifier()
+    notifier = Notifier(api)
     TICKERS = config.coin_ticker
     trader = Trader(upbit, slack, TICKERS)
-
-    position_tracker = trader.position_tracker()
-    rsi_check = trader.rsi_check()
-
-    print(f"자동투자 프로그램을 시작합니다. {TICKERS}를 모니터링합니다.")
-    initial_asset_info = api.get_asset_info()
-    if initial_asset_info is None:
-        print("초기 자산 정보 조회 실패. 프로그램을 종료합니다.")
+    session = TradingSession(config, api, notifier, trader)
+    # 모의 거래소는 재생 시각 기준으로 캔들을 관리하고 디스크 캐시를 쓰지 않음
+    simulated = config.exchange_backend == "sim"
+    candle_store = CandleStore(interval=config.candle_interval, maxlen=config.candle_buffer_size,
+                               cache_dir=None if simulated else config.candle_cache_dir,
+                               quotation=api.quotation, clock=api.quotation.now if simulated else None)
+    # 상위 분봉 (전략에서 trader.aggregator.get_ohlcv(ticker, 60) 등으로 조회, 기본 캔들이 5분보다 짧으면 신호용 5분봉 포함)
+    aggregator = create_aggregator(candle_store, config.candle_timeframes, config.candle_buffer_size, trader.signal_minutes)
+    trader.aggregator = aggregator
+
+    logger.info("자동투자 프로그램을 시작합니다. %s를 모니터링합니다.", TICKERS)
+    if config.metrics_port:
+        metrics.serve(config.metrics_port, config.metrics_host)
+        logger.info("메트릭 엔드포인트: http://%s:%s/metrics", config.metrics_host, config.metrics_port)
+    # 스냅샷이 있으면 캔들/래더/체결 대기 주문을 복원해 바로 매매 재개 (모의 거래소는 사용 안 함)
+    snapshot_store = None
+    snapshot = None
+    if config.snapshot_path and not simulated:
+        snapshot_store = SnapshotStore(config.snapshot_path, session, candle_store, session.pipeline,
+                                       interval=config.snapshot_interval)
+        snapshot = snapshot_store.load()
+        if snapshot is not None:
+            snapshot_store.restore(snapshot)
+    if not session.start(snapshot['session'] if snapshot is not None else None):
+        logger.error("초기 자산 정보 조회 실패. 프로그램을 종료합니다.")
+        return
+    if snapshot_store is not None:
+        # 종료(Ctrl+C, SIGTERM) 시에도 저장
+        atexit.register(snapshot_store.close)
+    handle_sigterm(snapshot_store)
+
+    if config.market_data_mode == "stream":
+        from stream import run_stream
+        asyncio.run(run_stream(config, session, trader, candle_store, snapshot_store))
         return
-    """
-    형식: {'krw_balance': 1000000, 
-    'coin_info': {'KRW-BTC': {'balance': 1.0, 'avg_price': 100000000, 'current_price': 100000000, 'value': 1000000, 'profit_rate': 0}, 
-    'KRW-ETH': {'balance': 1.0, 'avg_price': 100000000, 'current_price': 100000000, 'value': 1000000, 'profit_rate': 0}}, 
-    'total_asset': 1000000}
-    """
-    limit_amount = api.get_limit_amount() # 형식: {'KRW-BTC': 10000, 'KRW-ETH': 10000}
-
-    # 초기자산 데이터를 기준으로 매도 조건 설정
-    initial_coin_balance = trader.initial_coin_balance(initial_asset_info)
-    has_initial_coin = trader.has_initial_coin(initial_coin_balance)
-    for ticker in TICKERS:
-        if ticker in has_initial_coin and has_initial_coin[ticker]:
-            rsi_check[ticker].append(35)
-
-    notifier.send_asset_info(initial_asset_info, limit_amount, rsi_check, position_tracker)
 
     status_sent = False
+    change_tracker = ChangeTracker() if config.evaluation_mode == "change" else None
 
     while True:
         try:
-            asset_info = api.get_asset_info()
+            asset_info = session.refresh_asset_info()
             if asset_info is None:
-                print("자산현황 정보를 가져오는 데 실패했습니다.")
+                logger.warning("자산현황 정보를 가져오는 데 실패했습니다.")
                 time.sleep(10)
                 continue
 
             current_time = datetime.now()
             if current_time.minute in [0, 30]:
                 if not status_sent:
-                    notifier.send_asset_info(asset_info, limit_amount, rsi_check, position_tracker)
+                    session.send_asset_info()
                     status_sent = True
+                    if change_tracker is not None:
+                        logger.info("변경 기반 평가 현황: %s", change_tracker.stats())
             else:
                 status_sent = False
-            
-            for ticker in TICKERS:
-                currency = ticker.split('-')[1]
-                df = pyupbit.get_ohlcv(ticker, interval="minute5", count=100)
-                indicator = Indicator(df)
-                rsi, previous_rsi = indicator.calculate_rsi()
-                current_price = api.get_current_price(ticker)
-                new_rsi = indicator.get_new_rsi()
-
-                # 매매신호 판단
-                buy_signal = trader.buy_signal(rsi, previous_rsi)
-                sell_signal = trader.sell_signal(rsi, previous_rsi, asset_info['coin_info'][currency]['profit_rate'])
-                
-                # 초기 자산 정리
-                initial_avg_price = initial_asset_info['coin_info'][currency]['avg_price']
-                initial_profit_rate = ((current_price - initial_avg_price) / initial_avg_price * 100) if initial_avg_price > 0 else 0
-                if has_initial_coin and rsi >= 70 and initial_profit_rate >= 1.0 and previous_rsi > rsi+1:
-                    order = upbit.sell_market_order(ticker, initial_coin_balance)
-                    message = f"매도 주문 완료. 현재가격: {current_price}"
-                    print(message)
-                    api.send_slack_message(slack_trade_channel, message)
-                    time.sleep(10)
-                    if order:
-                        message = f"초기 자산 매도 주문 체결\n수량: {initial_coin_balance:.8f}\nRSI: {rsi:.2f}"
-                        print(message)
-                        api.send_slack_message(slack_trade_channel, message)
-                        has_initial_coin[currency] = False
-                        asset_info = api.get_asset_info()
-                        notifier.send_asset_info(asset_info, limit_amount, rsi_check, position_tracker)
-
-                # 매수 진행
-                if buy_signal and new_rsi not in rsi_check[ticker]:
-                    asset_info = api.get_asset_info()
-                    position_size = trader.position_size(new_rsi)*limit_amount[ticker]
-                    try:
-                        if position_size > 0 and asset_info['krw_balance'] >= position_size and asset_info['krw_balance']*position_size > 5000:
-                            order = upbit.buy_market_order(ticker, position_size)
-                            message = f"{ticker}매수 주문 완료. 현재가격: {current_price}"
-                            print(message)
-                            api.send_slack_message(slack_trade_channel, message)
-                            time.sleep(10)
-                            if order:
-                                # 실제 체결된 정보 가져오기
-                                executed_order = upbit.get_order(order['uuid'])
-                                executed_price = float(executed_order['trades'][0]['price'])
-                                buy_amount = round(position_size / executed_price, 8)
-
-                                # rsi 매매여부 체크(매수 시 추가)
-                                position_tracker[ticker][new_rsi] = buy_amount
-                                rsi_check[ticker].append(new_rsi)
-
-                                message = f"""
-{ticker}매수 주문 체결
-체결가격: {executed_price:,.0f}원
-체결수량: {buy_amount:.8f}
-RSI: {new_rsi:.2f}
-포지션 현황: {position_tracker[ticker]}
-"""
-                                print(message)
-                                api.send_slack_message(slack_trade_channel, message)
-                                asset_info = api.get_asset_info()
-                                notifier.send_asset_info(asset_info, limit_amount, rsi_check, position_tracker)
-                    except Exception as e:
-                        print(f"매수 주문 중 오류: {str(e)}")
-                        api.send_slack_message(f"매수 주문 중 오류: {str(e)}", slack_error_channel)
-
-                # 매도 진행
-                elif sell_signal:
-                    try:
-                        asset_info = api.get_asset_info()
-                        sell_amount = asset_info['coin_info'][currency]['balance']
-
-                        if sell_amount > 0:
-                            order = upbit.sell_market_order(ticker, sell_amount)
-                            message = f"{ticker}매도 주문 완료. 현재가격: {current_price}"
-                            print(message)
-                            api.send_slack_message(slack_trade_channel, message)
-                            time.sleep(10)
-                            if order:
-                                position_tracker[ticker] = {}
-                                rsi_check[ticker] = []
-
-                                message = f"""
-{ticker}매도 주문 체결
-수량: {sell_amount:.8f}
-RSI: {rsi:.2f}
-{rsi_check}
-"""
-                                api.send_slack_message(slack_trade_channel, message)
-                                asset_info = api.get_asset_info()
-                                notifier.send_asset_info(asset_info, limit_amount, rsi_check, position_tracker)
-                    except Exception as e:
-                        print(f"{ticker}의 매도 주문 중 오류: {str(e)}")
-                        api.send_slack_message(f"{ticker}의 매도 주문 중 오류: {str(e)}", slack_error_channel)
-
-                elif current_price < asset_info['coin_info'][currency]['avg_price'] * config.stop_loss:
-                    print(f"{ticker}의 손실이 {config.stop_loss * 100}% 이상 발생했습니다. 매도 주문 진행중...")
-                    sell_amount = asset_info['coin_info'][currency]['balance']
-                    order = upbit.sell_market_order(ticker, sell_amount)
-                    message = f"{ticker}매도 주문 완료. 현재가격: {current_price}"
-                    print(message)
-                    api.send_slack_message(slack_trade_channel, message)
-                    time.sleep(10)
-                    if order:
-                        position_tracker[ticker] = {}
-                        rsi_check[ticker] = []
-                        message = f"""
-{ticker} 손절매 완료
-포지션 초기화 완료
-"""
-                        api.send_slack_message(slack_trade_channel, message)
-                        asset_info = api.get_asset_info()
-                        notifier.send_asset_info(asset_info, limit_amount, rsi_check, position_tracker)
-
-                else:
-                    print(f"{ticker}의 매수/매도 신호가 없습니다. 기회 탐색중... rsi: {rsi}")
+
+            with metrics.timer('loop_pass'):
+                run_pass(api, session, trader, candle_store, TICKERS, asset_info, change_tracker, aggregator)
+            if snapshot_store is not None and snapshot_store.due():
+                snapshot_store.save()
 
             # 10초간 대기
             time.sleep(10)
 
+        except RequestShed as e:
+            # 요청 한도가 부족해 시세 조회를 건너뜀 (주문이 우선), 다음 패스에서 다시 조회
+            logger.info("시세 조회 보류: %s", e)
+            time.sleep(1)
+
         except Exception as e:
-            print(f"메인 루프 오류: {str(e)}")
-            api.send_slack_message(f"메인 루프 오류: {str(e)}", slack_error_channel)
+            metrics.inc('errors', stage='main_loop')
+            logger.exception("메인 루프 오류: %s", e)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,152 @@
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 단계별 지연 히스토그램 구간(초)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+class Metrics:
+    """
+    메인 루프 단계별 지연(히스토그램)과 API 호출/오류 카운터, 현재값(게이지) 저장소.
+    단계(stage): price_fetch, balance_fetch, candle_fetch, rsi, signal, execute, order_submit,
+    fill_confirmation, slack_send, loop_pass. 티커별 단계는 ticker 라벨을 붙인다.
+    serve()로 Prometheus 텍스트 형식 HTTP 엔드포인트(/metrics)를 연다.
+    """
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}  # (stage, ticker) -> Histogram
+        self.counters = {}    # (name, (label, value)...) -> 값
+        self.gauges = {}      # (name, (label, value)...) -> 현재 값
+        self.lock = threading.Lock()
+        self.server = None
+
+    def observe(self, stage, seconds, ticker=""):
+        with self.lock:
+            histogram = self.histograms.get((stage, ticker))
+            if histogram is None:
+                histogram = self.histograms[(stage, ticker)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, ticker=""):
+        # with metrics.timer('candle_fetch', ticker): ... (예외가 나면 오류 카운터도 증가)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('errors', stage=stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, ticker)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def summary(self):
+        # 단계별 {'count', 'sum', 'avg'} (티커 합산)
+        result = {}
+        with self.lock:
+            for (stage, _), histogram in self.histograms.items():
+                entry = result.setdefault(stage, {'count': 0, 'sum': 0.0})
+                entry['count'] += histogram.count
+                entry['sum'] += histogram.sum
+        for entry in result.values():
+            entry['avg'] = entry['sum'] / entry['count'] if entry['count'] else 0.0
+        return result
+
+    def render(self):
+        # Prometheus 텍스트 형식 (text/plain; version=0.0.4)
+        lines = ["# HELP trader_stage_seconds 메인 루프 단계별 소요 시간",
+                 "# TYPE trader_stage_seconds histogram"]
+        with self.lock:
+            for (stage, ticker), histogram in sorted(self.histograms.items()):
+                labels = format_labels(stage=stage, ticker=ticker)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"trader_stage_seconds_bucket{format_labels(stage=stage, ticker=ticker, le=f'{bound:g}')} {cumulative}")
+                lines.append(f"trader_stage_seconds_bucket{format_labels(stage=stage, ticker=ticker, le='+Inf')} {histogram.count}")
+                lines.append(f"trader_stage_seconds_sum{labels} {histogram.sum:.6f}")
+                lines.append(f"trader_stage_seconds_count{labels} {histogram.count}")
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines.append(f"# TYPE trader_{name}_total counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"trader_{name}_total{format_labels(**dict(labels))} {value}")
+            for name in sorted({name for name, _ in self.gauges}):
+                lines.append(f"# TYPE trader_{name} gauge")
+                for (gauge, labels), value in sorted(self.gauges.items()):
+                    if gauge == name:
+                        lines.append(f"trader_{name}{format_labels(**dict(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        # 백그라운드 스레드에서 /metrics 엔드포인트 실행
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+        return self.server
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+def format_labels(**labels):
+    # 값이 빈 라벨은 생략, 따옴표/역슬래시/줄바꿈 이스케이프
+    items = [(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+             for key, value in labels.items() if value != ""]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+# 프로세스 전체에서 공유하는 기본 저장소
+metrics = Metrics()
@@ -1,12 +1,22 @@
 from config import Config
 from api import API
+from log import get_logger
+
+logger = get_logger(__name__)
 
 class Notifier:
-    def __init__(self):
+    def __init__(self, api=None):
         self.config = Config()
-        self.api = API()
+        # 잔고/현재가 캐시를 공유하도록 main의 API 객체를 받아서 사용
+        self.api = api if api is not None else API()
 
-    def send_asset_info(self, asset_info, limit_amount, rsi_check = "", position_tracker = "" ):
+    def send_asset_info(self, asset_info=None, limit_amount=None, rsi_check = "", position_tracker = "" ):
+        if asset_info is None:
+            asset_info = self.api.get_asset_info()
+            if asset_info is None:
+                return
+        if limit_amount is None:
+            limit_amount = {}
         message = f"""
 📊 자산 현황 보고
 ──────────────
@@ -32,6 +42,7 @@ class Notifier:
 ──────────────"""
         
         try:
-            self.api.send_slack_message(self.config.slack_asset_channel, message)
+            # 전송 전에 새 보고가 들어오면 최신 보고만 전송
+            self.api.send_slack_message(self.config.slack_asset_channel, message, key='asset_report')
         except Exception as e:
-            print(f"자산 보고 오류: {str(e)}")
+            logger.warning("자산 보고 오류: %s", e)
@@ -0,0 +1,132 @@
+import threading
+import time
+from metrics import metrics
+from log import get_logger
+
+logger = get_logger(__name__)
+
+FINAL_STATES = ('done', 'cancel')
+
+def summarize_trades(order):
+    # 전체 체결 내역 기준 거래량 가중 평균가
+    trades = order.get('trades') or []
+    volume = sum(float(trade['volume']) for trade in trades)
+    funds = sum(float(trade.get('funds') or float(trade['price']) * float(trade['volume'])) for trade in trades)
+    return {
+        'volume': volume,
+        'funds': funds,
+        'avg_price': funds / volume if volume > 0 else 0.0,
+        'paid_fee': float(order.get('paid_fee') or 0),
+        'trades_count': len(trades),
+    }
+
+class OrderTracker:
+    """
+    제출한 주문을 백그라운드 스레드에서 추적한다.
+    주문별로 조회 간격을 점점 늘려가며(initial_delay -> max_delay) get_order를 호출하고,
+    주문이 끝나면(done/cancel) 체결 이벤트를 callback으로 전달한다.
+    이벤트 형식: {'uuid', 'ticker', 'side', 'state', 'volume', 'funds', 'avg_price', 'paid_fee', 'trades_count', 'latency'}
+    """
+    def __init__(self, upbit, initial_delay=0.1, max_delay=2.0, backoff=1.5, timeout=60.0):
+        self.upbit = upbit
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.timeout = timeout
+        self.pending = {}    # uuid -> 추적 정보
+        self.results = {}    # uuid -> 체결 이벤트
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name="order-tracker", daemon=True)
+        self.thread.start()
+
+    def track(self, order, ticker, side, callback=None):
+        uuid = order['uuid']
+        now = time.monotonic()
+        with self.condition:
+            self.pending[uuid] = {
+                'ticker': ticker,
+                'side': side,
+                'callback': callback,
+                'submitted_at': now,
+                'delay': self.initial_delay,
+                'next_poll': now + self.initial_delay,
+                'done': threading.Event(),
+            }
+            self.condition.notify()
+        return uuid
+
+    def wait(self, uuid, timeout=None):
+        # 동기 호출이 필요한 경우 체결 이벤트를 기다려서 반환
+        with self.condition:
+            entry = self.pending.get(uuid)
+            if entry is None:
+                return self.results.get(uuid)
+        entry['done'].wait(timeout)
+        return self.results.get(uuid)
+
+    def pending_orders(self):
+        with self.condition:
+            return {uuid: {'ticker': entry['ticker'], 'side': entry['side']} for uuid, entry in self.pending.items()}
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and not self.pending:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                now = time.monotonic()
+                next_poll = min(entry['next_poll'] for entry in self.pending.values())
+                if next_poll > now:
+                    self.condition.wait(next_poll - now)
+                    continue
+                due = [(uuid, entry) for uuid, entry in self.pending.items() if entry['next_poll'] <= now]
+
+            for uuid, entry in due:
+                self._poll(uuid, entry)
+
+    def _poll(self, uuid, entry):
+        metrics.inc('api_calls', endpoint='get_order')
+        try:
+            order = self.upbit.get_order(uuid)
+        except Exception as e:
+            metrics.inc('errors', stage='fill_confirmation')
+            logger.warning("주문 조회 중 오류: %s %s", uuid, e)
+            order = None
+
+        now = time.monotonic()
+        state = order.get('state') if isinstance(order, dict) else None
+        if state in FINAL_STATES:
+            self._finish(uuid, entry, state, order, now)
+        elif now - entry['submitted_at'] > self.timeout:
+            self._finish(uuid, entry, 'timeout', order if isinstance(order, dict) else {}, now)
+        else:
+            with self.condition:
+                entry['delay'] = min(entry['delay'] * self.backoff, self.max_delay)
+                entry['next_poll'] = now + entry['delay']
+
+    def _finish(self, uuid, entry, state, order, now):
+        event = {'uuid': uuid, 'ticker': entry['ticker'], 'side': entry['side'], 'state': state,
+                 'latency': now - entry['submitted_at']}
+        event.update(summarize_trades(order))
+        metrics.observe('fill_confirmation', event['latency'], entry['ticker'])
+        if state not in FINAL_STATES:
+            metrics.inc('errors', stage='fill_confirmation')
+        with self.condition:
+            self.pending.pop(uuid, None)
+            self.results[uuid] = event
+            if len(self.results) > 1000:
+                self.results.pop(next(iter(self.results)))
+        entry['done'].set()
+        if entry['callback'] is not None:
+            try:
+                entry['callback'](event)
+            except Exception as e:
+                logger.exception("체결 처리 중 오류: %s %s", entry['ticker'], e)
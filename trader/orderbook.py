@@ -0,0 +1,221 @@
+import bisect
+import threading
+import time
+import numpy as np
+
+class BookSide:
+    """
+    한쪽 호가. 체결되는 순서(매도호가는 낮은 가격부터, 매수호가는 높은 가격부터)로 정렬된 가격 목록을 유지하고
+    누적 수량/누적 금액은 호가가 바뀐 뒤 첫 조회 때 한 번만 다시 계산한다.
+    호가 1개 변경은 이진 탐색 후 list 삽입/삭제라 O(n)이지만, 업비트 호가는 한쪽 최대 30단계라 충분히 작다.
+    """
+    def __init__(self, descending):
+        self.sign = -1.0 if descending else 1.0
+        self.keys = []     # 체결 순서 정렬 키 (sign * price)
+        self.sizes = {}    # price -> size
+        self.prefix = None # (prices, 누적 수량, 누적 금액)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys = []
+        self.sizes = {}
+        self.prefix = None
+
+    def set(self, price, size):
+        # 호가 1개 변경 (size 0이면 삭제)
+        price = float(price)
+        key = self.sign * price
+        index = bisect.bisect_left(self.keys, key)
+        exists = index < len(self.keys) and self.keys[index] == key
+        if size > 0:
+            if not exists:
+                self.keys.insert(index, key)
+            self.sizes[price] = float(size)
+        elif exists:
+            del self.keys[index]
+            del self.sizes[price]
+        self.prefix = None
+
+    def load(self, levels):
+        # 전체 호가 교체 [(price, size), ...]
+        self.clear()
+        for price, size in levels:
+            if size > 0:
+                self.sizes[float(price)] = float(size)
+        self.keys = sorted(self.sign * price for price in self.sizes)
+
+    def _prefix(self):
+        if self.prefix is None:
+            prices = np.array(self.keys) * self.sign
+            sizes = np.array([self.sizes[price] for price in prices.tolist()])
+            self.prefix = (prices, np.cumsum(sizes), np.cumsum(prices * sizes))
+        return self.prefix
+
+    def best(self):
+        return self.sign * self.keys[0] if self.keys else None
+
+    def fill_value(self, value):
+        # value(원)만큼 시장가 체결 시 (평균 체결가, 체결 수량, 체결 금액), 호가가 모자라면 체결 금액이 value보다 작음
+        prices, sizes, values = self._prefix()
+        if len(prices) == 0 or value <= 0:
+            return None, 0.0, 0.0
+        index = int(np.searchsorted(values, value))
+        if index >= len(prices):
+            return float(values[-1] / sizes[-1]), float(sizes[-1]), float(values[-1])
+        before_size = sizes[index - 1] if index else 0.0
+        before_value = values[index - 1] if index else 0.0
+        volume = before_size + (value - before_value) / prices[index]
+        return float(value / volume), float(volume), float(value)
+
+    def fill_volume(self, volume):
+        # volume(수량)만큼 시장가 체결 시 (평균 체결가, 체결 수량, 체결 금액)
+        prices, sizes, values = self._prefix()
+        if len(prices) == 0 or volume <= 0:
+            return None, 0.0, 0.0
+        index = int(np.searchsorted(sizes, volume))
+        if index >= len(prices):
+            return float(values[-1] / sizes[-1]), float(sizes[-1]), float(values[-1])
+        before_size = sizes[index - 1] if index else 0.0
+        before_value = values[index - 1] if index else 0.0
+        value = before_value + (volume - before_size) * prices[index]
+        return float(value / volume), float(volume), float(value)
+
+    def depth(self, limit_price):
+        # limit_price까지(매도호가는 이하, 매수호가는 이상)의 (수량, 금액)
+        prices, sizes, values = self._prefix()
+        index = int(np.searchsorted(prices * self.sign, self.sign * limit_price, side='right'))
+        if index == 0:
+            return 0.0, 0.0
+        return float(sizes[index - 1]), float(values[index - 1])
+
+    def max_fill(self, limit_avg_price):
+        """
+        평균 체결가가 limit_avg_price를 넘지 않는(매수호가는 밑돌지 않는) 최대 (수량, 금액).
+        호가를 하나씩 더할수록 평균가가 나빠지므로 누적 평균이 한도 안인 마지막 호가까지 채운 뒤 그 다음 호가를 일부 사용.
+        """
+        prices, sizes, values = self._prefix()
+        if len(prices) == 0 or self.sign * prices[0] > self.sign * limit_avg_price:
+            return 0.0, 0.0
+        average = values / sizes
+        index = int(np.searchsorted(average * self.sign, self.sign * limit_avg_price, side='right'))
+        volume, value = float(sizes[index - 1]), float(values[index - 1])
+        if index < len(prices) and prices[index] != limit_avg_price:
+            # (value + x * p) / (volume + x) = limit -> x = (limit * volume - value) / (p - limit)
+            extra = (limit_avg_price * volume - value) / (prices[index] - limit_avg_price)
+            extra = min(max(extra, 0.0), self.sizes[float(prices[index])])
+            volume += extra
+            value += extra * prices[index]
+        return volume, value
+
+class OrderBook:
+    """티커 1개의 호가창 (REST 조회 또는 웹소켓 orderbook 메시지로 갱신)"""
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.asks = BookSide(descending=False)
+        self.bids = BookSide(descending=True)
+        self.timestamp = None   # 거래소 기준 시각(ms)
+        self.updated = None     # 로컬 갱신 시각(monotonic)
+
+    def load_units(self, units, timestamp=None):
+        # 업비트 orderbook_units [{'ask_price', 'bid_price', 'ask_size', 'bid_size'}, ...]
+        self.asks.load((unit['ask_price'], unit['ask_size']) for unit in units)
+        self.bids.load((unit['bid_price'], unit['bid_size']) for unit in units)
+        self.timestamp = timestamp
+        self.updated = time.monotonic()
+
+    def update(self, side, price, size):
+        # 호가 1개 변경 (side: 'ask' 또는 'bid')
+        (self.asks if side == 'ask' else self.bids).set(price, size)
+        self.updated = time.monotonic()
+
+    def age(self):
+        return float('inf') if self.updated is None else time.monotonic() - self.updated
+
+    def mid(self):
+        ask, bid = self.asks.best(), self.bids.best()
+        if ask is None or bid is None:
+            return ask if bid is None else bid
+        return (ask + bid) / 2
+
+    def expected_buy(self, krw):
+        # krw원 시장가 매수 시 (평균 체결가, 수량, 체결 금액)
+        return self.asks.fill_value(krw)
+
+    def expected_sell(self, volume):
+        # volume 시장가 매도 시 (평균 체결가, 수량, 체결 금액)
+        return self.bids.fill_volume(volume)
+
+    def slippage_bps(self, side, amount):
+        # 중간가 대비 예상 평균 체결가 차이 (bps, 불리한 방향이 양수), side: 'bid'(원화 금액) 또는 'ask'(수량)
+        mid = self.mid()
+        avg_price, volume, _ = self.expected_buy(amount) if side == 'bid' else self.expected_sell(amount)
+        if mid is None or avg_price is None:
+            return None
+        sign = 1 if side == 'bid' else -1
+        return sign * (avg_price - mid) / mid * 10000
+
+    def impact_bps(self, side, amount):
+        # 최우선 호가 대비 예상 평균 체결가 차이 (bps), 최우선 호가 안에서 체결되면 0, 보이는 호가로 다 체결되지 않으면 inf
+        best = self.asks.best() if side == 'bid' else self.bids.best()
+        avg_price, volume, value = self.expected_buy(amount) if side == 'bid' else self.expected_sell(amount)
+        if best is None or avg_price is None:
+            return None
+        if (value if side == 'bid' else volume) < amount:
+            return float('inf')
+        sign = 1 if side == 'bid' else -1
+        return sign * (avg_price - best) / best * 10000
+
+    def depth_bps(self, side, bps):
+        # 중간가에서 bps 이내 호가의 (수량, 금액), side: 'ask'(매수 시 소진되는 매도호가) 또는 'bid'
+        mid = self.mid()
+        if mid is None:
+            return 0.0, 0.0
+        if side == 'ask':
+            return self.asks.depth(mid * (1 + bps / 10000))
+        return self.bids.depth(mid * (1 - bps / 10000))
+
+    def max_buy(self, bps):
+        # 예상 평균 체결가가 최우선 매도호가 + bps 이내인 최대 매수 금액(원)
+        best = self.asks.best()
+        return 0.0 if best is None else self.asks.max_fill(best * (1 + bps / 10000))[1]
+
+    def max_sell(self, bps):
+        # 예상 평균 체결가가 최우선 매수호가 - bps 이상인 최대 매도 수량
+        best = self.bids.best()
+        return 0.0 if best is None else self.bids.max_fill(best * (1 - bps / 10000))[0]
+
+class OrderBookStore:
+    """
+    티커별 호가창 모음. REST 조회 결과(get_orderbook)와 웹소켓 orderbook 메시지를 같은 형식으로 반영한다.
+    주문 판단 시에는 max_age(초) 안에 갱신된 호가창만 사용한다.
+    """
+    def __init__(self, max_age=10.0):
+        self.max_age = max_age
+        self.books = {}
+        self.lock = threading.Lock()
+
+    def apply(self, item):
+        # REST 응답 항목 또는 웹소켓 메시지 1개 ('market' 또는 'code', 'orderbook_units', 'timestamp')
+        ticker = item.get('market') or item.get('code')
+        units = item.get('orderbook_units')
+        if not ticker or units is None:
+            return
+        # 새 객체로 만든 뒤 교체 (주문 스레드가 읽는 중인 호가창은 바뀌지 않음)
+        book = OrderBook(ticker)
+        book.load_units(units, item.get('timestamp'))
+        with self.lock:
+            self.books[ticker] = book
+
+    def apply_many(self, items):
+        for item in items or []:
+            self.apply(item)
+
+    def get(self, ticker):
+        # 최근 호가창, 없거나 오래됐으면 None
+        with self.lock:
+            book = self.books.get(ticker)
+        if book is None or book.age() > self.max_age:
+            return None
+        return book
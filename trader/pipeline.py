@@ -0,0 +1,287 @@
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+import numpy as np
+from candle_store import COLUMNS
+from indicator import rsi_from_averages
+
+NAN = float('nan')
+
+class Node(ABC):
+    """
+    지표 그래프 노드. step()은 입력 노드 값(args)으로 이번 캔들의 값을 계산한다.
+    commit=False(진행중 캔들)이면 상태를 바꾸지 않고 잠정값만 반환한다.
+    """
+    def init(self):
+        return None
+
+    @abstractmethod
+    def step(self, state, args, commit):
+        pass
+
+class Source(Node):
+    # 캔들 행(COLUMNS 순서)의 한 열 (입력 노드가 없어 args는 (row,))
+    def __init__(self, column):
+        self.index = COLUMNS.index(column)
+
+    def step(self, state, args, commit):
+        return float(args[0][self.index])
+
+class Diff(Node):
+    # 직전 캔들 대비 변화량 (첫 캔들은 nan)
+    def init(self):
+        return {'prev': None}
+
+    def step(self, state, args, commit):
+        x = args[0]
+        value = NAN if state['prev'] is None else x - state['prev']
+        if commit:
+            state['prev'] = x
+        return value
+
+class Gain(Node):
+    def step(self, state, args, commit):
+        return max(args[0], 0.0) if args[0] == args[0] else NAN
+
+class Loss(Node):
+    def step(self, state, args, commit):
+        return max(-args[0], 0.0) if args[0] == args[0] else NAN
+
+class Wilder(Node):
+    # 와일더 평균: 처음 seed개 단순평균 후 (avg * (n-1) + x) / n, nan 입력은 건너뜀
+    def __init__(self, n, seed=None):
+        self.n = n
+        self.seed = seed or n
+
+    def init(self):
+        return {'count': 0, 'sum': 0.0, 'avg': NAN}
+
+    def step(self, state, args, commit):
+        x = args[0]
+        if x != x:
+            return state['avg']
+        count = state['count'] + 1
+        if count < self.seed:
+            total, avg = state['sum'] + x, NAN
+        elif count == self.seed:
+            total, avg = 0.0, (state['sum'] + x) / self.seed
+        else:
+            total, avg = 0.0, (state['avg'] * (self.n - 1) + x) / self.n
+        if commit:
+            state['count'], state['sum'], state['avg'] = count, total, avg
+        return avg
+
+class EMA(Node):
+    # 지수이동평균 (alpha = 2 / (n + 1), 처음 n개 단순평균으로 시작)
+    def __init__(self, n):
+        self.n = n
+        self.alpha = 2 / (n + 1)
+
+    def init(self):
+        return {'count': 0, 'sum': 0.0, 'avg': NAN}
+
+    def step(self, state, args, commit):
+        x = args[0]
+        if x != x:
+            return state['avg']
+        count = state['count'] + 1
+        if count < self.n:
+            total, avg = state['sum'] + x, NAN
+        elif count == self.n:
+            total, avg = 0.0, (state['sum'] + x) / self.n
+        else:
+            total, avg = 0.0, state['avg'] + self.alpha * (x - state['avg'])
+        if commit:
+            state['count'], state['sum'], state['avg'] = count, total, avg
+        return avg
+
+class RollingSum(Node):
+    # 최근 n개 합 (power=2면 제곱합), n개가 차기 전에는 nan
+    def __init__(self, n, power=1):
+        self.n = n
+        self.power = power
+
+    def init(self):
+        return {'window': deque(), 'sum': 0.0, 'steps': 0}
+
+    def step(self, state, args, commit):
+        x = args[0]
+        if x != x:
+            return NAN
+        x = x * x if self.power == 2 else x
+        window = state['window']
+        full = len(window) == self.n
+        total = state['sum'] + x - (window[0] if full else 0.0)
+        value = total if full or len(window) == self.n - 1 else NAN
+        if commit:
+            window.append(x)
+            if full:
+                window.popleft()
+            state['steps'] += 1
+            # 누적 오차 방지를 위해 주기적으로 다시 합산
+            state['sum'] = math.fsum(window) if state['steps'] % (self.n * 8) == 0 else total
+        return value
+
+class Linear(Node):
+    # 입력 값의 선형 결합 sum(coef * x)
+    def __init__(self, coefs):
+        self.coefs = coefs
+
+    def step(self, state, args, commit):
+        return sum(coef * x for coef, x in zip(self.coefs, args))
+
+class Std(Node):
+    # (합, 제곱합)으로 최근 n개 모표준편차
+    def __init__(self, n):
+        self.n = n
+
+    def step(self, state, args, commit):
+        total, squares = args
+        mean = total / self.n
+        return math.sqrt(max(squares / self.n - mean * mean, 0.0))
+
+class TrueRange(Node):
+    # max(고가-저가, |고가-직전 종가|, |저가-직전 종가|)
+    def init(self):
+        return {'prev_close': None}
+
+    def step(self, state, args, commit):
+        high, low, close = args
+        prev = state['prev_close']
+        value = high - low if prev is None else max(high - low, abs(high - prev), abs(low - prev))
+        if commit:
+            state['prev_close'] = close
+        return value
+
+class RSI(Node):
+    def step(self, state, args, commit):
+        avg_gain, avg_loss = args
+        if avg_gain != avg_gain or avg_loss != avg_loss:
+            return NAN
+        return rsi_from_averages(avg_gain, avg_loss)
+
+class IndicatorPipeline:
+    """
+    선언한 지표들의 의존 그래프를 만들어 캔들마다 증분 계산한다.
+    같은 중간값(diff, 이동합, EMA 등)은 key가 같으면 한 번만 만들어져 여러 지표가 공유한다.
+    확정 캔들은 update()/sync()로 반영(상태 변경), 진행중 캔들은 peek()으로 잠정값만 계산한다.
+    지표는 데이터를 넣기 전에 선언한다 (나중에 추가하면 티커 상태를 초기화하고 sync()로 다시 채움).
+    """
+    def __init__(self):
+        self.nodes = {}       # key -> (Node, 입력 key 튜플), 삽입 순서가 계산 순서
+        self.states = {}      # ticker -> {key: 상태}
+        self.values = {}      # ticker -> {key: 마지막 확정 캔들 기준 값}
+        self.last_time = {}   # ticker -> 마지막으로 반영한 확정 캔들 시각(ns)
+        for column in COLUMNS:
+            self.nodes[column] = (Source(column), ())
+
+    def _add(self, key, factory, inputs=()):
+        if key not in self.nodes:
+            self.nodes[key] = (factory(), tuple(inputs))
+            # 새 노드는 과거 캔들이 필요하므로 기존 티커 상태는 다시 채움
+            self.states.clear()
+            self.values.clear()
+            self.last_time.clear()
+        return key
+
+# 지표 선언 (반환값은 결과 key, 여러 값인 지표는 dict)
+    def diff(self, src="close"):
+        return self._add(f"diff({src})", Diff, [src])
+
+    def wilder(self, src, n, seed=None):
+        return self._add(f"wilder({src},{n},{seed or n})", lambda: Wilder(n, seed), [src])
+
+    def ema(self, n, src="close"):
+        return self._add(f"ema({src},{n})", lambda: EMA(n), [src])
+
+    def rolling_sum(self, n, src="close", power=1):
+        return self._add(f"sum{'' if power == 1 else power}({src},{n})", lambda: RollingSum(n, power), [src])
+
+    def sma(self, n, src="close"):
+        return self._add(f"sma({src},{n})", lambda: Linear((1 / n,)), [self.rolling_sum(n, src)])
+
+    def rsi(self, n=14, src="close"):
+        # Indicator.calculate_rsi와 같은 방식 (첫 평균은 n-1개 변화량)
+        diff = self.diff(src)
+        gain = self._add(f"gain({diff})", Gain, [diff])
+        loss = self._add(f"loss({diff})", Loss, [diff])
+        return self._add(f"rsi({src},{n})", RSI, [self.wilder(gain, n, n - 1), self.wilder(loss, n, n - 1)])
+
+    def macd(self, fast=12, slow=26, signal=9, src="close"):
+        line = self._add(f"macd({src},{fast},{slow})", lambda: Linear((1.0, -1.0)), [self.ema(fast, src), self.ema(slow, src)])
+        signal_line = self.ema(signal, line)
+        hist = self._add(f"macd_hist({src},{fast},{slow},{signal})", lambda: Linear((1.0, -1.0)), [line, signal_line])
+        return {'macd': line, 'signal': signal_line, 'hist': hist}
+
+    def bollinger(self, n=20, k=2.0, src="close"):
+        middle = self.sma(n, src)
+        std = self._add(f"std({src},{n})", lambda: Std(n), [self.rolling_sum(n, src), self.rolling_sum(n, src, 2)])
+        upper = self._add(f"bb_upper({src},{n},{k:g})", lambda: Linear((1.0, k)), [middle, std])
+        lower = self._add(f"bb_lower({src},{n},{k:g})", lambda: Linear((1.0, -k)), [middle, std])
+        return {'middle': middle, 'upper': upper, 'lower': lower, 'std': std}
+
+    def atr(self, n=14):
+        true_range = self._add("true_range", TrueRange, ["high", "low", "close"])
+        return self.wilder(true_range, n)
+
+    def declare(self, specs):
+        # {'이름': ('rsi', 14), 'trend': ('ema', 50), 'bb': ('bollinger', 20, 2.0)} -> {'이름': key 또는 dict}
+        return {name: getattr(self, spec[0])(*spec[1:]) for name, spec in specs.items()}
+
+# 계산
+    def _run(self, ticker, row, commit):
+        states = self.states.get(ticker)
+        if states is None:
+            states = self.states[ticker] = {key: node.init() for key, (node, _) in self.nodes.items()}
+        values = {}
+        for key, (node, inputs) in self.nodes.items():
+            args = [values[name] for name in inputs] if inputs else (row,)
+            values[key] = node.step(states[key], args, commit)
+        if commit:
+            self.values[ticker] = values
+        return values
+
+    def update(self, ticker, row, time_ns=None):
+        # 확정 캔들 1개 반영 (row: COLUMNS 순서)
+        if time_ns is not None:
+            self.last_time[ticker] = int(time_ns)
+        return self._run(ticker, row, True)
+
+    def peek(self, ticker, row):
+        # 진행중 캔들 기준 잠정값 (상태 변경 없음)
+        return self._run(ticker, row, False)
+
+    def load(self, ticker, times, data):
+        # 과거 확정 캔들로 티커 상태를 처음부터 다시 계산
+        self.reset(ticker)
+        for time_ns, row in zip(times, data):
+            self.update(ticker, row, time_ns)
+        return self.values.get(ticker, {})
+
+    def sync(self, ticker, candle_store):
+        """
+        CandleStore에서 새로 확정된 캔들만 반영하고, 진행중 캔들이 있으면 그 기준 잠정값을 반환한다.
+        버퍼가 끊겨서 이어지지 않으면 버퍼 전체로 다시 계산한다.
+        """
+        last = candle_store.last_closed(ticker)
+        known = self.last_time.get(ticker)
+        if last is not None and last != known:
+            times, data = candle_store._buffer(ticker).arrays()
+            if known is None or known < times[0] or known not in times:
+                self.load(ticker, times, data)
+            else:
+                start = int(np.searchsorted(times, known, side='right'))
+                for time_ns, row in zip(times[start:], data[start:]):
+                    self.update(ticker, row, time_ns)
+        live = candle_store.live.get(ticker)
+        if live is not None and live[0] != self.last_time.get(ticker):
+            return self.peek(ticker, live[1])
+        return self.values.get(ticker, {})
+
+    def get(self, ticker, key):
+        return self.values.get(ticker, {}).get(key, NAN)
+
+    def reset(self, ticker):
+        self.states.pop(ticker, None)
+        self.values.pop(ticker, None)
+        self.last_time.pop(ticker, None)
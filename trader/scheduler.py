@@ -0,0 +1,95 @@
+import threading
+import time
+from metrics import metrics
+
+# 우선순위 (숫자가 작을수록 먼저)
+ORDER = 0       # 매수/매도 주문
+ACCOUNT = 1     # 주문 조회, 잔고 조회
+QUOTATION = 2   # 현재가, 캔들
+TIER_NAMES = {ORDER: 'order', ACCOUNT: 'account', QUOTATION: 'quotation'}
+
+class RequestShed(Exception):
+    pass
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, now):
+        # 토큰 1개를 쓸 수 있을 때까지 남은 시간(초)
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+class RequestScheduler:
+    """
+    요청 종류별 토큰 버킷과 엄격한 우선순위(주문 > 주문/잔고 조회 > 시세)로 요청 순서를 정한다.
+    상위 우선순위 요청이 기다리는 동안 하위 요청은 토큰이 있어도 보내지 않으며,
+    max_wait(초)보다 오래 기다려야 하는 요청(기본: 시세만)은 RequestShed로 버린다.
+    """
+    def __init__(self, rates=None, max_wait=None):
+        rates = rates or {ORDER: 8, ACCOUNT: 30, QUOTATION: 10}
+        self.buckets = {tier: TokenBucket(rate) for tier, rate in rates.items()}
+        self.max_wait = {ORDER: None, ACCOUNT: None, QUOTATION: 5.0}
+        self.max_wait.update(max_wait or {})
+        self.waiting = {tier: 0 for tier in self.buckets}
+        self.granted = {tier: 0 for tier in self.buckets}
+        self.shed = {tier: 0 for tier in self.buckets}
+        self.condition = threading.Condition()
+
+    def acquire(self, tier, max_wait=None):
+        # 요청 1개를 보낼 차례가 될 때까지 대기 후 대기 시간(초) 반환
+        max_wait = self.max_wait[tier] if max_wait is None else max_wait
+        started = time.monotonic()
+        with self.condition:
+            self.waiting[tier] += 1
+            metrics.set('scheduler_waiting', self.waiting[tier], tier=TIER_NAMES[tier])
+            try:
+                while True:
+                    now = time.monotonic()
+                    blocked = any(self.waiting[higher] for higher in self.waiting if higher < tier)
+                    wait = None if blocked else self.buckets[tier].time_until(now)
+                    if wait == 0:
+                        self.buckets[tier].take(now)
+                        self.granted[tier] += 1
+                        waited = now - started
+                        metrics.observe(f"wait_{TIER_NAMES[tier]}", waited)
+                        return waited
+                    timeout = wait
+                    if max_wait is not None:
+                        remaining = max_wait - (now - started)
+                        if remaining <= 0 or (wait is not None and wait > remaining):
+                            self.shed[tier] += 1
+                            metrics.inc('shed', tier=TIER_NAMES[tier])
+                            raise RequestShed(f"{TIER_NAMES[tier]} 요청 대기 시간 초과 ({max_wait}초)")
+                        timeout = remaining if wait is None else min(wait, remaining)
+                    self.condition.wait(timeout)
+            finally:
+                self.waiting[tier] -= 1
+                metrics.set('scheduler_waiting', self.waiting[tier], tier=TIER_NAMES[tier])
+                # 대기열이 줄었으므로 막혀 있던 하위 요청을 깨움
+                self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {TIER_NAMES[tier]: {'waiting': self.waiting[tier], 'granted': self.granted[tier],
+                                       'shed': self.shed[tier], 'tokens': self.buckets[tier].tokens}
+                    for tier in self.buckets}
+
+def classify(method, path):
+    # 업비트 REST 경로 -> 우선순위
+    if method == "POST" and path == "/orders":
+        return ORDER
+    if path in ("/accounts", "/order", "/orders"):
+        return ACCOUNT
+    return QUOTATION
@@ -0,0 +1,398 @@
+import threading
+import time
+from order_tracker import OrderTracker
+from journal import Journal
+from pipeline import IndicatorPipeline
+from metrics import metrics
+from log import get_logger
+
+logger = get_logger(__name__)
+
+# 업비트 원화 마켓 최소 주문금액(원)
+MIN_ORDER_KRW = 5000
+
+class TradingSession:
+    """
+    main 루프의 티커별 매매 실행부.
+    지표/신호 계산은 호출하는 쪽에서 일괄 처리하고, 여기서는 주문과 포지션 상태만 관리한다.
+    """
+    def __init__(self, config, api, notifier, trader):
+        self.config = config
+        self.api = api
+        self.upbit = api.upbit
+        self.notifier = notifier
+        self.trader = trader
+        self.tickers = config.coin_ticker
+        self.slack_trade_channel = config.slack_trade_channel
+        self.slack_error_channel = config.slack_error_channel
+
+        self.position_tracker = trader.position_tracker()
+        self.rsi_check = trader.rsi_check()
+        self.initial_asset_info = None
+        self.initial_coin_balance = {}
+        self.has_initial_coin = {}
+        self.limit_amount = {}
+        self.asset_info = None
+        # 체결 대기중인 주문 {ticker: uuid}, 체결 콜백은 추적 스레드에서 실행되므로 상태 변경은 lock으로 보호
+        self.pending_orders = {}
+        # 재시작 후 체결 추적을 이어가기 위한 주문 정보 {ticker: {'uuid', 'side', 'kind', 'rsi'}}
+        self.pending_info = {}
+        # 티커별 체결 처리 횟수 (변경 기반 평가에서 포지션 변화 감지용)
+        self.fill_version = {}
+        self.lock = threading.RLock()
+        self.order_tracker = OrderTracker(self.upbit)
+        # 체결/주문/신호/자산 기록 (JOURNAL_DIR가 빈 값이면 사용 안 함)
+        self.journal = Journal(config.journal_dir, config.journal_flush_interval) if config.journal_dir else None
+        self.journaled_at = 0.0
+        # 전략이 선언한 지표의 티커별 상태 (새로 확정된 캔들만 반영, 스냅샷에 저장)
+        self.pipeline = IndicatorPipeline()
+        trader.declare_indicators(self.pipeline)
+
+    def start(self, snapshot=None):
+        # snapshot: 스냅샷의 session 상태 (있으면 래더/체결 대기 주문을 복원하고 잔고와 맞춤)
+        self.initial_asset_info = self.api.get_asset_info()
+        if self.initial_asset_info is None:
+            return False
+        """
+        형식: {'krw_balance': 1000000,
+        'coin_info': {'KRW-BTC': {'balance': 1.0, 'avg_price': 100000000, 'current_price': 100000000, 'value': 1000000, 'profit_rate': 0},
+        'KRW-ETH': {'balance': 1.0, 'avg_price': 100000000, 'current_price': 100000000, 'value': 1000000, 'profit_rate': 0}},
+        'total_asset': 1000000}
+        """
+        self.asset_info = self.initial_asset_info
+        self.limit_amount = self.api.get_limit_amount() # 형식: {'KRW-BTC': 10000, 'KRW-ETH': 10000}
+
+        # 초기자산 데이터를 기준으로 매도 조건 설정
+        self.initial_coin_balance = self.trader.initial_coin_balance(self.initial_asset_info)
+        self.has_initial_coin = self.trader.has_initial_coin(self.initial_coin_balance)
+        if snapshot is not None:
+            self.restore_state(snapshot)
+        else:
+            for ticker in self.tickers:
+                if ticker in self.has_initial_coin and self.has_initial_coin[ticker]:
+                    self.rsi_check[ticker].append(35)
+
+        self.send_asset_info()
+        return True
+
+    def snapshot_state(self):
+        # 재시작 시 복원할 매매 상태 (래더, 초기 코인, 체결 대기 주문)
+        with self.lock:
+            return {
+                'position_tracker': {ticker: dict(levels) for ticker, levels in self.position_tracker.items()},
+                'rsi_check': {ticker: list(levels) for ticker, levels in self.rsi_check.items()},
+                'has_initial_coin': dict(self.has_initial_coin),
+                'initial_coin_balance': dict(self.initial_coin_balance),
+                'initial_avg_price': {ticker: self.initial_asset_info['coin_info'][ticker.split('-')[1]]['avg_price']
+                                      for ticker in self.tickers},
+                'pending': {ticker: dict(info) for ticker, info in self.pending_info.items()},
+            }
+
+    def restore_state(self, state):
+        """
+        스냅샷 상태를 복원하고 현재 잔고와 맞춘다.
+        - 체결 대기였던 주문은 다시 추적 (재시작 중 체결됐으면 바로 체결 처리)
+        - 잔고가 없는데 래더가 남아 있으면 초기화, 래더 기록 없이 잔고가 있으면 초기 코인으로 처리
+        """
+        with self.lock:
+            for ticker in self.tickers:
+                currency = ticker.split('-')[1]
+                balance = self.initial_asset_info['coin_info'][currency]['balance']
+                if ticker in state['rsi_check']:
+                    self.position_tracker[ticker] = state['position_tracker'].get(ticker, {})
+                    self.rsi_check[ticker] = state['rsi_check'][ticker]
+                    self.has_initial_coin[ticker] = state['has_initial_coin'].get(ticker, False)
+                    self.initial_coin_balance[ticker] = state['initial_coin_balance'].get(ticker, 0)
+                    if self.has_initial_coin[ticker] and ticker in state['initial_avg_price']:
+                        self.initial_asset_info['coin_info'][currency]['avg_price'] = state['initial_avg_price'][ticker]
+
+                info = state['pending'].get(ticker)
+                if info is not None:
+                    self.resume_order(ticker, info)
+                elif balance <= 0 and (self.rsi_check[ticker] or self.has_initial_coin.get(ticker)):
+                    logger.info("%s 보유 수량이 없어 래더를 초기화합니다: %s", ticker, self.rsi_check[ticker])
+                    self.position_tracker[ticker] = {}
+                    self.rsi_check[ticker] = []
+                    self.has_initial_coin[ticker] = False
+                elif balance > 0 and not self.rsi_check[ticker] and not self.has_initial_coin.get(ticker):
+                    self.has_initial_coin[ticker] = True
+                    self.initial_coin_balance[ticker] = balance
+                    self.rsi_check[ticker].append(35)
+
+    def resume_order(self, ticker, info):
+        # 스냅샷의 체결 대기 주문 추적 재개
+        self.pending_orders[ticker] = info['uuid']
+        self.pending_info[ticker] = info
+        self.order_tracker.track({'uuid': info['uuid']}, ticker, info['side'],
+                                 self._fill_callback(ticker, info['kind'], info['rsi']))
+
+    def _fill_callback(self, ticker, kind, rsi):
+        if kind == 'initial_sell':
+            return lambda event: self.on_initial_sell_filled(ticker, rsi, event)
+        if kind == 'buy':
+            return lambda event: self.on_buy_filled(ticker, rsi, event)
+        if kind == 'sell':
+            return lambda event: self.on_sell_filled(ticker, rsi, event)
+        return lambda event: self.on_stop_loss_filled(ticker, event)
+
+    def send_asset_info(self):
+        self.notifier.send_asset_info(self.asset_info, self.limit_amount, self.rsi_check, self.position_tracker)
+
+    def refresh_asset_info(self):
+        asset_info = self.api.get_asset_info()
+        if asset_info is not None:
+            self.asset_info = asset_info
+            if self.journal is not None and time.monotonic() - self.journaled_at >= self.config.journal_asset_interval:
+                self.journal.record_assets(asset_info)
+                self.journaled_at = time.monotonic()
+        return asset_info
+
+    def refresh_limit_amount(self):
+        # 체결로 보유 현황이 바뀐 뒤 코인별 매수 한도 재계산 (보유 현황이 그대로면 allocator 캐시), 조회 실패 시 이전 한도 유지
+        limit_amount = self.api.get_limit_amount()
+        if limit_amount:
+            self.limit_amount = limit_amount
+        return self.limit_amount
+
+    def has_action(self, ticker, rsi, previous_rsi, new_rsi, buy_signal, sell_signal, current_price):
+        # execute()에서 주문으로 이어지는 분기가 있는지 확인 (스트리밍 모드에서 틱마다 호출)
+        if ticker in self.pending_orders:
+            return False
+        currency = ticker.split('-')[1]
+        if self.has_initial_coin.get(ticker) and rsi >= 70 and previous_rsi > rsi+1:
+            initial_avg_price = self.initial_asset_info['coin_info'][currency]['avg_price']
+            if initial_avg_price > 0 and (current_price - initial_avg_price) / initial_avg_price * 100 >= 1.0:
+                return True
+        if buy_signal and new_rsi not in self.rsi_check[ticker]:
+            return True
+        if sell_signal:
+            return True
+        return current_price < self.asset_info['coin_info'][currency]['avg_price'] * self.config.stop_loss
+
+    def place_order(self, ticker, side, amount):
+        # 시장가 주문 제출 (bid: 원화 금액, ask: 코인 수량)
+        endpoint = 'buy_market_order' if side == 'bid' else 'sell_market_order'
+        metrics.inc('api_calls', endpoint=endpoint)
+        with metrics.timer('order_submit', ticker):
+            if side == 'bid':
+                return self.upbit.buy_market_order(ticker, amount)
+            return self.upbit.sell_market_order(ticker, amount)
+
+    def fit_to_book(self, ticker, side, amount):
+        """
+        호가창 기준 예상 체결가가 최우선 호가보다 ORDERBOOK_MAX_SLIPPAGE_BPS 넘게 불리하면 한도 안의 금액(bid)/수량(ask)으로 줄인다.
+        손절은 남은 수량이 다음 패스에서 다시 손절 조건에 걸려 나눠서 매도된다. 호가창이 없거나 오래됐으면 그대로 반환.
+        줄인 매수 금액이 최소 주문금액보다 작으면 0(이번 패스는 매수하지 않음), 줄인 매도 수량이나 남는 수량이
+        최소 주문금액보다 작으면 전량을 반환한다 (남은 수량을 나중에 팔 수 없으므로).
+        """
+        max_bps = self.config.orderbook_max_slippage_bps
+        book = self.api.orderbooks.get(ticker) if max_bps > 0 else None
+        if book is None:
+            return amount
+        impact = book.impact_bps(side, amount)
+        if impact is None or impact <= max_bps:
+            return amount
+        capped = min(amount, book.max_buy(max_bps) if side == 'bid' else book.max_sell(max_bps))
+        if side == 'bid' and capped < MIN_ORDER_KRW:
+            capped = 0.0
+        elif side == 'ask':
+            price = book.bids.best()
+            if price is None or min(capped, amount - capped) * price < MIN_ORDER_KRW:
+                capped = amount
+        if capped == amount:
+            return amount
+        metrics.inc('orders_capped', side=side)
+        logger.info("%s 예상 슬리피지 %.0fbps (한도 %.0fbps), 주문 %s -> %s", ticker, impact, max_bps, f"{amount:,.8g}", f"{capped:,.8g}")
+        return capped
+
+    def submit(self, ticker, side, order, kind, rsi=None):
+        # 주문 접수 후 체결 추적 등록 (kind: initial_sell, buy, sell, stop_loss, 체결되면 해당 on_*_filled 호출)
+        if not order or 'uuid' not in order:
+            metrics.inc('errors', stage='order_submit')
+            logger.warning("%s 주문 접수 실패: %s", ticker, order)
+            if self.journal is not None:
+                self.journal.record('order', ticker=ticker, side=side, kind=kind, event='reject')
+            return False
+        if self.journal is not None:
+            # amount: 매수는 주문 금액(원), 매도는 주문 수량
+            self.journal.record('order', ticker=ticker, side=side, kind=kind, event='submit',
+                                amount=float(order.get('price') or order.get('volume') or 0), uuid=order['uuid'])
+        self.pending_orders[ticker] = order['uuid']
+        self.pending_info[ticker] = {'uuid': order['uuid'], 'side': side, 'kind': kind, 'rsi': rsi}
+        self.order_tracker.track(order, ticker, side, self._fill_callback(ticker, kind, rsi))
+        return True
+
+    def execute(self, ticker, rsi, previous_rsi, new_rsi, buy_signal, sell_signal, current_price=None):
+        if self.journal is not None and (buy_signal or sell_signal):
+            self.journal.record('signal', ticker=ticker, rsi=rsi, previous_rsi=previous_rsi, new_rsi=new_rsi,
+                                buy=buy_signal, sell=sell_signal, price=current_price or 0.0)
+        with self.lock:
+            if ticker in self.pending_orders:
+                logger.info("%s 주문 체결 대기중...", ticker, extra={'sample': ('pending', ticker)})
+                return
+            self._execute(ticker, rsi, previous_rsi, new_rsi, buy_signal, sell_signal, current_price)
+
+    def _execute(self, ticker, rsi, previous_rsi, new_rsi, buy_signal, sell_signal, current_price):
+        currency = ticker.split('-')[1]
+        if current_price is None:
+            # 조회 실패 시 예외가 호출한 루프로 전달됨 (0원으로 주문 판단하지 않음)
+            current_price = self.api.get_current_price(ticker)
+        asset_info = self.asset_info
+
+        # 초기 자산 정리
+        initial_avg_price = self.initial_asset_info['coin_info'][currency]['avg_price']
+        initial_profit_rate = ((current_price - initial_avg_price) / initial_avg_price * 100) if initial_avg_price > 0 else 0
+        if self.has_initial_coin.get(ticker) and rsi >= 70 and initial_profit_rate >= 1.0 and previous_rsi > rsi+1:
+            initial_coin_balance = self.initial_coin_balance[ticker]
+            order = self.place_order(ticker, 'ask', initial_coin_balance)
+            message = f"매도 주문 완료. 현재가격: {current_price}"
+            logger.info(message)
+            self.api.send_slack_message(self.slack_trade_channel, message)
+            self.submit(ticker, 'ask', order, 'initial_sell', rsi)
+            return
+
+        # 매수 진행
+        if buy_signal and new_rsi not in self.rsi_check[ticker]:
+            asset_info = self.refresh_asset_info()
+            position_size = self.trader.position_size(new_rsi)*self.limit_amount[ticker]
+            position_size = self.fit_to_book(ticker, 'bid', position_size)
+            try:
+                if position_size > 0 and asset_info['krw_balance'] >= position_size and asset_info['krw_balance']*position_size > MIN_ORDER_KRW:
+                    order = self.place_order(ticker, 'bid', position_size)
+                    message = f"{ticker}매수 주문 완료. 현재가격: {current_price}"
+                    logger.info(message)
+                    self.api.send_slack_message(self.slack_trade_channel, message)
+                    self.submit(ticker, 'bid', order, 'buy', new_rsi)
+            except Exception as e:
+                logger.error("매수 주문 중 오류: %s", e)
+
+        # 매도 진행
+        elif sell_signal:
+            try:
+                asset_info = self.refresh_asset_info()
+                sell_amount = asset_info['coin_info'][currency]['balance']
+
+                if sell_amount > 0:
+                    order = self.place_order(ticker, 'ask', sell_amount)
+                    message = f"{ticker}매도 주문 완료. 현재가격: {current_price}"
+                    logger.info(message)
+                    self.api.send_slack_message(self.slack_trade_channel, message)
+                    self.submit(ticker, 'ask', order, 'sell', rsi)
+            except Exception as e:
+                logger.error("%s의 매도 주문 중 오류: %s", ticker, e)
+
+        elif current_price < asset_info['coin_info'][currency]['avg_price'] * self.config.stop_loss:
+            logger.warning("%s의 손실이 %s%% 이상 발생했습니다. 매도 주문 진행중...", ticker, self.config.stop_loss * 100)
+            sell_amount = self.fit_to_book(ticker, 'ask', asset_info['coin_info'][currency]['balance'])
+            order = self.place_order(ticker, 'ask', sell_amount)
+            message = f"{ticker}매도 주문 완료. 현재가격: {current_price}"
+            logger.info(message)
+            self.api.send_slack_message(self.slack_trade_channel, message)
+            self.submit(ticker, 'ask', order, 'stop_loss')
+
+        else:
+            # 티커별로 LOG_SAMPLE_INTERVAL초에 한 번만 출력 (생략 건수는 다음 출력에 표시)
+            logger.info("%s의 매수/매도 신호가 없습니다. 기회 탐색중... rsi: %s", ticker, rsi, extra={'sample': ('no_signal', ticker)})
+
+# 체결 처리 (OrderTracker 스레드에서 호출)
+    def _filled(self, ticker, event):
+        # 체결 이벤트 공통 처리. 체결 수량이 없으면 False
+        self.pending_orders.pop(ticker, None)
+        info = self.pending_info.pop(ticker, None) or {}
+        self.fill_version[ticker] = self.fill_version.get(ticker, 0) + 1
+        if self.journal is not None:
+            self.journal.record('order', ticker=ticker, side=event['side'], kind=info.get('kind', ''),
+                                event=event['state'], amount=event['volume'], price=event['avg_price'], uuid=event['uuid'])
+            if event['volume'] > 0:
+                self.journal.record_fill(ticker, info.get('kind', ''), info.get('rsi'), event)
+        if event['volume'] <= 0:
+            logger.error("%s 주문이 체결되지 않았습니다. 상태: %s", ticker, event['state'])
+            self.api.balances.invalidate()
+            return False
+        # 체결 내역으로 잔고 스냅샷 갱신 (잔고 재조회 없음)
+        self.api.balances.apply_fill(ticker, event['side'], event['volume'], event['avg_price'], event['paid_fee'])
+        return True
+
+    def on_initial_sell_filled(self, ticker, rsi, event):
+        with self.lock:
+            if not self._filled(ticker, event):
+                return
+            message = f"초기 자산 매도 주문 체결\n수량: {event['volume']:.8f}\nRSI: {rsi:.2f}"
+            logger.info(message)
+            self.api.send_slack_message(self.slack_trade_channel, message)
+            self.has_initial_coin[ticker] = False
+            self.refresh_asset_info()
+            self.refresh_limit_amount()
+            self.send_asset_info()
+
+    def on_buy_filled(self, ticker, new_rsi, event):
+        with self.lock:
+            if not self._filled(ticker, event):
+                return
+            executed_price = event['avg_price']
+            buy_amount = round(event['volume'], 8)
+
+            # rsi 매매여부 체크(매수 시 추가)
+            self.position_tracker[ticker][new_rsi] = buy_amount
+            self.rsi_check[ticker].append(new_rsi)
+
+            message = f"""
+{ticker}매수 주문 체결
+체결가격: {executed_price:,.0f}원
+체결수량: {buy_amount:.8f}
+RSI: {new_rsi:.2f}
+포지션 현황: {self.position_tracker[ticker]}
+"""
+            logger.info(message)
+            self.api.send_slack_message(self.slack_trade_channel, message)
+            self.refresh_asset_info()
+            self.refresh_limit_amount()
+            self.send_asset_info()
+
+    def on_sell_filled(self, ticker, rsi, event):
+        with self.lock:
+            if not self._filled(ticker, event):
+                return
+            self.position_tracker[ticker] = {}
+            self.rsi_check[ticker] = []
+
+            message = f"""
+{ticker}매도 주문 체결
+수량: {event['volume']:.8f}
+체결가격: {event['avg_price']:,.0f}원
+RSI: {rsi:.2f}
+{self.rsi_check}
+"""
+            self.api.send_slack_message(self.slack_trade_channel, message)
+            self.refresh_asset_info()
+            self.refresh_limit_amount()
+            self.send_asset_info()
+
+    def on_stop_loss_filled(self, ticker, event):
+        with self.lock:
+            if not self._filled(ticker, event):
+                return
+            asset_info = self.refresh_asset_info()
+            if asset_info is None:
+                # 잔고를 모르면 래더를 유지 (다음 패스에서 손절 조건을 다시 판단)
+                logger.warning("%s 손절 체결 후 잔고 조회 실패, 포지션을 유지합니다", ticker)
+                return
+            remaining = asset_info['coin_info'][ticker.split('-')[1]]['balance']
+            if remaining * event['avg_price'] >= MIN_ORDER_KRW:
+                # 호가창 한도로 일부만 매도됨: 남은 수량은 다음 패스에서 다시 손절 (래더 유지)
+                message = f"""
+{ticker} 손절매 일부 체결
+수량: {event['volume']:.8f}
+남은 수량: {remaining:.8f}
+"""
+            else:
+                # 남은 수량이 없거나 최소 주문금액 미만(매도 불가)이면 포지션 초기화
+                self.position_tracker[ticker] = {}
+                self.rsi_check[ticker] = []
+                message = f"""
+{ticker} 손절매 완료
+포지션 초기화 완료
+"""
+            self.api.send_slack_message(self.slack_trade_channel, message)
+            self.refresh_limit_amount()
+            self.send_asset_info()
@@ -0,0 +1,224 @@
+import multiprocessing
+import queue
+import time
+from datetime import datetime
+import numpy as np
+import pyupbit
+from config import Config
+from api import API
+from trade import Trader
+from indicator import bucket_rsi_array
+from pipeline import IndicatorPipeline
+from candle_store import CandleStore
+from aggregator import create_aggregator
+from notifier import Notifier
+from session import TradingSession
+from snapshot import handle_sigterm
+from metrics import metrics
+from scheduler import RequestScheduler, RequestShed, QUOTATION
+from transport import Transport, UpbitQuotation
+from log import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+ALL_TICKERS = "KRW-ALL"
+
+def shard_tickers(tickers, count):
+    # 티커를 count개 샤드로 고르게 나눔 (라운드 로빈)
+    count = max(1, min(count, len(tickers)))
+    return [tickers[i::count] for i in range(count)]
+
+def create_quotation(config, shard_count):
+    # 워커 전용 시세 조회 (업비트 시세 요청 한도는 IP 단위이므로 워커 수로 나눔)
+    scheduler = RequestScheduler(rates={QUOTATION: config.quotation_rate / shard_count},
+                                 max_wait={QUOTATION: config.quotation_max_wait})
+    transport = Transport(pool_size=2, timeout=config.http_timeout, reserve=config.rate_limit_reserve,
+                          scheduler=scheduler)
+    return UpbitQuotation(transport)
+
+def evaluate_shard(candle_store, pipeline, trader, tickers, prices, count=100):
+    # 샤드의 캔들 갱신, rsi/매수 신호 일괄 계산 (캔들이 count개 미만인 신규 상장 티커는 제외)
+    ready = []
+    for ticker in tickers:
+        if not prices.get(ticker):
+            continue
+        try:
+            candle_store.update(ticker, prices[ticker])
+        except RequestShed:
+            raise
+        except Exception as e:
+            logger.warning("%s 캔들 조회 실패: %s", ticker, e)
+            continue
+        if len(candle_store._buffer(ticker)) >= count - 1 and ticker in candle_store.live:
+            ready.append(ticker)
+    if not ready:
+        return {'tickers': [], 'rsi': [], 'previous_rsi': [], 'new_rsi': [], 'buy_signals': []}
+    # 새로 확정된 캔들만 지표 상태에 반영 (캔들당 O(1))
+    values = np.array([trader.signal_inputs(pipeline, ticker, candle_store) for ticker in ready])
+    rsi, previous_rsi = values[:, 0], values[:, 1]
+    new_rsi = bucket_rsi_array(rsi)
+    buy_signals = trader.buy_signals(rsi, previous_rsi)
+    return {'tickers': ready, 'rsi': rsi.tolist(), 'previous_rsi': previous_rsi.tolist(),
+            'new_rsi': new_rsi.tolist(), 'buy_signals': buy_signals.tolist()}
+
+def run_worker(shard, shard_count, tickers, results, stop, interval):
+    """
+    샤드 워커 프로세스: 담당 티커의 현재가/캔들/rsi/매수 신호를 계산해 results 큐로 보낸다.
+    주문, 잔고, 매매한도는 코디네이터만 다룬다.
+    """
+    config = Config()
+    # 워커 프로세스 로그는 stdout으로만 출력 (슬랙 에러 전송은 코디네이터)
+    setup_logging(config)
+    quotation = create_quotation(config, shard_count)
+    candle_store = CandleStore(interval=config.candle_interval, maxlen=config.candle_buffer_size,
+                               cache_dir=config.candle_cache_dir, quotation=quotation)
+    trader = Trader(None, None, tickers)
+    # 기본 캔들이 5분보다 짧으면 신호용 5분봉을 집계 (상위 분봉 조회는 코디네이터 전략에서 사용하지 않음)
+    trader.aggregator = create_aggregator(candle_store, [], config.candle_buffer_size, trader.signal_minutes)
+    pipeline = IndicatorPipeline()
+    trader.declare_indicators(pipeline)
+    while not stop.is_set():
+        started = time.monotonic()
+        try:
+            prices = quotation.get_current_price(tickers)
+            if not isinstance(prices, dict):
+                prices = {tickers[0]: prices}
+            message = evaluate_shard(candle_store, pipeline, trader, tickers, prices)
+            message.update({'shard': shard, 'prices': prices, 'elapsed': time.monotonic() - started})
+            results.put(message)
+        except RequestShed as e:
+            logger.info("샤드 %s 시세 조회 보류: %s", shard, e)
+        except Exception as e:
+            results.put({'shard': shard, 'error': str(e)})
+        stop.wait(max(interval - (time.monotonic() - started), 0))
+
+class ShardCoordinator:
+    """
+    샤드 실행 모드의 코디네이터.
+    티커 전체를 워커 프로세스에 나눠 맡기고, 워커가 보낸 rsi/매수 신호로 매도 신호(수익률 기준)를 판단해
+    주문이 필요한 티커만 TradingSession으로 실행한다. 원화 잔고와 매매한도는 코디네이터 한 곳에서만 관리한다.
+    """
+    def __init__(self, config, api, session, trader, workers, interval=10):
+        self.config = config
+        self.api = api
+        self.session = session
+        self.trader = trader
+        self.interval = interval
+        self.shards = shard_tickers(list(config.coin_ticker), workers)
+        self.context = multiprocessing.get_context("spawn")
+        self.results = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.processes = {}
+        self.passes = {shard: 0 for shard in range(len(self.shards))}
+
+    def _spawn(self, shard):
+        process = self.context.Process(target=run_worker, name=f"shard-{shard}", daemon=True,
+                                       args=(shard, len(self.shards), self.shards[shard], self.results,
+                                             self.stop_event, self.interval))
+        process.start()
+        self.processes[shard] = process
+
+    def start(self):
+        for shard in range(len(self.shards)):
+            self._spawn(shard)
+        logger.info("샤드 워커 %s개 시작 (워커당 티커 %s개 이하)", len(self.shards), max(len(shard) for shard in self.shards))
+
+    def stop(self):
+        self.stop_event.set()
+        for process in self.processes.values():
+            process.join(timeout=self.interval)
+            if process.is_alive():
+                process.terminate()
+
+    def check_workers(self):
+        # 비정상 종료된 워커 재시작
+        for shard, process in list(self.processes.items()):
+            if not process.is_alive() and not self.stop_event.is_set():
+                logger.warning("샤드 %s 워커가 종료되어 다시 시작합니다 (exitcode %s)", shard, process.exitcode)
+                metrics.inc('errors', stage='shard_worker')
+                self._spawn(shard)
+
+    def handle(self, message):
+        shard = message['shard']
+        if 'error' in message:
+            metrics.inc('errors', stage='shard')
+            logger.warning("샤드 %s 처리 중 오류: %s", shard, message['error'])
+            return
+        self.passes[shard] += 1
+        metrics.observe('shard_pass', message['elapsed'], f"shard{shard}")
+        # 워커가 받은 현재가를 공유 캐시에 반영 (자산 정보 갱신 시 재조회 줄임)
+        self.api.price_cache.put(message['prices'])
+        tickers = message['tickers']
+        if not tickers or self.session.asset_info is None:
+            return
+        coin_info = self.session.asset_info['coin_info']
+        profit_rates = [coin_info[ticker.split('-')[1]]['profit_rate'] for ticker in tickers]
+        sell_signals = self.trader.sell_signals(message['rsi'], message['previous_rsi'], profit_rates)
+        for i, ticker in enumerate(tickers):
+            args = (ticker, float(message['rsi'][i]), float(message['previous_rsi'][i]), int(message['new_rsi'][i]),
+                    bool(message['buy_signals'][i]), bool(sell_signals[i]), message['prices'][ticker])
+            # 주문으로 이어지는 티커만 실행 (나머지는 신호 없음)
+            if self.session.has_action(*args):
+                with metrics.timer('execute', ticker):
+                    self.session.execute(*args)
+
+    def run(self):
+        status_sent = False
+        refreshed_at = 0.0
+        while True:
+            now = time.monotonic()
+            if now - refreshed_at >= self.interval:
+                if self.session.refresh_asset_info() is None:
+                    logger.warning("자산현황 정보를 가져오는 데 실패했습니다.")
+                refreshed_at = now
+                self.check_workers()
+            current_time = datetime.now()
+            if current_time.minute in [0, 30]:
+                if not status_sent:
+                    self.session.send_asset_info()
+                    logger.info("샤드별 처리 횟수: %s", self.passes)
+                    status_sent = True
+            else:
+                status_sent = False
+            try:
+                message = self.results.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                self.handle(message)
+            except Exception as e:
+                metrics.inc('errors', stage='coordinator')
+                logger.exception("샤드 결과 처리 중 오류: %s", e)
+
+def main():
+    config = Config()
+    if config.exchange_backend != "upbit":
+        logger.error("샤드 실행 모드는 EXCHANGE_BACKEND=upbit만 지원합니다.")
+        return
+    if config.coin_ticker == [ALL_TICKERS]:
+        config.coin_ticker = pyupbit.get_tickers(fiat="KRW")
+    api = API(config)
+    setup_logging(config, api)
+    notifier = Notifier(api)
+    trader = Trader(api.upbit, api.slack, config.coin_ticker)
+    session = TradingSession(config, api, notifier, trader)
+    logger.info("자동투자 프로그램을 샤드 모드로 시작합니다. 티커 %s개를 모니터링합니다.", len(config.coin_ticker))
+    if config.metrics_port:
+        metrics.serve(config.metrics_port, config.metrics_host)
+    if not session.start():
+        logger.error("초기 자산 정보 조회 실패. 프로그램을 종료합니다.")
+        return
+
+    coordinator = ShardCoordinator(config, api, session, trader, config.shard_workers)
+    coordinator.start()
+    # SIGTERM에도 워커 정리와 atexit(저널/슬랙 큐 비우기)를 실행 (워커 시작 후 설치해 워커에는 상속하지 않음)
+    handle_sigterm()
+    try:
+        coordinator.run()
+    except KeyboardInterrupt:
+        logger.info("종료합니다.")
+    finally:
+        coordinator.stop()
+
+if __name__ == "__main__":
+    main()
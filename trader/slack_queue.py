@@ -0,0 +1,142 @@
+import atexit
+import queue
+import threading
+import time
+from slack_sdk.errors import SlackApiError
+from metrics import metrics
+from log import get_logger
+
+logger = get_logger(__name__)
+
+class SlackQueue:
+    """
+    슬랙 메시지 비동기 전송 큐.
+    put()은 큐에 넣기만 하고 바로 반환하며, 워커 스레드가 batch_window(초) 동안 모인 메시지를 채널별로 묶어 보낸다.
+    key를 지정한 메시지(자산 보고 등)는 같은 key의 최신 메시지 하나만 전송한다.
+    429 응답은 Retry-After만큼 기다렸다가 다시 보내고, 프로그램 종료 시 남은 메시지를 전송한다.
+    """
+    MAX_TEXT_LENGTH = 3500
+
+    def __init__(self, client, maxsize=1000, batch_window=1.0, max_retries=3):
+        self.client = client
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.latest = {}    # key -> (channel, message)
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="slack-queue", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def put(self, channel, message, key=None):
+        if self.closed:
+            return False
+        if key is not None:
+            with self.lock:
+                if key in self.latest:
+                    # 아직 전송되지 않은 이전 보고는 최신 보고로 대체
+                    self.latest[key] = (channel, message)
+                    self.coalesced += 1
+                    return True
+                self.latest[key] = (channel, message)
+            item = (None, None, key)
+        else:
+            item = (channel, message, None)
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if key is not None:
+                with self.lock:
+                    self.latest.pop(key, None)
+            return False
+
+    def close(self, timeout=10):
+        # 남은 메시지 전송 후 워커 종료
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout=timeout)
+
+    def stats(self):
+        return {'sent': self.sent, 'dropped': self.dropped, 'coalesced': self.coalesced,
+                'pending': self.queue.qsize()}
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            items = [item]
+            deadline = time.monotonic() + self.batch_window
+            while item is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                items.append(item)
+            if None in items:
+                # 종료 신호: 이미 큐에 들어온 메시지까지 모두 전송
+                stop = True
+                while True:
+                    try:
+                        items.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+            self._flush([item for item in items if item is not None])
+
+    def _flush(self, items):
+        batches = {}    # channel -> [message]
+        for channel, message, key in items:
+            if key is not None:
+                with self.lock:
+                    latest = self.latest.pop(key, None)
+                if latest is None:
+                    continue
+                channel, message = latest
+            batches.setdefault(channel, []).append(message)
+
+        for channel, messages in batches.items():
+            text = ""
+            for message in messages:
+                if text and len(text) + len(message) > self.MAX_TEXT_LENGTH:
+                    self._send(channel, text)
+                    text = ""
+                text = f"{text}\n{message}" if text else message
+            if text:
+                self._send(channel, text)
+
+    def _send(self, channel, text):
+        for attempt in range(self.max_retries + 1):
+            metrics.inc('api_calls', endpoint='chat_postMessage')
+            try:
+                with metrics.timer('slack_send'):
+                    self.client.chat_postMessage(channel=channel, text=text)
+                self.sent += 1
+                return True
+            except SlackApiError as e:
+                if e.response is not None and e.response.status_code == 429:
+                    retry_after = int(e.response.headers.get('Retry-After', 1))
+                    time.sleep(retry_after)
+                    continue
+                logger.warning("Error sending message: %s", e)
+                return False
+            except Exception as e:
+                logger.warning("Error sending message: %s", e)
+                time.sleep(min(2 ** attempt, 10))
+        # 재시도를 모두 실패해 메시지를 버림 (WARNING이라 슬랙 에러 채널로는 보내지 않음)
+        self.dropped += 1
+        metrics.inc('errors', stage='slack_send')
+        logger.warning("슬랙 메시지 전송 실패, %s회 재시도 후 버림: channel=%s", self.max_retries, channel)
+        return False
@@ -0,0 +1,122 @@
+import atexit
+import os
+import pickle
+import signal
+import sys
+import time
+from metrics import metrics
+from log import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+class SnapshotStore:
+    """
+    빠른 재시작용 상태 스냅샷 (pickle 파일 1개, 임시 파일에 쓴 뒤 교체).
+    캔들 버퍼, 지표(IndicatorPipeline) 상태, 티커별 rsi 래더, 체결 대기 주문을 저장하고
+    재시작 시 restore() 후 session.start(snapshot['session'])로 현재 잔고와 맞춘다.
+    """
+    def __init__(self, path, session, candle_store, pipeline=None, interval=60.0):
+        self.path = path
+        self.session = session
+        self.candle_store = candle_store
+        self.pipeline = pipeline
+        self.interval = interval
+        self.saved_at = time.monotonic()
+        self.closed = False
+
+    def due(self):
+        return time.monotonic() - self.saved_at >= self.interval
+
+    def save(self):
+        """
+        스냅샷 저장. 실패(pickle/디스크 오류)하면 경고만 남기고 False (기존 스냅샷 파일은 그대로).
+        실패해도 다음 저장은 interval 뒤에 시도한다.
+        """
+        try:
+            self._save()
+            return True
+        except Exception as e:
+            metrics.inc('errors', stage='snapshot_save')
+            logger.warning("스냅샷 저장 실패: %s %s", self.path, e)
+            return False
+        finally:
+            self.saved_at = time.monotonic()
+
+    def close(self):
+        # 종료 시 1회 저장 (SIGTERM 처리와 atexit에서 모두 호출해도 한 번만 저장)
+        if self.closed:
+            return
+        self.closed = True
+        self.save()
+
+    def _save(self):
+        started = time.perf_counter()
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'tickers': list(self.session.tickers),
+            'interval': self.candle_store.interval,
+            'candles': self.candle_store.snapshot(),
+            'session': self.session.snapshot_state(),
+            'pipeline': None,
+        }
+        if self.pipeline is not None:
+            # 노드 key 목록이 같을 때만 복원 (선언한 지표가 바뀌면 버퍼로 다시 계산)
+            snapshot['pipeline'] = {'keys': list(self.pipeline.nodes), 'states': self.pipeline.states,
+                                    'values': self.pipeline.values, 'last_time': self.pipeline.last_time}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            # 쓰다 만 임시 파일 정리
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        metrics.observe('snapshot_save', time.perf_counter() - started)
+
+    def load(self):
+        # 스냅샷이 없거나 읽을 수 없거나 설정(캔들 간격)이 다르면 None
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            logger.warning("스냅샷을 읽을 수 없습니다: %s %s", self.path, e)
+            return None
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('interval') != self.candle_store.interval:
+            logger.warning("스냅샷 형식이 달라 사용하지 않습니다: %s", self.path)
+            return None
+        return snapshot
+
+    def restore(self, snapshot):
+        # 캔들 버퍼/지표 상태 복원 (매매 상태는 session.start에서 잔고와 맞춰 복원)
+        tickers = set(self.session.tickers)
+        self.candle_store.restore({ticker: candles for ticker, candles in snapshot['candles'].items() if ticker in tickers})
+        state = snapshot.get('pipeline')
+        if self.pipeline is not None and state is not None and state['keys'] == list(self.pipeline.nodes):
+            for name in ('states', 'values', 'last_time'):
+                getattr(self.pipeline, name).update({ticker: value for ticker, value in state[name].items() if ticker in tickers})
+        age = time.time() - snapshot['saved_at']
+        logger.info("스냅샷 복원: 티커 %s개, 체결 대기 주문 %s개, %s초 전 저장", len(snapshot['candles']), len(snapshot['session']['pending']), f"{age:,.0f}")
+
+def handle_sigterm(snapshot_store=None, loop=None):
+    """
+    SIGTERM(docker stop, systemd 등)을 정상 종료로 처리한다. 기본 SIGTERM은 atexit 없이 프로세스를 끝내
+    스냅샷, 저널 버퍼, 슬랙 큐가 사라지므로 스냅샷을 저장한 뒤 sys.exit(0)으로 atexit 정리를 실행한다.
+    loop를 주면 이벤트 루프 콜백으로 처리한다 (루프가 캔들 버퍼를 바꾸는 도중에 저장하지 않음).
+    """
+    def on_sigterm(*args):
+        if snapshot_store is not None:
+            # 저장 후 종료 (atexit에서는 다시 저장하지 않음)
+            atexit.unregister(snapshot_store.close)
+            snapshot_store.close()
+        sys.exit(0)
+    if loop is not None:
+        loop.add_signal_handler(signal.SIGTERM, on_sigterm)
+    else:
+        signal.signal(signal.SIGTERM, on_sigterm)
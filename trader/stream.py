@@ -0,0 +1,234 @@
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+import aiohttp
+import numpy as np
+from candle_store import interval_minutes
+from indicator import bucket_rsi
+from metrics import metrics
+from log import get_logger
+
+logger = get_logger(__name__)
+
+KST_OFFSET_NS = 9 * 60 * 60 * 10**9
+
+class BarBuilder:
+    """체결 틱으로 캔들을 만든다. 캔들 시각은 KST 기준 ns (CandleStore와 동일)"""
+    def __init__(self, minutes):
+        self.interval_ns = minutes * 60 * 10**9
+        self.bar = None  # (start_ns, [open, high, low, close, volume, value])
+
+    def seed(self, start_ns, row):
+        # REST로 받은 진행중 캔들에서 이어서 집계
+        self.bar = (int(start_ns), np.array(row, dtype=float))
+
+    def add_trade(self, time_ns, price, volume):
+        """체결 반영. 캔들 경계를 넘으면 확정된 이전 캔들을 반환"""
+        start = time_ns - time_ns % self.interval_ns
+        if self.bar is not None and start < self.bar[0]:
+            return None  # 이미 지난 캔들의 늦은 체결
+        if self.bar is None or start > self.bar[0]:
+            closed = self.bar
+            self.bar = (start, np.array([price, price, price, price, volume, price * volume]))
+            return closed
+        row = self.bar[1]
+        row[1] = max(row[1], price)
+        row[2] = min(row[2], price)
+        row[3] = price
+        row[4] += volume
+        row[5] += price * volume
+        return None
+
+class MarketStream:
+    """
+    업비트 체결(trade) 웹소켓 구독.
+    티커별 최근가를 유지하고 캔들을 직접 만들어 CandleStore에 반영한 뒤 on_tick(ticker, price)를 호출한다.
+    연결이 끊기면 재접속하고, 접속 직후 REST로 빠진 캔들을 채운다.
+    """
+    def __init__(self, tickers, candle_store, on_tick=None,
+                 url="wss://api.upbit.com/websocket/v1", max_backoff=30, orderbooks=None):
+        self.tickers = list(tickers)
+        self.candle_store = candle_store
+        self.on_tick = on_tick
+        self.url = url
+        self.max_backoff = max_backoff
+        # OrderBookStore를 주면 호가(orderbook)도 구독해 갱신
+        self.orderbooks = orderbooks
+        minutes = interval_minutes(candle_store.interval)
+        self.builders = {ticker: BarBuilder(minutes) for ticker in self.tickers}
+        self.last_price = {}
+        self.connected = asyncio.Event()
+        self.reconnect_count = 0
+        self.stopped = False
+        self.ws = None
+        # 백필에 실패해 다시 보충할 티커 (보충 전까지 체결을 반영하지 않음)
+        self.stale = set()
+
+    def subscription(self):
+        subscription = [
+            {"ticket": str(uuid.uuid4())},
+            {"type": "trade", "codes": self.tickers, "isOnlyRealtime": True},
+        ]
+        if self.orderbooks is not None:
+            subscription.append({"type": "orderbook", "codes": self.tickers})
+        return subscription
+
+    async def run(self):
+        backoff = 1
+        while not self.stopped:
+            retry = None
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(self.url, heartbeat=60) as ws:
+                        self.ws = ws
+                        await self.backfill()
+                        if self.stale:
+                            retry = asyncio.create_task(self.retry_backfill())
+                        await ws.send_str(json.dumps(self.subscription()))
+                        self.connected.set()
+                        backoff = 1
+                        async for msg in ws:
+                            if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                                try:
+                                    self.handle_message(msg.data)
+                                except Exception as e:
+                                    # 잘못된 메시지/틱 처리 오류는 해당 메시지만 버리고 계속 수신
+                                    metrics.inc('errors', stage='stream_message')
+                                    logger.warning("웹소켓 메시지 처리 오류: %s", e, extra={'sample': 'stream_message'})
+                            elif msg.type == aiohttp.WSMsgType.ERROR:
+                                break
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                logger.warning("웹소켓 연결 오류: %s", e)
+            except Exception as e:
+                # 취소(CancelledError) 외의 오류는 재접속 (스트리밍 모드를 끝내지 않음)
+                metrics.inc('errors', stage='stream')
+                logger.exception("웹소켓 처리 중 오류: %s", e)
+            finally:
+                if retry is not None:
+                    retry.cancel()
+                self.ws = None
+                self.connected.clear()
+            if self.stopped:
+                break
+            self.reconnect_count += 1
+            logger.info("웹소켓 재접속 대기: %s초", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def stop(self):
+        self.stopped = True
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def backfill(self, tickers=None):
+        """
+        접속(재접속) 시 REST로 끊긴 구간의 캔들을 채운다. (지표 상태는 다음 틱에서 새 캔들만 반영)
+        실패한 티커는 stale에 남겨 retry_backfill()에서 다시 보충한다.
+        """
+        loop = asyncio.get_running_loop()
+        for ticker in self.tickers if tickers is None else tickers:
+            try:
+                await loop.run_in_executor(None, self.candle_store.update, ticker)
+                time_ns, row = self.candle_store.live[ticker]
+                self.builders[ticker].seed(time_ns, row.copy())
+                self.last_price[ticker] = float(row[3])
+                self.stale.discard(ticker)
+            except Exception as e:
+                metrics.inc('errors', stage='stream_backfill')
+                logger.warning("%s 캔들 보충 실패, 다시 시도합니다: %s", ticker, e)
+                self.stale.add(ticker)
+
+    async def retry_backfill(self):
+        # 연결이 유지되는 동안 보충에 실패한 티커를 간격을 늘려가며 다시 보충
+        delay = 1
+        while self.stale and not self.stopped:
+            await asyncio.sleep(delay)
+            await self.backfill(sorted(self.stale))
+            delay = min(delay * 2, self.max_backoff)
+
+    def handle_message(self, data):
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode("utf-8")
+        message = json.loads(data)
+        if message.get("type") == "orderbook" and self.orderbooks is not None:
+            self.orderbooks.apply(message)
+            return
+        if message.get("type") != "trade" or message.get("code") not in self.builders or message["code"] in self.stale:
+            return
+        self.handle_trade(message["code"], float(message["trade_price"]),
+                          float(message["trade_volume"]), int(message["trade_timestamp"]))
+
+    def handle_trade(self, ticker, price, volume, timestamp_ms):
+        builder = self.builders[ticker]
+        closed = builder.add_trade(timestamp_ms * 10**6 + KST_OFFSET_NS, price, volume)
+        if closed is not None:
+            self.candle_store.append(ticker, *closed)
+        self.candle_store.set_live(ticker, *builder.bar)
+        self.last_price[ticker] = price
+        if self.on_tick is not None:
+            self.on_tick(ticker, price)
+
+async def run_stream(config, session, trader, candle_store, snapshot_store=None):
+    """
+    스트리밍 모드 메인 루프: 체결이 들어올 때마다 해당 티커 신호를 판단.
+    지표는 session.pipeline으로 계산한다 (스냅샷에서 복원한 상태면 새로 확정된 캔들만 반영).
+    """
+    loop = asyncio.get_running_loop()
+    busy = set()
+
+    def on_done(ticker, future):
+        busy.discard(ticker)
+        if future.exception() is not None:
+            metrics.inc('errors', stage='execute')
+            logger.error("%s 주문 처리 중 오류: %s", ticker, future.exception())
+
+    def on_tick(ticker, price):
+        # 주문 처리중인 티커는 체결될 때까지 판단하지 않음
+        if ticker in busy or session.asset_info is None:
+            return
+        with metrics.timer('rsi', ticker):
+            rsi, previous_rsi = trader.signal_inputs(session.pipeline, ticker, candle_store)
+        if rsi != rsi or previous_rsi != previous_rsi:
+            return
+        with metrics.timer('signal', ticker):
+            new_rsi = bucket_rsi(rsi)
+            avg_price = session.asset_info['coin_info'][ticker.split('-')[1]]['avg_price']
+            profit_rate = ((price - avg_price) / avg_price * 100) if avg_price > 0 else 0
+            buy_signal = trader.buy_signal(rsi, previous_rsi)
+            sell_signal = trader.sell_signal(rsi, previous_rsi, profit_rate)
+        if not session.has_action(ticker, rsi, previous_rsi, new_rsi, buy_signal, sell_signal, price):
+            return
+        busy.add(ticker)
+        future = loop.run_in_executor(None, session.execute, ticker, rsi, previous_rsi, new_rsi,
+                                      buy_signal, sell_signal, price)
+        future.add_done_callback(lambda f: on_done(ticker, f))
+
+    orderbooks = session.api.orderbooks if config.orderbook_max_slippage_bps > 0 else None
+    stream = MarketStream(config.coin_ticker, candle_store, on_tick, url=config.websocket_url,
+                          orderbooks=orderbooks)
+
+    async def refresh_assets():
+        # 자산 현황 갱신 및 30분 단위 보고 (REST 루프와 동일)
+        status_sent = False
+        while not stream.stopped:
+            await loop.run_in_executor(None, session.refresh_asset_info)
+            if datetime.now().minute in [0, 30]:
+                if not status_sent:
+                    await loop.run_in_executor(None, session.send_asset_info)
+                    status_sent = True
+            else:
+                status_sent = False
+            # 캔들 버퍼는 이벤트 루프에서만 바뀌므로 저장도 루프에서 실행
+            if snapshot_store is not None and snapshot_store.due():
+                snapshot_store.save()
+            await asyncio.sleep(10)
+
+    logger.info("스트리밍 모드로 시작합니다. %s", config.websocket_url)
+    started = time.monotonic()
+    try:
+        await asyncio.gather(stream.run(), refresh_assets())
+    finally:
+        await stream.stop()
+        logger.info("스트리밍 종료. 실행시간 %.0f초, 재접속 %s회", time.monotonic() - started, stream.reconnect_count)
@@ -0,0 +1,157 @@
+import argparse
+import csv
+import heapq
+import itertools
+import os
+import time
+from multiprocessing import Pool, shared_memory
+import numpy as np
+from backtest import Backtester, load_candles
+from indicator import wilder_rsi_series
+from trade import Trader, DEFAULT_LADDER
+
+# 워커 프로세스별 공유 메모리 배열 {name: (SharedMemory, ndarray)}
+_shared = {}
+
+def share_array(array):
+    # 배열을 공유 메모리에 한 번만 복사하고 (이름, shape, dtype) 반환
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[:] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+def attach_arrays(specs):
+    # 워커 초기화: 공유 메모리를 복사 없이 numpy 배열로 연결
+    for key, (name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _shared[key] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+
+def evaluate(task):
+    # 파라미터 조합 하나를 모든 데이터셋에 대해 백테스트
+    number, params, datasets, options = task
+    trader = Trader(None, None, [], buy_rsi=params['buy_rsi'], sell_rsi=params['sell_rsi'],
+                    slope=params['slope'], ladder=params['ladder'])
+    backtester = Backtester(initial_krw=options['initial'], stop_loss=params['stop_loss'],
+                            fee=options['fee'], min_order=options['min_order'], trader=trader)
+    returns, drawdowns, trades, win_rates = [], [], 0, []
+    for name in datasets:
+        close = _shared[f"{name}:close"][1]
+        rsi = _shared[f"{name}:rsi"][1]
+        stats = backtester.simulate(close, rsi)['stats']
+        returns.append(stats['total_return'])
+        drawdowns.append(stats['max_drawdown'])
+        win_rates.append(stats['win_rate'])
+        trades += stats['trades']
+    return {
+        'id': number,
+        'buy_rsi': params['buy_rsi'],
+        'sell_rsi': params['sell_rsi'],
+        'slope': params['slope'],
+        'stop_loss': params['stop_loss'],
+        'ladder': "/".join(f"{params['ladder'][level]:g}" for level in sorted(params['ladder'])),
+        'levels': "/".join(str(level) for level in sorted(params['ladder'])),
+        'mean_return': float(np.mean(returns)),
+        'worst_return': float(np.min(returns)),
+        'worst_drawdown': float(np.min(drawdowns)),
+        'mean_win_rate': float(np.mean(win_rates)),
+        'trades': trades,
+    }
+
+def parameter_grid(buy_rsi, sell_rsi, slope, stop_loss, ladders, levels):
+    for level_set, ladder, buy, sell, s, stop in itertools.product(levels, ladders, buy_rsi, sell_rsi, slope, stop_loss):
+        if len(level_set) != len(ladder):
+            continue
+        yield {'buy_rsi': buy, 'sell_rsi': sell, 'slope': s, 'stop_loss': stop,
+               'ladder': dict(zip(level_set, ladder))}
+
+def print_ranking(top, metric, done, total, started):
+    elapsed = time.perf_counter() - started
+    print(f"\n[{done}/{total}] {elapsed:,.1f}초, {done / elapsed if elapsed > 0 else 0:,.1f}개/초")
+    print(f"{'순위':>4} {metric:>14} {'worst_dd':>9} {'trades':>7}  buy/sell/slope  stop  levels / ladder")
+    for rank, (_, _, row) in enumerate(sorted(top, reverse=True), 1):
+        print(f"{rank:>4} {row[metric]:>14.2f} {row['worst_drawdown']:>9.2f} {row['trades']:>7}  "
+              f"{row['buy_rsi']:g}/{row['sell_rsi']:g}/{row['slope']:g}  {row['stop_loss']:.3f}  {row['levels']} / {row['ladder']}")
+
+def parse_list(text, cast=float):
+    return [cast(value) for value in text.split(",") if value]
+
+def parse_groups(text, cast=float):
+    # "0.2,0.4,0.3,0.1;0.25,0.25,0.25,0.25" -> [(0.2, 0.4, 0.3, 0.1), (0.25, ...)]
+    return [tuple(parse_list(group, cast)) for group in text.split(";") if group]
+
+def main():
+    parser = argparse.ArgumentParser(description="RSI 래더 전략 파라미터 스윕")
+    parser.add_argument("paths", nargs="+", help="캔들 CSV/Parquet 파일 (여러 티커 가능)")
+    parser.add_argument("--buy-rsi", default="30,35,40")
+    parser.add_argument("--sell-rsi", default="65,70,75")
+    parser.add_argument("--slope", default="0.5,1,2")
+    parser.add_argument("--stop-loss", default="0.9,0.95,0.97")
+    parser.add_argument("--ladders", default=",".join(f"{DEFAULT_LADDER[level]:g}" for level in sorted(DEFAULT_LADDER)),
+                        help="구간별 매수 비중, ';'로 여러 개 (예: 0.2,0.4,0.3,0.1;0.25,0.25,0.25,0.25)")
+    parser.add_argument("--levels", default=",".join(str(level) for level in sorted(DEFAULT_LADDER)),
+                        help="rsi 정규화 구간, ';'로 여러 개 (예: 20,25,30,35;15,20,25,30)")
+    parser.add_argument("--initial", type=float, default=1_000_000)
+    parser.add_argument("--fee", type=float, default=0.0005)
+    parser.add_argument("--min-order", type=float, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--metric", default="mean_return", choices=["mean_return", "worst_return", "worst_drawdown", "mean_win_rate"])
+    parser.add_argument("--report-every", type=int, default=500)
+    parser.add_argument("--out", default="sweep_results.csv", help="전체 결과 CSV (결과가 나오는 대로 기록)")
+    args = parser.parse_args()
+
+    # 같은 파일을 두 번 넣으면 평균/최악 수익률이 왜곡되므로 거부
+    real_paths = [os.path.realpath(path) for path in args.paths]
+    duplicates = sorted({path for path in real_paths if real_paths.count(path) > 1})
+    if duplicates:
+        raise ValueError(f"같은 데이터 파일이 여러 번 지정됐습니다: {', '.join(duplicates)}")
+
+    grid = list(parameter_grid(parse_list(args.buy_rsi), parse_list(args.sell_rsi), parse_list(args.slope),
+                               parse_list(args.stop_loss), parse_groups(args.ladders), parse_groups(args.levels, int)))
+    if not grid:
+        raise ValueError("파라미터 조합이 없습니다 (levels와 ladders 길이를 확인하세요)")
+
+    # 캔들과 rsi(기간 고정)는 한 번만 계산해서 공유 메모리에 올림
+    segments, specs, datasets = [], {}, []
+    try:
+        for index, path in enumerate(args.paths):
+            # 파일 이름은 다른 디렉터리에서 겹칠 수 있으므로 입력 순서로 구분
+            name = f"{index}:{os.path.basename(path)}"
+            close = load_candles(path)['close'].to_numpy(dtype=float)
+            for suffix, array in (("close", close), ("rsi", wilder_rsi_series(close))):
+                shm, spec = share_array(array)
+                segments.append(shm)
+                specs[f"{name}:{suffix}"] = spec
+            datasets.append(name)
+
+        options = {'initial': args.initial, 'fee': args.fee, 'min_order': args.min_order}
+        tasks = ((number, params, datasets, options) for number, params in enumerate(grid))
+        print(f"파라미터 {len(grid)}개 x 데이터 {len(datasets)}개, 워커 {args.workers}개")
+
+        top = []
+        started = time.perf_counter()
+        with open(args.out, "w", newline="") as f, Pool(args.workers, initializer=attach_arrays, initargs=(specs,)) as pool:
+            writer = None
+            for done, row in enumerate(pool.imap_unordered(evaluate, tasks, chunksize=args.chunksize), 1):
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+                entry = (row[args.metric], -row['id'], row)
+                if len(top) < args.top:
+                    heapq.heappush(top, entry)
+                else:
+                    heapq.heappushpop(top, entry)
+                if done % args.report_every == 0:
+                    f.flush()
+                    print_ranking(top, args.metric, done, len(grid), started)
+        print_ranking(top, args.metric, len(grid), len(grid), started)
+        print(f"전체 결과: {args.out}")
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# trader 모듈은 같은 디렉터리 기준으로 import하므로 (from candle_store import ...) trader 디렉터리를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
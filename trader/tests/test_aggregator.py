@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from aggregator import CandleAggregator
+from candle_store import CandleStore, COLUMNS
+
+AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum', 'value': 'sum'}
+# 업비트 분봉 경계는 UTC 0시 기준 (KST 시각으로는 09시)
+ORIGIN = pd.Timestamp("1970-01-01 09:00")
+
+def minute_candles(count, start, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 10000 * np.exp(np.cumsum(rng.normal(0, 0.002, count)))
+    spread = rng.uniform(0, 0.002, count)
+    df = pd.DataFrame({'open': np.roll(close, 1), 'high': close * (1 + spread), 'low': close * (1 - spread),
+                       'close': close, 'volume': rng.uniform(0.1, 2, count)},
+                      index=pd.date_range(start, periods=count, freq="1min"))
+    df['value'] = df['close'] * df['volume']
+    # 거래가 없던 분(캔들 없음)
+    return df[COLUMNS].drop(df.index[[301, 302, 777, 1500]])
+
+@pytest.mark.parametrize("minutes", [3, 5, 15, 60, 240])
+def test_aggregator_matches_resample(minutes):
+    # 분봉 중간(08:07)에서 시작: 첫 분봉은 일부만 있으므로 버려야 함
+    df = minute_candles(2000, "2026-03-02 08:07")
+    store = CandleStore(interval="minute1", maxlen=len(df))
+    for time_ns, row in zip(df.index.values.astype('datetime64[ns]').astype(np.int64), df.to_numpy(dtype=float)):
+        store.append("KRW-BTC", int(time_ns), row)
+    aggregator = CandleAggregator(store, (minutes,), maxlen=len(df))
+    result = aggregator.get_ohlcv("KRW-BTC", minutes, count=len(df))
+
+    expected = df.resample(f"{minutes}min", origin=ORIGIN, label='left', closed='left').agg(AGG).dropna()
+    if df.index[0] != expected.index[0]:
+        expected = expected.iloc[1:]
+    expected.index = expected.index.astype('datetime64[ns]')
+    pd.testing.assert_frame_equal(result, expected[COLUMNS], check_freq=False, check_names=False, rtol=1e-12)
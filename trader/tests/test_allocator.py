@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from allocator import water_fill
+
+@pytest.mark.parametrize("seed", range(20))
+def test_water_fill_invariants(seed):
+    rng = np.random.default_rng(seed)
+    count = int(rng.integers(1, 30))
+    budget = float(rng.uniform(0, 1e7))
+    values = rng.uniform(0, 5e6, count) * (rng.random(count) < 0.7)
+    weights = rng.uniform(0, 3, count) * (rng.random(count) < 0.8)
+    limits = water_fill(budget, values, weights)
+
+    assert (limits >= 0).all()
+    assert limits.sum() <= budget * (1 + 1e-9)
+    assert (limits[weights == 0] == 0).all()
+    active = weights > 0
+    if active.any():
+        # 비중이 있는 코인이 있으면 원화를 모두 배분
+        assert limits.sum() == pytest.approx(budget, rel=1e-9)
+        # 한도를 받은 코인은 같은 수위, 받지 못한 코인은 이미 수위 이상
+        level = (values + limits)[active] / weights[active]
+        filled = limits[active] > 0
+        if filled.any():
+            assert level[filled] == pytest.approx(np.full(filled.sum(), level[filled][0]), rel=1e-9)
+            assert (level[~filled] >= level[filled][0] * (1 - 1e-9)).all()
+
+def test_water_fill_empty_budget_or_weights():
+    assert water_fill(0, [1.0, 2.0], [1.0, 1.0]).tolist() == [0.0, 0.0]
+    assert water_fill(1000, [1.0, 2.0], [0.0, 0.0]).tolist() == [0.0, 0.0]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from candle_store import CandleStore, COLUMNS
+from indicator import Indicator
+from pipeline import IndicatorPipeline, Node
+from trade import Trader
+
+STEP = 5 * 60 * 10**9
+
+def candles(count, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    index = pd.date_range("2026-01-01", periods=count, freq="5min")
+    return pd.DataFrame({'open': close, 'high': close * 1.001, 'low': close * 0.999, 'close': close,
+                         'volume': 1.0, 'value': close}, index=index)[COLUMNS]
+
+def store_from(df):
+    # 마지막 행은 진행중 캔들
+    store = CandleStore(interval="minute5", maxlen=len(df))
+    times = df.index.values.astype('datetime64[ns]').astype(np.int64)
+    data = df.to_numpy(dtype=float)
+    for time_ns, row in zip(times[:-1], data[:-1]):
+        store.append("KRW-BTC", int(time_ns), row)
+    store.set_live("KRW-BTC", int(times[-1]), data[-1].copy())
+    return store
+
+def signal_inputs(df):
+    pipeline = IndicatorPipeline()
+    trader = Trader(None, None, ["KRW-BTC"])
+    trader.declare_indicators(pipeline)
+    return trader.signal_inputs(pipeline, "KRW-BTC", store_from(df))
+
+@pytest.mark.parametrize("count", [16, 100, 500])
+def test_rsi_matches_calculate_rsi(count):
+    df = candles(count)
+    rsi, previous_rsi = signal_inputs(df)
+    expected_rsi, expected_previous = Indicator(df).calculate_rsi()
+    assert rsi == pytest.approx(expected_rsi, rel=1e-9)
+    assert previous_rsi == pytest.approx(expected_previous, rel=1e-9)
+
+def test_incremental_sync_matches_full_history():
+    df = candles(300, seed=1)
+    pipeline = IndicatorPipeline()
+    key = pipeline.rsi(14)
+    times = df.index.values.astype('datetime64[ns]').astype(np.int64)
+    data = df.to_numpy(dtype=float)
+    store = CandleStore(interval="minute5", maxlen=len(df))
+    for i in range(len(df) - 1):
+        store.append("KRW-BTC", int(times[i]), data[i])
+        store.set_live("KRW-BTC", int(times[i + 1]), data[i + 1].copy())
+        # 몇 캔들씩 건너뛰어도 새로 확정된 캔들만 이어서 반영
+        if i % 7 == 0:
+            pipeline.sync("KRW-BTC", store)
+    values = pipeline.sync("KRW-BTC", store)
+    expected_rsi, expected_previous = Indicator(df).calculate_rsi()
+    assert values[key] == pytest.approx(expected_rsi, rel=1e-9)
+    assert pipeline.get("KRW-BTC", key) == pytest.approx(expected_previous, rel=1e-9)
+
+def test_node_is_abstract():
+    with pytest.raises(TypeError):
+        Node()
@@ -1,8 +1,26 @@
+import numpy as np
+
+# rsi 구간별 매수 비중 (매매한도 대비)
+DEFAULT_LADDER = {20: 0.2, 25: 0.4, 30: 0.3, 35: 0.1}
+
 class Trader:
-    def __init__(self, upbit, slack, tickers):
+    def __init__(self, upbit, slack, tickers, buy_rsi=35, sell_rsi=70, slope=1, min_profit=1.0, ladder=None, signal_minutes=5):
         self.upbit = upbit
         self.slack = slack
         self.tickers = tickers
+        # 매매 신호 기준 (기본값은 기존 전략)
+        self.buy_rsi = buy_rsi
+        self.sell_rsi = sell_rsi
+        self.slope = slope
+        self.min_profit = min_profit
+        self.ladder = dict(ladder) if ladder is not None else dict(DEFAULT_LADDER)
+        self.levels = tuple(sorted(self.ladder))
+        # 매매 신호 분봉 (기본 캔들이 더 짧으면 aggregator로 집계한 분봉에서 계산)
+        self.signal_minutes = signal_minutes
+        # 상위 분봉 조회 (CandleAggregator, CANDLE_TIMEFRAMES 설정 시)
+        self.aggregator = None
+        # 신호 계산에 쓰는 지표 {이름: IndicatorPipeline key}, declare_indicators()에서 채움
+        self.indicators = {}
 
 # 포지션 트래커
     def position_tracker(self):
@@ -43,21 +61,42 @@ class Trader:
                 has_initial_coin[ticker] = True
         return has_initial_coin
 
+# 지표 선언
+    def declare_indicators(self, pipeline):
+        # 전략에 필요한 지표를 IndicatorPipeline에 선언 (지표를 추가하면 모든 실행 모드에서 같이 계산됨)
+        self.indicators = pipeline.declare({'rsi': ('rsi', 14)})
+        return self.indicators
+
+    def signal_source(self, candle_store):
+        # 기본 캔들이 신호 분봉보다 짧으면(CANDLE_INTERVAL=minute1 등) 집계한 신호 분봉 기준으로 계산
+        if self.aggregator is not None and candle_store.minutes < self.signal_minutes:
+            return self.aggregator.view(self.signal_minutes)
+        return candle_store
+
+    def signal_inputs(self, pipeline, ticker, candle_store):
+        # 새로 확정된 캔들만 반영하고 (진행중 캔들 rsi, 직전 확정 캔들 rsi) 반환 (캔들이 부족하면 nan)
+        key = self.indicators['rsi']
+        values = pipeline.sync(ticker, self.signal_source(candle_store))
+        return values.get(key, float('nan')), pipeline.get(ticker, key)
+
 # 매매신호 판단
     def buy_signal(self, rsi, previous_rsi):
-        return rsi <= 35 and previous_rsi+1 < rsi
+        return rsi <= self.buy_rsi and previous_rsi+self.slope < rsi
     
     def sell_signal(self, rsi, previous_rsi, profit_rate):
-        return rsi >= 70 and previous_rsi-1 > rsi and profit_rate >= 1.0
+        return rsi >= self.sell_rsi and previous_rsi-self.slope > rsi and profit_rate >= self.min_profit
+
+    # 전체 티커 일괄 판단 (numpy 배열 입력, boolean 마스크 반환)
+    def buy_signals(self, rsi, previous_rsi):
+        rsi = np.asarray(rsi, dtype=float)
+        previous_rsi = np.asarray(previous_rsi, dtype=float)
+        return (rsi <= self.buy_rsi) & (previous_rsi + self.slope < rsi)
+
+    def sell_signals(self, rsi, previous_rsi, profit_rates):
+        rsi = np.asarray(rsi, dtype=float)
+        previous_rsi = np.asarray(previous_rsi, dtype=float)
+        profit_rates = np.asarray(profit_rates, dtype=float)
+        return (rsi >= self.sell_rsi) & (previous_rsi - self.slope > rsi) & (profit_rates >= self.min_profit)
     
     def position_size(self, new_rsi):
-        if new_rsi == 20:
-            return 0.2
-        elif new_rsi == 25:
-            return 0.4
-        elif new_rsi == 30:
-            return 0.3
-        elif new_rsi == 35:
-            return 0.1
-        else:
-            return 0.0
+        return self.ladder.get(new_rsi, 0.0)
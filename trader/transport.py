@@ -0,0 +1,215 @@
+import threading
+import time
+import pandas as pd
+import pyupbit
+import requests
+from requests.adapters import HTTPAdapter
+from candle_store import COLUMNS, interval_minutes
+from metrics import metrics
+from scheduler import classify
+
+API_URL = "https://api.upbit.com/v1"
+
+class TransportError(Exception):
+    def __init__(self, status, data):
+        super().__init__(f"HTTP {status}: {data}")
+        self.status = status
+        self.data = data
+
+def parse_remaining_req(header):
+    # "group=default; min=1799; sec=29" -> {'group': 'default', 'min': 1799, 'sec': 29}
+    result = {}
+    for part in header.split(";"):
+        if "=" not in part:
+            continue
+        key, value = part.strip().split("=", 1)
+        result[key] = value if key == "group" else int(value)
+    return result if 'group' in result else None
+
+class RateBudget:
+    """
+    응답의 Remaining-Req 헤더로 요청 그룹별 남은 초당 요청 수를 추적한다.
+    남은 요청이 reserve 이하이면 다음 초가 시작될 때까지 기다릴 시간을 알려준다.
+    """
+    def __init__(self, reserve=1):
+        self.reserve = reserve
+        self.groups = {}       # group -> {'sec', 'min', 'updated'}
+        self.path_groups = {}  # 요청 경로 -> group (응답에서 학습)
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def update(self, path, header):
+        if not header:
+            return
+        remaining = parse_remaining_req(header)
+        if remaining is None:
+            return
+        group = remaining['group']
+        with self.lock:
+            self.path_groups[path] = group
+            self.groups[group] = {'sec': remaining.get('sec'), 'min': remaining.get('min'),
+                                  'updated': time.monotonic()}
+        if remaining.get('sec') is not None:
+            metrics.set('remaining_req', remaining['sec'], group=group)
+
+    def wait_time(self, path):
+        # 이 경로의 그룹 예산이 바닥났으면 기다릴 시간(초), 아니면 0
+        with self.lock:
+            group = self.path_groups.get(path)
+            state = self.groups.get(group)
+            if state is None or state['sec'] is None or state['sec'] > self.reserve:
+                return 0.0
+            elapsed = time.monotonic() - state['updated']
+            return max(1.0 - elapsed, 0.0)
+
+    def consume(self, path):
+        # 응답 전에 같은 그룹 요청이 몰리지 않도록 예산을 미리 차감
+        with self.lock:
+            state = self.groups.get(self.path_groups.get(path))
+            if state is not None and state['sec'] is not None:
+                state['sec'] -= 1
+
+    def record_throttle(self, path):
+        with self.lock:
+            self.throttled += 1
+            group = self.path_groups.get(path, "unknown")
+            state = self.groups.get(group)
+            if state is not None:
+                state['sec'] = 0
+                state['updated'] = time.monotonic()
+        metrics.inc('throttled', group=group)
+
+    def snapshot(self):
+        # {group: {'sec', 'min', 'age'}}
+        now = time.monotonic()
+        with self.lock:
+            return {group: {'sec': state['sec'], 'min': state['min'], 'age': now - state['updated']}
+                    for group, state in self.groups.items()}
+
+class Transport:
+    """
+    업비트 REST API 공용 HTTP 세션 (커넥션 풀/keep-alive).
+    요청 전에 그룹 예산이 바닥났으면 잠시 기다리고, 429 응답은 짧게 쉬었다가 다시 보낸다.
+    scheduler(RequestScheduler)를 주면 요청마다 우선순위 순서를 받은 뒤 보낸다.
+    """
+    def __init__(self, base_url=API_URL, pool_size=10, timeout=5.0, reserve=1, max_retries=2, scheduler=None):
+        self.base_url = base_url
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.budget = RateBudget(reserve)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/json"})
+
+    def request(self, method, path, params=None, json=None, headers=None):
+        tier = classify(method, path)
+        for attempt in range(self.max_retries + 1):
+            if self.scheduler is not None:
+                self.scheduler.acquire(tier)
+            wait = self.budget.wait_time(path)
+            if wait > 0:
+                metrics.inc('budget_waits')
+                time.sleep(wait)
+            self.budget.consume(path)
+            response = self.session.request(method, f"{self.base_url}{path}", params=params, json=json,
+                                            headers=headers, timeout=self.timeout)
+            self.budget.update(path, response.headers.get("Remaining-Req"))
+            if response.status_code == 429 and attempt < self.max_retries:
+                self.budget.record_throttle(path)
+                time.sleep(0.2 * (attempt + 1))
+                continue
+            try:
+                data = response.json()
+            except ValueError:
+                data = response.text
+            if response.status_code >= 400:
+                if response.status_code == 429:
+                    self.budget.record_throttle(path)
+                raise TransportError(response.status_code, data)
+            return data
+
+    def close(self):
+        self.session.close()
+
+class UpbitQuotation:
+    """pyupbit 시세 함수(get_current_price, get_ohlcv)와 같은 형식으로 Transport를 사용하는 시세 조회"""
+    def __init__(self, transport):
+        self.transport = transport
+
+    def get_current_price(self, ticker="KRW-BTC"):
+        tickers = ticker if isinstance(ticker, list) else [ticker]
+        data = self.transport.request("GET", "/ticker", params={"markets": ",".join(tickers)})
+        prices = {item['market']: float(item['trade_price']) for item in data}
+        # pyupbit와 같이 티커가 1개면 가격만 반환
+        if len(tickers) == 1:
+            return prices.get(tickers[0])
+        return prices
+
+    def get_orderbook(self, ticker="KRW-BTC"):
+        # pyupbit.get_orderbook과 같은 형식 (티커 목록이면 목록, 1개면 dict)
+        tickers = ticker if isinstance(ticker, list) else [ticker]
+        data = self.transport.request("GET", "/orderbook", params={"markets": ",".join(tickers)})
+        return data if isinstance(ticker, list) else (data[0] if data else None)
+
+    def get_ohlcv(self, ticker="KRW-BTC", interval="minute5", count=200, to=None):
+        # 오래된 순서의 KST 시각 index DataFrame (마지막 행은 진행중 캔들), 200개 초과는 나눠서 조회
+        path = f"/candles/minutes/{interval_minutes(interval)}"
+        rows = []
+        while len(rows) < count:
+            params = {"market": ticker, "count": min(count - len(rows), 200)}
+            if to is not None:
+                params["to"] = to
+            data = self.transport.request("GET", path, params=params)
+            if not data:
+                break
+            rows.extend(data)
+            to = data[-1]['candle_date_time_utc'].replace("T", " ")
+            if len(data) < params["count"]:
+                break
+        rows.reverse()
+        index = pd.to_datetime([row['candle_date_time_kst'] for row in rows])
+        values = [[row['opening_price'], row['high_price'], row['low_price'], row['trade_price'],
+                   row['candle_acc_trade_volume'], row['candle_acc_trade_price']] for row in rows]
+        return pd.DataFrame(values, index=index, columns=COLUMNS, dtype=float)
+
+class UpbitExchange(pyupbit.Upbit):
+    """
+    매매에 쓰는 pyupbit.Upbit 메서드(get_balances, buy/sell_market_order, get_order)를 Transport로 보낸다.
+    인증 헤더는 pyupbit의 _request_headers를 그대로 사용하고, 나머지 메서드는 pyupbit 구현을 쓴다.
+    """
+    def __init__(self, access, secret, transport):
+        super().__init__(access, secret)
+        self.transport = transport
+
+    def get_balances(self, contain_req=False):
+        return self.transport.request("GET", "/accounts", headers=self._request_headers())
+
+    def buy_market_order(self, ticker, price, contain_req=False):
+        return self._order({"market": ticker, "side": "bid", "price": str(price), "ord_type": "price"})
+
+    def sell_market_order(self, ticker, volume, contain_req=False):
+        return self._order({"market": ticker, "side": "ask", "volume": str(volume), "ord_type": "market"})
+
+    def get_order(self, ticker_or_uuid, state='wait', page=1, limit=100, contain_req=False):
+        # 티커로 주문 목록을 조회하는 경우는 pyupbit 구현 사용
+        if "-" in ticker_or_uuid and ticker_or_uuid.split("-")[0] in ("KRW", "BTC", "USDT"):
+            return super().get_order(ticker_or_uuid, state=state, page=page, limit=limit, contain_req=contain_req)
+        data = {"uuid": ticker_or_uuid}
+        try:
+            return self.transport.request("GET", "/order", params=data, headers=self._request_headers(data))
+        except TransportError as e:
+            if e.status == 429:
+                raise
+            return e.data
+
+    def _order(self, data):
+        # 주문 거절(4xx)은 pyupbit와 같이 업비트 오류 응답(dict)을 그대로 반환
+        try:
+            return self.transport.request("POST", "/orders", json=data, headers=self._request_headers(data))
+        except TransportError as e:
+            if e.status == 429 or e.status >= 500:
+                raise
+            return e.data